@@ -0,0 +1,11 @@
+"""
+Τα tests τρέχουν σε προσωρινή βάση δεδομένων. Το RANTEVOU_DB πρέπει να οριστεί πριν
+από το πρώτο import του πακέτου rantevou, που δημιουργεί την σύνδεση με την βάση δεδομένων.
+"""
+
+import os
+import tempfile
+from pathlib import Path
+
+_directory = tempfile.TemporaryDirectory()
+os.environ.setdefault("RANTEVOU_DB", str(Path(_directory.name) / "rantevou.db"))
@@ -0,0 +1,114 @@
+"""
+Σύγκριση των στρατηγικών υπολογισμού κενού χρόνου μεταξύ των ραντεβού (rantevou.src.model.gaps)
+σε προσωρινή βάση δεδομένων με πολλά ραντεβού. Η βάση δεδομένων της εφαρμογής δεν αλλάζει.
+
+    python gap_benchmark.py --appointments 120000 --repeat 5
+
+Μετράει:
+    * sql: Τα κενά υπολογίζονται στο SQLite με window functions
+    * cache (cold): Φόρτωση των ραντεβού ως AppointmentRecord και υπολογισμός με NumPy,
+      όπως όταν οι περίοδοι δεν υπάρχουν στο cache
+    * cache (warm): Μόνο ο υπολογισμός με NumPy, όπως όταν όλες οι περίοδοι είναι στο cache
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+from sqlalchemy import create_engine, insert, select
+
+from rantevou.src.model import gaps
+from rantevou.src.model.caching import RECORD_COLUMNS
+from rantevou.src.model.entities import Appointment, AppointmentRecord, Base
+
+
+def populate(engine, count: int, start: datetime) -> datetime:
+    """
+    Γεμίζει την βάση δεδομένων με count ραντεβού μέσα στο ωράριο, με τυχαία διάρκεια
+    και τυχαία κενά μεταξύ τους. Επιστρέφει το τέλος του τελευταίου ραντεβού.
+    """
+    rows = []
+    date = start
+    while len(rows) < count:
+        duration = timedelta(minutes=random.choice((20, 20, 30, 40, 60)))
+        if date.hour >= gaps.OPENING_HOUR.seconds // 3600 + gaps.WORKING_HOURS.seconds // 3600:
+            date = date.replace(hour=0, minute=0) + timedelta(days=1) + gaps.OPENING_HOUR
+        rows.append({"date": date, "duration": duration, "is_alerted": False, "employee_id": 0})
+        date += duration + timedelta(minutes=random.choice((0, 0, 5, 10, 25, 45)))
+
+    with engine.begin() as connection:
+        connection.execute(insert(Appointment), rows)
+    return date
+
+
+def measure(function: Callable[[], object], repeat: int) -> tuple[float, float]:
+    times = []
+    for _ in range(repeat):
+        started = perf_counter()
+        function()
+        times.append((perf_counter() - started) * 1000)
+    return min(times), statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=120_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--minimum", type=int, default=30, help="Ελάχιστη διάρκεια κενού σε λεπτά")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    minimum = timedelta(minutes=args.minimum)
+    lookbehind = timedelta(hours=2)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'benchmark.db'}")
+        Base.metadata.create_all(bind=engine)
+
+        start = datetime(2020, 1, 1) + gaps.OPENING_HOUR
+        end = populate(engine, args.appointments, start)
+        print(f"{args.appointments} appointments from {start:%d/%m/%Y} to {end:%d/%m/%Y}")
+
+        for label, range_end in (("30 days", start + timedelta(days=30)), ("all", end)):
+            statement = select(*RECORD_COLUMNS).where(
+                Appointment.date >= start - lookbehind, Appointment.date < range_end
+            )
+
+            def load() -> list[AppointmentRecord]:
+                with engine.connect() as connection:
+                    return [AppointmentRecord(*row) for row in connection.execute(statement)]
+
+            def from_records(records: list[AppointmentRecord]) -> list[tuple[datetime, timedelta]]:
+                starts, ends = gaps.to_arrays(records)
+                return gaps.to_list(*gaps.find_gaps(starts, ends, start, range_end, minimum))
+
+            def from_sql() -> list[tuple[datetime, timedelta]]:
+                return gaps.to_list(*gaps.query_gaps(start, range_end, minimum, lookbehind, bind=engine))
+
+            records = load()
+            expected = from_records(records)
+            if from_sql() != expected:
+                raise SystemExit("Strategies returned different gaps")
+
+            print(f"\n{label}: {len(records)} appointments, {len(expected)} gaps of at least {args.minimum} minutes")
+            for name, function in (
+                ("sql", from_sql),
+                ("cache (cold)", lambda: from_records(load())),
+                ("cache (warm)", lambda: from_records(records)),
+            ):
+                best, median = measure(function, args.repeat)
+                print(f"    {name:<14} best {best:9.2f} ms    median {median:9.2f} ms")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
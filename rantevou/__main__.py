@@ -76,11 +76,13 @@ def main():
         logger.log_info("Starting Rantevou")
         root = tk.Tk()
         from .src.view.window import Window
+        from .src.controller.appointments_controller import AppointmentControl
 
         root = Window(root)
         root.mainloop()
         root.update()
         root.quit()
+        AppointmentControl().shutdown()
 
 
 if __name__ == "__main__":
@@ -2,10 +2,13 @@ from flask import Flask, jsonify, request, Response
 from .src.controller.appointments_controller import AppointmentControl
 from .src.controller.customers_controller import CustomerControl
 from .src.model.entities import Customer, Appointment
+from .src.model.exceptions import AppointmentDBError, AppointmentIdAlreadyExists, DateOverlap, InvalidCursor
+from .src.model.session import session
 
 
 from pydantic import BaseModel
 from datetime import datetime, timedelta
+from math import ceil
 
 
 class AppointmentV(BaseModel):
@@ -20,7 +23,7 @@ class AppointmentV(BaseModel):
     employee_id: int | None = None
 
     def to_Appointment(self):
-        date = datetime(year=self.year, month=self.month, day=self.day, minute=self.minute)
+        date = datetime(year=self.year, month=self.month, day=self.day, hour=self.hour, minute=self.minute)
         duration = timedelta(minutes=self.duration)
         return Appointment(
             id=self.id, date=date, duration=duration, customer_id=self.customer_id, employee_id=self.employee_id
@@ -39,6 +42,24 @@ class CustomerV(BaseModel):
 
 
 app = Flask(__name__)
+CUSTOMER_PAGE = 100
+
+
+@app.teardown_appcontext
+def remove_session(exception: BaseException | None = None) -> None:
+    # Κάθε request τρέχει σε δικό του thread με δικό του session, που κλείνει στο τέλος
+    session.remove()
+
+
+def employee_filter() -> int | None:
+    """
+    Ο εργαζόμενος της παραμέτρου employee_id ή None για όλους
+
+    Raises:
+        ValueError: Εάν το employee_id δεν είναι ακέραιος
+    """
+    value = request.args.get("employee_id")
+    return int(value) if value else None
 
 
 @app.route("/appointments")
@@ -63,6 +84,38 @@ def create_appointment() -> Response:
         return response
 
 
+@app.route("/appointments/batch", methods=["POST"])
+def create_appointments() -> Response:
+    """
+    Δέχεται λίστα ραντεβού σε JSON, με τα πεδία του AppointmentV. Προστίθενται όλα ή κανένα.
+    """
+    try:
+        data = request.get_json()
+        if not isinstance(data, list):
+            raise ValueError("Expected a list of appointments")
+        appointments = [AppointmentV.model_validate(item).to_Appointment() for item in data]
+    except Exception as e:
+        response = jsonify({"success": False, "reason": "Parameters are wrong", "error": str(e)})
+        response.status_code = 422
+        return response
+
+    try:
+        result = AppointmentControl().create_appointments(appointments)
+    except DateOverlap as e:
+        response = jsonify({"success": False, "reason": "Date overlap", "error": str(e)})
+        response.status_code = 409
+        return response
+    except AppointmentIdAlreadyExists as e:
+        response = jsonify({"success": False, "reason": "Appointment id already exists", "error": str(e)})
+        response.status_code = 409
+        return response
+    except AppointmentDBError as e:
+        response = jsonify({"success": False, "reason": "Database error", "error": str(e)})
+        response.status_code = 422
+        return response
+    return jsonify({"success": True, "new_ids": result})
+
+
 @app.route("/appointment/delete", methods=["POST"])
 def delete_appointment() -> Response:
     try:
@@ -110,7 +163,13 @@ def get_appointment_by_date() -> Response:
         hour=int(request.args.get("hour") or 0),
         minute=int(request.args.get("minute") or 0),
     )
-    apt = AppointmentControl().get_appointment_by_date(date)
+    try:
+        employee_id = employee_filter()
+    except ValueError as e:
+        response = jsonify({"reason": "Parameters are wrong", "error": str(e)})
+        response.status_code = 422
+        return response
+    apt = AppointmentControl().get_appointment_by_date(date, employee_id)
     if apt:
         return jsonify(apt.to_dict_api())
     else:
@@ -135,43 +194,101 @@ def get_appointments_from_to_date() -> Response:
         hour=int(request.args.get("to_hour") or 0),
         minute=int(request.args.get("to_minute") or 0),
     )
-    data = AppointmentControl().get_appointments_from_to_date(from_date, to_date)
+    try:
+        employee_id = employee_filter()
+    except ValueError as e:
+        response = jsonify({"reason": "Parameters are wrong", "error": str(e)})
+        response.status_code = 422
+        return response
+    data = AppointmentControl().get_appointments_from_to_date(from_date, to_date, employee_id)
     transformed = [v.to_dict_api() for v in data]
     return jsonify(transformed)
 
 
-@app.route("/customers")
-def get_customers() -> Response:
-    # TODO make it better
-    customers, pages = CustomerControl().get_customers(page_length=100, page_number=1)
-    return jsonify({"data": [*map(Customer.to_dict_api, customers)], "pages": f"1/{pages}"})
+@app.route("/appointments/free")
+def get_free_slot() -> Response:
+    try:
+        after = None
+        if "year" in request.args:
+            after = datetime(
+                year=int(request.args["year"]),
+                month=int(request.args.get("month") or 1),
+                day=int(request.args.get("day") or 1),
+                hour=int(request.args.get("hour") or 0),
+                minute=int(request.args.get("minute") or 0),
+            )
+        duration = timedelta(minutes=int(request.args.get("duration") or 20))
+        employee_id = employee_filter()
+    except ValueError as e:
+        response = jsonify({"reason": "Parameters are wrong", "error": str(e)})
+        response.status_code = 422
+        return response
+
+    result = AppointmentControl().find_free_slot(after, duration, employee_id)
+    if result is None:
+        response = jsonify({"reason": "not found"})
+        response.status_code = 404
+        return response
 
+    date, length = result
+    return jsonify({"date": date.strftime("%d/%m/%Y, %H:%M:%S"), "duration": length.total_seconds() // 60})
 
-@app.route("/customers/<page>")
-def get_customers_by_page(page) -> Response:
-    # TODO make it better
-    customers, pages = CustomerControl().get_customers(page_length=100, page_number=int(page))
+
+@app.route("/metrics/cache")
+def get_cache_metrics() -> Response:
+    return jsonify(AppointmentControl().get_cache_stats())
+
+
+@app.route("/metrics/subscribers")
+def get_subscriber_metrics() -> Response:
     return jsonify(
-        {"data": [*map(Customer.to_dict_api, customers)], "pages": f"{page}/{pages}"},
+        {
+            "appointments": AppointmentControl().get_subscriber_stats(),
+            "customers": CustomerControl().get_subscriber_stats(),
+        }
     )
 
 
+def customer_page(search_query: str = "", cursor: str | None = None) -> Response:
+    """
+    Σελίδα CUSTOMER_PAGE πελατών μετά ή πριν από το cursor, που είναι το next ή το prev
+    μιας προηγούμενης απάντησης, στο path ή στην παράμετρο cursor. Χωρίς cursor επιστρέφεται
+    η πρώτη σελίδα, μαζί με το πλήθος των σελίδων.
+    """
+    try:
+        page = CustomerControl().get_customer_page(
+            CUSTOMER_PAGE, search_query=search_query, cursor=cursor or request.args.get("cursor")
+        )
+    except InvalidCursor as e:
+        response = jsonify({"reason": "Invalid cursor", "error": str(e)})
+        response.status_code = 422
+        return response
+
+    data = {"data": [*map(Customer.to_dict_api, page.customers)], "next": page.next_cursor, "prev": page.prev_cursor}
+    if page.count is not None:
+        data["pages"] = f"1/{ceil(page.count / CUSTOMER_PAGE)}"
+    return jsonify(data)
+
+
+@app.route("/customers")
+def get_customers() -> Response:
+    return customer_page()
+
+
+# Το path έχει το cursor της σελίδας και όχι τον αριθμό της, που χρειαζόταν OFFSET
+@app.route("/customers/<cursor>")
+def get_customers_by_page(cursor) -> Response:
+    return customer_page(cursor=cursor)
+
+
 @app.route("/customers/search/<query>")
 def search_customers(query):
-    # TODO make it better
-    customers, pages = CustomerControl().get_customers(page_length=100, page_number=1, search_query=query)
-    return jsonify(
-        {"data": [*map(Customer.to_dict_api, customers)], "pages": f"1/{pages}"},
-    )
+    return customer_page(query)
 
 
-@app.route("/customers/search/<query>/<page>")
-def search_customers_by_page(query, page):
-    # TODO make it better
-    customers, pages = CustomerControl().get_customers(page_length=100, page_number=page, search_query=query)
-    return jsonify(
-        {"data": [*map(Customer.to_dict_api, customers)], "pages": f"{page}/{pages}"},
-    )
+@app.route("/customers/search/<query>/<cursor>")
+def search_customers_by_page(query, cursor):
+    return customer_page(query, cursor)
 
 
 @app.route("/customer/create", methods=["POST"])
@@ -258,5 +375,8 @@ def get_stats_overview() -> Response:
     })
 
 def start_server(host, port, debug=True):
-    app.run(host, port, debug)
+    try:
+        app.run(host, port, debug)
+    finally:
+        AppointmentControl().shutdown()
 
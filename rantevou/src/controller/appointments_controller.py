@@ -2,11 +2,13 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from enum import Enum
+from threading import Lock
+from typing import Any, Callable, Iterable
 
 from . import get_config
 from .logging import Logger
 from .customers_controller import CustomerControl
-from ..model.entities import Appointment, Customer
+from ..model.entities import Appointment, AppointmentRecord, Customer
 from ..model.appointment import AppointmentModel
 from ..model.exceptions import *
 
@@ -23,14 +25,18 @@ class AppointmentControl:
     """
 
     _instance = None
+    init_lock = Lock()
     mode: AppointmentModel
 
     def __new__(cls, *args, **kwargs) -> AppointmentControl:
         if cls._instance:
             return cls._instance
 
-        cls._instance = super(AppointmentControl, cls).__new__(cls, *args, **kwargs)
-        cls.model = AppointmentModel()
+        with cls.init_lock:
+            if cls._instance is None:
+                instance = super(AppointmentControl, cls).__new__(cls, *args, **kwargs)
+                cls.model = AppointmentModel()
+                cls._instance = instance
         return cls._instance
 
     def get_appointments(self) -> dict[int, list[Appointment]]:
@@ -48,6 +54,34 @@ class AppointmentControl:
         logger.log_info("Requesting list of appointments")
         return self.model.get_appointments()
 
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """
+        Περιμένει την αρχική φόρτωση του cache των ραντεβού, που γίνεται στο παρασκήνιο.
+        Δεν είναι απαραίτητο, μέχρι τότε οι αναζητήσεις γίνονται απευθείας στην βάση δεδομένων.
+
+        Returns:
+            bool: True εάν η φόρτωση ολοκληρώθηκε μέσα στο timeout
+        """
+        return self.model.wait_until_ready(timeout)
+
+    def shutdown(self) -> None:
+        """
+        Αποθηκεύει το snapshot του cache πριν κλείσει η εφαρμογή
+        """
+        logger.log_info("Requesting shutdown of the appointment model")
+        self.model.shutdown()
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        """
+        Επιστρέφει τους μετρητές λειτουργίας του cache των ραντεβού, για την
+        ρύθμιση του μεγέθους του και τον εντοπισμό καθυστερήσεων.
+
+        Returns:
+            dict[str, Any]
+        """
+        logger.log_info("Requesting cache statistics")
+        return self.model.get_cache_stats()
+
     def create_appointment(self, appointment: Appointment, customer: Customer | None = None) -> int | None:
         """
         Προσθέτει καινούρια εγγραφή στο table Appointments
@@ -80,14 +114,22 @@ class AppointmentControl:
         logger.log_warn("Request Failure")
         return None
 
-    def delete_appointment(self, appointment: Appointment) -> tuple[bool, str]:
+    def create_appointments(self, appointments: Iterable[Appointment]) -> list[int]:
+        """
+        Προσθέτει πολλά ραντεβού μαζί, σε ένα transaction. Τα ραντεβού συνδέονται με
+        πελάτες μόνο μέσω του customer_id, δεν δημιουργούνται νέοι πελάτες.
+        """
+        logger.log_info("Requesting creation of multiple appointments")
+        return self.model.add_appointments(appointments)
+
+    def delete_appointment(self, appointment: Appointment | AppointmentRecord) -> tuple[bool, str]:
         """
         Σβήνει ένα ραντεβού από την βάση δεδομένων. Το ραντεβού πρέπει να έχει id,
         να υπάρχει στην βάση δεδομένων και τα στοιχεία του να είναι ίδια με της
         βάσης δεδομένων.
 
         Args:
-            appointment (Appointment): Ραντεβού προς διαγραφή
+            appointment (Appointment | AppointmentRecord): Ραντεβού προς διαγραφή
 
         Returns:
             tuple[bool, str]: Boolean ορθής ολοκλήρωσης και λόγος αποτυχίας
@@ -106,7 +148,7 @@ class AppointmentControl:
 
     def update_appointment(
         self,
-        appointment: Appointment,
+        appointment: Appointment | AppointmentRecord,
         customer: Customer | None = None,
     ) -> bool:
         """
@@ -155,30 +197,85 @@ class AppointmentControl:
         logger.log_info(f"Requesting appointment by {id=}")
         return self.model.get_appointment_by_id(id)
 
-    def get_appointment_by_date(self, date: datetime) -> Appointment | None:
+    def get_appointment_by_date(self, date: datetime, employee_id: int | None = None) -> Appointment | None:
         """
-        Επιστρέφει μια εγγραφή με βάση το id από το table Appointments
+        Επιστρέφει μια εγγραφή με βάση την ημερομηνία, και τον εργαζόμενο εάν δοθεί,
+        από το table Appointments
         """
-        logger.log_info(f"Requesting appointment by {date=}")
-        return self.model.get_appointment_by_date(date)
+        logger.log_info(f"Requesting appointment by {date=}, {employee_id=}")
+        return self.model.get_appointment_by_date(date, employee_id)
 
     def add_subscription(self, subscriber):
         logger.log_info(f"Requesting subscription for {subscriber}")
         self.model.add_subscriber(subscriber)
 
+    def remove_subscription(self, subscriber) -> bool:
+        logger.log_info(f"Requesting unsubscription for {subscriber}")
+        return self.model.remove_subscriber(subscriber)
+
+    def get_subscriber_stats(self) -> dict[str, Any]:
+        """
+        Πλήθος subscribers και ιστόγραμμα του χρόνου των ειδοποιήσεων, για τον
+        εντοπισμό subscribers που δεν αφαιρέθηκαν ή αργούν.
+        """
+        return self.model.get_subscriber_stats()
+
     def get_time_between_appointments(
         self,
-        start_date: datetime = datetime.now(),
-        end_date: datetime = datetime.now() + timedelta(days=1),
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
         minumum_free_period: timedelta = timedelta(minutes=20),  # TODO import settings
+        working_hours_only: bool = True,
+        strategy: str | None = None,
+        employee_id: int | None = None,
     ) -> list[tuple[datetime, timedelta]]:
         logger.log_debug(f"Requesting list of time between appointments for {start_date=}, {minumum_free_period=}")
-        return self.model.get_time_between_appointments(start_date, end_date, minumum_free_period)
+        return self.model.get_time_between_appointments(
+            start_date, end_date, minumum_free_period, working_hours_only, strategy, employee_id
+        )
+
+    def find_free_slot(
+        self,
+        after: datetime | None = None,
+        duration: timedelta = timedelta(minutes=20),
+        employee_id: int | None = None,
+    ) -> tuple[datetime, timedelta] | None:
+        """
+        Επιστρέφει την αρχή και την διάρκεια του πρώτου κενού τουλάχιστον duration μετά
+        το after στο ημερολόγιο του εργαζόμενου, ή όλων των εργαζομένων εάν το employee_id
+        είναι None, ή None εάν δεν υπάρχει.
+        """
+        logger.log_debug(f"Requesting first free slot of {duration=} after {after=} for {employee_id=}")
+        return self.model.find_free_slot(after, duration, employee_id)
 
     def get_index_from_date(self, date: datetime, start_date: datetime, period_duration: timedelta) -> int:
         logger.log_debug(f"Requesting calculation of group index for {date=}, {start_date=}, {period_duration=}")
         return (date - start_date) // period_duration
 
-    def get_appointments_from_to_date(self, start: datetime, end: datetime):
-        logger.log_debug(f"Requesting query of appointments from {start} to {end}")
-        return self.model.get_appointments_from_to_date(start, end)
+    def get_appointments_from_to_date(
+        self, start: datetime, end: datetime, employee_id: int | None = None
+    ) -> list[AppointmentRecord]:
+        logger.log_debug(f"Requesting query of appointments from {start} to {end} for {employee_id=}")
+        return self.model.get_appointments_from_to_date(start, end, employee_id)
+
+    def set_notification_scheduler(self, scheduler: Callable[[Callable[[], None]], Any] | None) -> None:
+        """
+        Ορίζει πότε ειδοποιούνται οι subscribers, πχ με το after_idle του Tk ώστε οι
+        αλλαγές ενός κύκλου να φτάνουν σε μια ειδοποίηση.
+        """
+        self.model.set_notification_scheduler(scheduler)
+
+    def sync_external_changes(self) -> bool:
+        """
+        Εφαρμόζει στο cache τις αλλαγές άλλων διεργασιών στην βάση δεδομένων
+        και ενημερώνει τους subscribers εάν υπήρξαν.
+        """
+        return self.model.sync_external_changes()
+
+    def prefetch_appointments(self, start: datetime, end: datetime) -> None:
+        """
+        Φορτώνει στο cache τα ραντεβού της περιόδου στο παρασκήνιο, ώστε
+        οι επόμενες αναζητήσεις να μην χρειάζονται την βάση δεδομένων.
+        """
+        logger.log_debug(f"Requesting prefetch of appointments from {start} to {end}")
+        self.model.prefetch(start, end)
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from threading import Lock
+from typing import Any
+
 from ..model.entities import Customer
 from ..model.customer import CustomerModel
+from ..model.pagination import CustomerPage
 from .logging import Logger
 
 # TODO πρέπει να προσθεθούν σε όλα τα functions έλεγχος σφαλμάτων
@@ -12,14 +16,18 @@ logger = Logger("customer-controller")
 
 class CustomerControl:
     _instance = None
+    init_lock = Lock()
     model: CustomerModel
 
     def __new__(cls, *args, **kwargs) -> CustomerControl:
         if cls._instance:
             return cls._instance
 
-        cls._instance = super(CustomerControl, cls).__new__(cls, *args, **kwargs)
-        cls.model = CustomerModel()
+        with cls.init_lock:
+            if cls._instance is None:
+                instance = super(CustomerControl, cls).__new__(cls, *args, **kwargs)
+                cls.model = CustomerModel()
+                cls._instance = instance
         return cls._instance
 
     def get_customers(
@@ -35,6 +43,19 @@ class CustomerControl:
         )
         return self.model.get_customers(page_number, page_length, search_query, sorted_by, descending)
 
+    def get_customer_page(
+        self,
+        page_length: int,
+        search_query: str = "",
+        sorted_by: str = "",
+        descending: bool = False,
+        cursor: str | None = None,
+    ) -> CustomerPage:
+        logger.log_info(
+            f"Requesting customer page with query: {page_length}, {search_query}, {sorted_by}, {descending}, {cursor}"
+        )
+        return self.model.get_customer_page(page_length, search_query, sorted_by, descending, cursor)
+
     def create_customer(self, customer: Customer):
         logger.log_info(f"Requesting creation of {customer}")
         return self.model.add_customer(customer)
@@ -63,6 +84,13 @@ class CustomerControl:
         logger.log_info(f"Requesting subscription for node {node}")
         self.model.add_subscriber(node)
 
+    def remove_subscription(self, node) -> bool:
+        logger.log_info(f"Requesting unsubscription for node {node}")
+        return self.model.remove_subscriber(node)
+
+    def get_subscriber_stats(self) -> dict[str, Any]:
+        return self.model.get_subscriber_stats()
+
     def search(self, string: str) -> list[Customer]:
         logger.log_info(f"Requesting customer search with query: {string}")
         return self.model.customer_search(string)
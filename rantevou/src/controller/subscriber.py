@@ -1,10 +1,32 @@
 class SubscriberInterface:
+    """
+    Βάση των widgets που ενημερώνονται από τα μοντέλα. Τα μοντέλα κρατάνε weak
+    references, οπότε ένα widget που καταστράφηκε δεν ειδοποιείται. Τα Tk widgets
+    αφαιρούνται και ρητά όταν καταστρέφονται.
+    """
+
     from .appointments_controller import AppointmentControl
     from .customers_controller import CustomerControl
 
-    def __init__(self):
-        self.AppointmentControl().add_subscription(self)
-        self.CustomerControl().add_subscription(self)
+    def __init__(self, appointments: bool = True, customers: bool = True):
+        if appointments:
+            self.AppointmentControl().add_subscription(self)
+        if customers:
+            self.CustomerControl().add_subscription(self)
+
+        bind = getattr(self, "bind", None)
+        if bind is not None:
+            # Το <Destroy> φτάνει και για τα παιδιά των Toplevel, μετράει μόνο το ίδιο το widget
+            bind("<Destroy>", lambda event: event.widget is self and self.unsubscribe(), add="+")
+
+    def unsubscribe(self) -> None:
+        self.AppointmentControl().remove_subscription(self)
+        self.CustomerControl().remove_subscription(self)
 
-    def subscriber_update(self):
+    def subscriber_update(self, change=None):
+        """
+        Args:
+            change (Change | None): Η αλλαγή στα ραντεβού, δες rantevou.src.model.events.Change.
+            None για αλλαγές στους πελάτες.
+        """
         raise NotImplementedError
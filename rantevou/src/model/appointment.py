@@ -4,14 +4,27 @@
 
 from __future__ import annotations
 
+import atexit
+from collections import defaultdict
+from concurrent.futures import Future, wait
 from datetime import datetime, timedelta
+from functools import wraps
+from heapq import merge
+from threading import Event, Lock, RLock, Thread
+from time import perf_counter
+from typing import Any, Callable, Iterable, TypeVar
 
-from sqlalchemy import func
+from sqlalchemy import delete, func, insert, select, update
 from sqlalchemy.exc import DatabaseError
 
-from .session import session
-from .entities import Appointment
-from .caching import AppointmentCache
+from .session import session, engine
+from .entities import Appointment, AppointmentRecord, Customer
+from .caching import AppointmentCache, MAX_BUCKETS, RECORD_COLUMNS, by_date, query_overlapping, query_records
+from .coherency import CHANGE_SEQ, install_change_log
+from .snapshot import load_snapshot, save_snapshot
+from . import gaps
+from .slots import FreeSlotIndex
+from .events import Change, EventBus, SubscriberRegistry
 
 from .interfaces import SubscriberInterface
 from ..controller.logging import Logger
@@ -20,8 +33,8 @@ from ..controller import get_config
 from .exceptions import (
     DateOverlap,
     WrongAppointment,
+    AppointmentIdAlreadyExists,
     AppointmentDBError,
-    SynchronizationDBError,
     IdMissing,
     IdNotFoundInDB,
     NoSubscriberInterface,
@@ -31,9 +44,37 @@ cfg = get_config()
 _working_hours = int(cfg["view_settings"]["working_hours"])
 _rows = int(cfg["view_settings"]["rows"])
 PERIOD = timedelta(minutes=_working_hours // _rows)
+DEFAULT_DURATION = timedelta(minutes=int(cfg["view_settings"]["minimum_appointment_duration"]))
+SNAPSHOT = bool(cfg["cache_settings"]["snapshot"])
+# Κάθε πόσα δευτερόλεπτα αποθηκεύεται το snapshot όσο τρέχει η εφαρμογή. Το 0 το απενεργοποιεί
+SNAPSHOT_INTERVAL = float(cfg["cache_settings"].get("snapshot_interval_s", 300))
+# Το αρχικό παράθυρο του cache, πριν και μετά την σημερινή μέρα. Το 0 το απενεργοποιεί
+PRELOAD_WINDOW = timedelta(days=int(cfg["cache_settings"]["preload_days"]))
+BACKGROUND_PRELOAD = bool(cfg["cache_settings"]["background_preload"])
+GAP_STRATEGIES = ("cache", "sql")
+GAP_STRATEGY = str(cfg["cache_settings"]["gap_strategy"])
 
 logger = Logger("Appointment-Model")
 
+T = TypeVar("T", Appointment, AppointmentRecord)
+
+
+def serialized(method: Callable) -> Callable:
+    """
+    Decorator που εκτελεί την μέθοδο κρατώντας το write_lock του μοντέλου. Ο έλεγχος
+    για overlap και η εγγραφή πρέπει να γίνονται μαζί, αλλιώς δύο threads μπορούν να
+    κλείσουν ραντεβού στην ίδια ώρα. Οι εγγραφές ενημερώνουν το cache, οπότε περιμένουν
+    πρώτα να ολοκληρωθεί η αρχική φόρτωση του.
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        self.ready.result()
+        with self.write_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
 
 class AppointmentModel:
     """
@@ -51,55 +92,127 @@ class AppointmentModel:
 
     _instance = None
     session = session
-    subscribers: list[SubscriberInterface] = []
+    events = EventBus()
+    subscribers: SubscriberRegistry = events.subscribers
     max_id = 0
     cache: AppointmentCache
+    slots: dict[int | None, FreeSlotIndex] = {}
+    slots_applied = 0
+    gap_strategy = GAP_STRATEGY
+    write_lock = RLock()
+    init_lock = Lock()
+    ready: Future
+    stopped: Event
+    warmup_ms: float | None = None
 
     def __new__(cls, *args, **kwargs) -> AppointmentModel:
         """
         Constructor, εφαρμογή του Singleton Pattern
 
-        Αρχικοποιεί ραντεβού για 10 μέρες πριν και μετά την αρχή της σημερινής εργάσιμης μέρας
+        Το cache γεμίζει με τα ραντεβού των preload_days ημερών πριν και μετά την αρχή
+        της σημερινής εργάσιμης μέρας σε δεύτερο thread, ώστε ο πρώτος καλών να μην
+        περιμένει. Μέχρι να ολοκληρωθεί το ready, οι αναγνώσεις γίνονται απευθείας από
+        την βάση δεδομένων και οι εγγραφές περιμένουν.
         """
-        if cls._instance is None:
+        if cls._instance is not None:
+            return cls._instance
+
+        # Με τον threaded server τα πρώτα requests μπορούν να φτάσουν ταυτόχρονα. Το instance
+        # γίνεται ορατό στα υπόλοιπα threads μόνο όταν έχει αρχικοποιηθεί πλήρως
+        with cls.init_lock:
+            if cls._instance is not None:
+                return cls._instance
+
             logger.log_info("Initializing Appointment Model")
 
-            cls._instance = super(AppointmentModel, cls).__new__(cls, *args, **kwargs)
-            cls.max_id = session.query(func.max(Appointment.id)).scalar()
-            if cls.max_id is None:
-                cls.max_id = 0
+            instance = super(AppointmentModel, cls).__new__(cls, *args, **kwargs)
 
-            cls.cache = AppointmentCache(cls._instance)
+            install_change_log(engine)
+            cls.cache = AppointmentCache(instance)
+            AppointmentRecord.customer_loader = instance.get_customer
 
             cls.now = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)
-            cls.min_date = cls.now - timedelta(days=9, hours=23)
-            cls.max_date = cls.now + timedelta(days=9, hours=23)
-
-            appointments = (
-                session.query(Appointment)
-                .filter(Appointment.date >= cls.min_date, Appointment.date <= cls.max_date)
-                .order_by(Appointment.date)
-                .all()
-            )
+            cls.min_date = cls.now - PRELOAD_WINDOW
+            cls.max_date = cls.now + PRELOAD_WINDOW
 
-            while appointments:
-                appointment = appointments.pop()
-                cls.cache.add(appointment)
+            cls.ready = Future()
+            cls.stopped = Event()
+            cls._instance = instance
 
+        if BACKGROUND_PRELOAD:
+            Thread(target=instance._warm_up, name="appointment-warm-up", daemon=True).start()
+        else:
+            instance._warm_up()
         return cls._instance
 
-    def has_overlap(self, appointment: Appointment) -> bool:
+    def _warm_up(self) -> None:
+        """
+        Αρχική φόρτωση του cache. Ολοκληρώνει το ready ακόμα κι αν αποτύχει, οπότε
+        το cache γεμίζει από την βάση δεδομένων όπως χρειάζεται.
+        """
+        start = perf_counter()
+        try:
+            with engine.connect() as connection:
+                self.max_id = connection.execute(select(func.max(Appointment.id))).scalar() or 0
+
+            # Το snapshot της προηγούμενης εκτέλεσης γεμίζει το cache χωρίς queries
+            if SNAPSHOT:
+                load_snapshot(self.cache)
+                atexit.register(self.shutdown)
+                if SNAPSHOT_INTERVAL > 0:
+                    Thread(target=self._save_periodically, name="cache-snapshot", daemon=True).start()
+
+            # Το αρχικό παράθυρο φορτώνεται με ένα query και δεν αποβάλλεται ποτέ από το cache.
+            # Εάν φορτώθηκε από το snapshot δεν γίνεται κανένα query
+            if PRELOAD_WINDOW > timedelta(0):
+                self.cache.pin(self.min_date, self.max_date)
+                self.cache.query_by_date(self.min_date, self.max_date)
+
+            # Διαβάζεται τώρα ώστε ο πρώτος έλεγχος overlap να μην χρειαστεί query
+            logger.log_debug(f"Longest appointment lasts {self.cache.max_duration}")
+        except Exception as e:
+            logger.log_error(f"Cache warm-up failed, periods will be loaded on demand: {e}")
+        finally:
+            self.warmup_ms = (perf_counter() - start) * 1000
+            logger.log_info(f"Appointment cache ready in {self.warmup_ms:.1f} ms")
+            self.ready.set_result(None)
+
+    @property
+    def is_ready(self) -> bool:
+        """
+        Returns:
+            bool: True εάν η αρχική φόρτωση του cache ολοκληρώθηκε
+        """
+        return self.ready.done()
+
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """
+        Περιμένει την αρχική φόρτωση του cache
+
+        Args:
+            timeout (float | None, optional): Μέγιστη αναμονή σε δευτερόλεπτα. Defaults to None.
+
+        Returns:
+            bool: True εάν η φόρτωση ολοκληρώθηκε
+        """
+        done, _ = wait([self.ready], timeout)
+        return bool(done)
+
+    def has_overlap(self, appointment: Appointment | AppointmentRecord) -> bool:
         """
-        Ελέγχει εάν η ημερομηνία ενός ραντεβού συμπίπτει με ήδη υπάρχοντα
+        Ελέγχει εάν η ημερομηνία ενός ραντεβού συμπίπτει με ήδη υπάρχοντα του ίδιου
+        εργαζόμενου. Οι υπόλοιποι εργαζόμενοι μπορούν να έχουν ραντεβού στην ίδια ώρα.
 
         Returns:
             bool: True εάν υπάρχει overlap, αλλιώς False
         """
-        for existing_appointment in self.cache.iter_date_range(appointment.date, appointment.end_date):
+        employee_id = appointment.employee_id or 0
+        for existing_appointment in self.cache.intersecting(appointment.date, appointment.end_date, employee_id):
             if existing_appointment.overlap(appointment):
                 return True
         return False
 
+    @serialized
     def add_appointment(self, appointment: Appointment) -> int:
         """
         Προσθήκη νέου ραντεβού στην βάση δεδομένων και ενημέρωση του cache
@@ -110,7 +223,6 @@ class AppointmentModel:
         Raises:
             DateOverlap: Εάν η ημερομηνία συμπίπτει με άλλη
             AppointmentDBError: Εάν κάτι πάει λάθος κατα την είσοδο στην βάση δεδομένων
-            SynchronizationDBError: Εάν ο μετρητής max_id δεν συμπίπτει με το max id στην βάση δεδομένων
 
         Returns:
             int: Το id του καινούριου ραντεβού
@@ -118,34 +230,181 @@ class AppointmentModel:
 
         logger.log_info(f"Excecuting creation of {appointment}")
 
+        self._apply_defaults(appointment)
         if self.has_overlap(appointment):
             raise DateOverlap(appointment)
 
-        # Προσθήκη στην βάση δεδομένων
+        # Προσθήκη στην βάση δεδομένων. Το RETURNING επιστρέφει την εγγραφή όπως
+        # αποθηκεύτηκε, χωρίς να ξαναδιαβαστεί, και το seq της αλλαγής της
+        statement = insert(Appointment).values(self._values(appointment)).returning(*RECORD_COLUMNS, CHANGE_SEQ)
         try:
-            self.session.add(appointment)
+            row = self.session.execute(statement).one()
             self.session.commit()
-            self.session.refresh(appointment)
-            self.max_id = appointment.id
-            logger.log_debug(f"Assigned id={self.max_id}")
         except DatabaseError as e:
             self.session.rollback()
             raise AppointmentDBError(appointment, e) from e
+        record = AppointmentRecord(*row[:-1])
 
-        # Έλεγχος ορθής λειτουργίας
-        appointment_with_id = self.session.query(Appointment).filter(Appointment.id == self.max_id).first()
-        if appointment_with_id is None:
-            raise SynchronizationDBError(appointment)
+        appointment.id = record.id
+        appointment.version = record.version
+        self.max_id = max(self.max_id, record.id)
+        logger.log_debug(f"Assigned id={record.id}")
 
         # Ενημέρωση του cache
-        if appointment_with_id:
-            self.cache.add(appointment_with_id)
+        self.cache.add(record)
+        for index in self._slot_indexes(record.employee_id):
+            index.add(record)
+        self.cache.acknowledge([row.change_seq])
 
         # Ενημέρωση των subscribers
-        self.update_subscribers()
+        self.update_subscribers(Change.of([record]))
 
         # Επιστροφή του μοναδικού id
-        return appointment_with_id.id
+        return record.id
+
+    @serialized
+    def add_appointments(self, appointments: Iterable[Appointment]) -> list[int]:
+        """
+        Μαζική προσθήκη ραντεβού. Ο έλεγχος για overlap γίνεται για όλα τα ραντεβού
+        μαζί, μεταξύ τους και με όσα υπάρχουν στην βάση δεδομένων, και η εισαγωγή σε
+        ένα transaction. Εάν ένα ραντεβού αποτύχει δεν προστίθεται κανένα.
+
+        Args:
+            appointments (Iterable[Appointment]): Τα καινούρια ραντεβού. Δεν πρέπει να έχουν id
+
+        Raises:
+            AppointmentIdAlreadyExists: Εάν κάποιο ραντεβού έχει id
+            DateOverlap: Εάν η ημερομηνία κάποιου ραντεβού συμπίπτει με άλλη
+            AppointmentDBError: Εάν κάτι πάει λάθος κατα την είσοδο στην βάση δεδομένων
+
+        Returns:
+            list[int]: Τα id των καινούριων ραντεβού, με την σειρά που δόθηκαν
+        """
+        appointments = list(appointments)
+        logger.log_info(f"Excecuting creation of {len(appointments)} appointments")
+        if not appointments:
+            return []
+
+        for appointment in appointments:
+            if appointment.id is not None:
+                raise AppointmentIdAlreadyExists(appointment)
+            self._apply_defaults(appointment)
+
+        batch = sorted(appointments, key=by_date)
+        conflict = self._find_batch_overlap(batch)
+        if conflict is not None:
+            raise DateOverlap(conflict)
+
+        # Με sort_by_parameter_order τα ids επιστρέφονται με την σειρά των γραμμών
+        statement = insert(Appointment).returning(Appointment.id, CHANGE_SEQ, sort_by_parameter_order=True)
+        rows = [self._values(appointment) for appointment in batch]
+        try:
+            result = self.session.execute(statement, rows).all()
+            self.session.commit()
+        except DatabaseError as e:
+            self.session.rollback()
+            raise AppointmentDBError(batch[0], e) from e
+
+        ids = [row.id for row in result]
+        for appointment, id_ in zip(batch, ids):
+            appointment.id = id_
+        self.max_id = max(self.max_id, *ids)
+        logger.log_debug(f"Assigned ids {ids[0]}..{ids[-1]}")
+
+        # Ενημέρωση του cache μια φορά για όλα τα ραντεβού
+        records = [AppointmentRecord.from_appointment(appointment) for appointment in batch]
+        self.cache.add_many(records)
+        for employee_id, group in self._by_employee(records).items():
+            for index in self._slot_indexes(employee_id):
+                index.load(group)
+        self.cache.acknowledge(row.change_seq for row in result)
+
+        # Ενημέρωση των subscribers
+        self.update_subscribers(Change.of(records))
+        return [appointment.id for appointment in appointments]
+
+    @staticmethod
+    def _apply_defaults(appointment: Appointment) -> None:
+        """
+        Συμπληρώνει τις τιμές που το ORM θα όριζε κατα την εισαγωγή, επειδή οι εγγραφές
+        γίνονται με απευθείας statements
+        """
+        if appointment.duration is None:
+            appointment.duration = DEFAULT_DURATION
+        if appointment.employee_id is None:
+            appointment.employee_id = 0
+        if appointment.is_alerted is None:
+            appointment.is_alerted = False
+
+    @staticmethod
+    def _values(appointment: Appointment | AppointmentRecord) -> dict[str, Any]:
+        return {
+            "date": appointment.date,
+            "duration": appointment.duration,
+            "customer_id": appointment.customer_id,
+            "employee_id": appointment.employee_id or 0,
+            "is_alerted": bool(appointment.is_alerted),
+        }
+
+    @staticmethod
+    def _by_employee(appointments: Iterable[T]) -> dict[int, list[T]]:
+        """
+        Χωρίζει τα ραντεβού ανα εργαζόμενο, κρατώντας την σειρά τους
+        """
+        groups: dict[int, list[T]] = defaultdict(list)
+        for appointment in appointments:
+            groups[appointment.employee_id or 0].append(appointment)  # type: ignore
+        return groups
+
+    def _find_batch_overlap(self, batch: list[Appointment]) -> Appointment | None:
+        """
+        Ελέγχει εάν τα ταξινομημένα ραντεβού του batch συμπίπτουν μεταξύ τους ή με όσα
+        υπάρχουν στην βάση δεδομένων, με ένα πέρασμα για κάθε εργαζόμενο. Τα υπάρχοντα
+        φορτώνονται από την βάση δεδομένων, μαζί με όσα ξεκινούν πριν το batch και
+        συνεχίζονται μέσα του.
+
+        Returns:
+            Appointment | None: Ένα ραντεβού του batch που συμπίπτει με άλλο
+        """
+        end = max(appointment.end_date for appointment in batch)
+        existing = self._by_employee(query_overlapping(batch[0].date, end))
+
+        for employee_id, group in self._by_employee(batch).items():
+            conflict = self._find_sorted_overlap(group, existing.get(employee_id, []))
+            if conflict is not None:
+                return conflict
+        return None
+
+    @staticmethod
+    def _find_sorted_overlap(batch: list[Appointment], existing: list[AppointmentRecord]) -> Appointment | None:
+        """
+        Ένα πέρασμα πάνω στα ταξινομημένα ραντεβού ενός εργαζόμενου, νέα και υπάρχοντα
+
+        Returns:
+            Appointment | None: Το πρώτο ραντεβού του batch που συμπίπτει με άλλο
+        """
+        # Για την ίδια ημερομηνία τα υπάρχοντα ραντεβού έρχονται πρώτα
+        entries = merge(
+            ((appointment.date, 0, appointment) for appointment in existing),
+            ((appointment.date, 1, appointment) for appointment in batch),
+            key=lambda entry: entry[:2],
+        )
+
+        # Το μεγαλύτερο τέλος μέχρι τώρα, ξεχωριστά για το batch και τα υπάρχοντα
+        batch_until = existing_until = datetime.min
+        latest = None
+        for date, is_new, appointment in entries:
+            if is_new:
+                if date < batch_until or date < existing_until:
+                    return appointment
+                if appointment.end_date > batch_until:
+                    batch_until = appointment.end_date
+                    latest = appointment
+            else:
+                if date < batch_until:
+                    return latest
+                existing_until = max(existing_until, appointment.end_date)
+        return None
 
     def is_similar(self, appointment1: Appointment, appointment2: Appointment):
         """
@@ -167,21 +426,26 @@ class AppointmentModel:
             )
         )
 
-    def update_appointment(self, appointment: Appointment, customer_id: int | None = None) -> bool:
+    @serialized
+    def update_appointment(self, appointment: Appointment | AppointmentRecord, customer_id: int | None = None) -> bool:
         """
         Ενημέρωση στοιχείων ραντεβού στην βάση δεδομένων και ενημέρωση cache
 
         Επιβάλλει να υπάρχει id στο ραντεβού προς ενημέρωση αλλιώς επιστρέφει στάλμα. Εάν η ημερομηνία συμπίπτει
         με άλλο ραντεβού επιστρέφει σφάλμα. Επιστρέφει μόνο True εάν όλα πάνε καλά.
 
+        Εάν το ραντεβού έχει version, η ενημέρωση γίνεται μόνο εάν δεν έχει αλλάξει στο μεταξύ
+        στην βάση δεδομένων.
+
         Args:
-            appointment (Appointment): Ραντεβού προς αλλαγή
+            appointment (Appointment | AppointmentRecord): Ραντεβού προς αλλαγή
             customer_id (int | None, optional): Id του πελάτη θα σχετιστεί με το ραντεβού. Defaults to None.
 
         Raises:
             DateOverlap: Εάν η ημερομηνία συμπίπτει με άλλη
             IdMissing: Εάν το ραντεβού προς αλλαγή δεν έχει id
             IdNotFoundInDB: Εάν το id του ραντεβού προς αλλαγή δεν υπάρχει στην βάση δεδομένων
+            WrongAppointment: Εάν το ραντεβού έχει αλλάξει στην βάση δεδομένων από άλλον
             AppointmentDBError: Εάν υπάρξει κάποιο σφάλμα κατα την επεξεργασία στην βάση δεδομένων
 
         Returns:
@@ -196,43 +460,61 @@ class AppointmentModel:
         if appointment.id is None:
             raise IdMissing(appointment)
 
-        try:
-            (
-                session.query(Appointment)
-                .filter_by(id=appointment.id)
-                .update(
-                    {
-                        Appointment.date: appointment.date,
-                        Appointment.duration: appointment.duration,
-                        Appointment.customer_id: appointment.customer_id,
-                        Appointment.employee_id: appointment.employee_id,
-                        Appointment.is_alerted: appointment.is_alerted,
-                    }
-                )
-            )
-            session.commit()
-            appointment = session.merge(appointment, load=True)
+        # Η παλιά θέση του ραντεβού, για την ειδοποίηση των subscribers που την δείχνουν
+        previous = self.cache.appointments.get(appointment.id)
 
+        values = self._values(appointment)
+        if customer_id is not None:
+            values["customer_id"] = customer_id
+
+        condition = [Appointment.id == appointment.id]
+        if appointment.version is not None:
+            condition.append(Appointment.version == appointment.version)
+
+        statement = (
+            update(Appointment)
+            .where(*condition)
+            .values({**values, "version": Appointment.version + 1})
+            .returning(*RECORD_COLUMNS, CHANGE_SEQ)
+        )
+        try:
+            row = self.session.execute(statement).one_or_none()
+            if row is None:
+                self.session.rollback()
+                raise self._write_conflict(appointment)
+            self.session.commit()
         except DatabaseError as e:
             self.session.rollback()
             raise AppointmentDBError(appointment, e) from e
+        record = AppointmentRecord(*row[:-1])
 
         # Ενημέρωση του cache
-        self.cache.update(appointment)
+        self.cache.update(record)
+        # Το ραντεβού μπορεί να άλλαξε εργαζόμενο
+        for employee_id, index in self.slots.items():
+            if employee_id is None or employee_id == record.employee_id:
+                index.add(record)
+            else:
+                index.remove(record.id)
+        self.cache.acknowledge([row.change_seq])
 
         # Ενημέρωση των subscribers
-        self.update_subscribers()
+        change = Change.of([record])
+        change = change.merge(Change.of([previous]) if previous is not None else Change.everything())
+        self.update_subscribers(change)
         return True
 
-    def delete_appointment(self, appointment: Appointment) -> bool:
+    @serialized
+    def delete_appointment(self, appointment: Appointment | AppointmentRecord) -> bool:
         """
         Διαγραφή ενός ραντεβού από την βάση δεδομένων και ενημέρωση cache.
 
-        Ενημερώνει το τρέχων μέγιστο id για πιο γρήγορη προσθήκη νέων ραντεβού.
-        Επιβάλλει στο ραντεβού προς διαγραφή να έχει id.
+        Επιβάλλει στο ραντεβού προς διαγραφή να έχει id. Εάν το ραντεβού έχει version,
+        διαγράφεται μόνο εάν δεν έχει αλλάξει στην βάση δεδομένων, αλλιώς μόνο εάν
+        η ημερομηνία, η διάρκεια και η ειδοποίηση είναι ίδιες.
 
         Args:
-            appointment (Appointment): Το ραντεβού προς διαγραφή
+            appointment (Appointment | AppointmentRecord): Το ραντεβού προς διαγραφή
 
         Raises:
             IdMissing: Εάν το ραντεβού δεν έχει id
@@ -250,45 +532,128 @@ class AppointmentModel:
         if appointment.id is None:
             raise IdMissing(appointment)
 
-        # Εύρεση του ραντεβού στην βάση δεδομένων για επιβεβαίωση του id και
-        # σύνδεση με την sqlalchemy
-        appointment_to_delete = self.get_appointment_by_id(appointment.id)
-        if appointment_to_delete is None:
-            raise IdNotFoundInDB(appointment)
-
-        if not self.is_similar(appointment, appointment_to_delete):
-            raise WrongAppointment(appointment)
-
-        # Διαγραφή του στοιχείου από την βάση δεδομένων
+        # Ο έλεγχος των στοιχείων γίνεται μέσα στο ίδιο το DELETE
+        condition = [Appointment.id == appointment.id]
+        if appointment.version is not None:
+            condition.append(Appointment.version == appointment.version)
+        else:
+            condition += [
+                Appointment.date == appointment.date,
+                Appointment.duration == appointment.duration,
+                Appointment.is_alerted == bool(appointment.is_alerted),
+            ]
+
+        statement = delete(Appointment).where(*condition).returning(*RECORD_COLUMNS, CHANGE_SEQ)
         try:
-            self.session.delete(appointment_to_delete)
+            row = self.session.execute(statement).one_or_none()
+            if row is None:
+                self.session.rollback()
+                raise self._write_conflict(appointment)
             self.session.commit()
         except DatabaseError as e:
             self.session.rollback()
             raise AppointmentDBError(appointment, e) from e
 
         # Ενημέρωση του cache
-        self.cache.delete(appointment_to_delete)
-        self.max_id = self._find_max_id()
+        self.cache.delete(appointment)
+        for index in self.slots.values():
+            index.remove(appointment.id)
+        self.cache.acknowledge([row.change_seq])
 
         # Ενημέρωση των subscribers
-        self.update_subscribers()
+        self.update_subscribers(Change.of([AppointmentRecord(*row[:-1])]))
         return True
 
-    def get_appointments(self) -> dict[int, list[Appointment]]:
+    def _write_conflict(self, appointment: Appointment | AppointmentRecord) -> Exception:
         """
-        Επιστρέφει όλα τα ραντεβού που είναι αποθηκευμένα στο cache
+        Ένα UPDATE ή DELETE δεν βρήκε γραμμή. Ελέγχει εάν το ραντεβού δεν υπάρχει ή
+        έχει αλλάξει από άλλον. Εκτελείται μόνο σε αποτυχία.
+        """
+        if self.session.query(Appointment.id).filter(Appointment.id == appointment.id).first() is None:
+            return IdNotFoundInDB(appointment)
+        return WrongAppointment(appointment)
+
+    def get_appointments(self) -> dict[int, list[AppointmentRecord]]:
+        """
+        Επιστρέφει αντίγραφο όλων των ραντεβού που είναι αποθηκευμένα στο cache
 
         Σημαντικό, η συνάρτηση δεν κάνει αναζήτηση στην βάση δεδομένων. Για γενικές αναζητήσεις
         χρησιμοποίησε μια από τις άλλες get συναρτήσεις.
 
         Returns:
-            dict[int, list[Appointment]]: Dictionary με τα ραντεβού χωρισμένα ανα περίοδο, με 0
+            dict[int, list[AppointmentRecord]]: Dictionary με τα ραντεβού χωρισμένα ανα περίοδο, με 0
             την αρχή της σημερινής μέρας. Η περίοδος ορίζεται στο settings.json και είναι το αποτέλεσμα
             της πράξης working_hours / rows
         """
         logger.log_debug("Excecuting query of cached appointments")
-        return self.cache.data
+        return self.cache.copy()
+
+    def get_cache_stats(self) -> dict[str, Any]:
+        """
+        Μετρητές λειτουργίας του cache. Hits, misses, queries φόρτωσης, αποβολές,
+        πλήθος περιόδων και ραντεβού και ιστογράμματα καθυστέρησης ανα λειτουργία.
+
+        Returns:
+            dict[str, Any]: Οι μετρητές σε JSON-compatible μορφή
+        """
+        logger.log_debug("Excecuting query of cache statistics")
+        return {**self.cache.get_stats(), "ready": self.is_ready, "warmup_ms": self.warmup_ms}
+
+    def reset_cache_stats(self) -> None:
+        """
+        Μηδενίζει τους μετρητές hits/misses/fills και τα ιστογράμματα του cache
+        """
+        self.cache.stats.reset()
+
+    def save_snapshot(self) -> int:
+        """
+        Αποθηκεύει το cache στο αρχείο snapshot ώστε η επόμενη εκκίνηση να μην
+        χρειάζεται να το ξαναγεμίσει από την βάση δεδομένων
+
+        Returns:
+            int: Πλήθος ραντεβού που αποθηκεύτηκαν
+        """
+        logger.log_info("Excecuting save of cache snapshot")
+        try:
+            return save_snapshot(self.cache)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Χωρίς snapshot η επόμενη εκκίνηση απλά γεμίζει το cache από την βάση δεδομένων
+            logger.log_error(f"Failed to save cache snapshot: {e}")
+            return 0
+
+    def _save_periodically(self) -> None:
+        """
+        Αποθηκεύει το snapshot κάθε SNAPSHOT_INTERVAL δευτερόλεπτα μέχρι την shutdown, ώστε
+        μετά από ένα crash η επόμενη εκκίνηση να βρίσκει ένα πρόσφατο snapshot
+        """
+        while not self.stopped.wait(SNAPSHOT_INTERVAL):
+            self.save_snapshot()
+
+    def shutdown(self) -> None:
+        """
+        Σταματάει την περιοδική αποθήκευση και αποθηκεύει το snapshot για την επόμενη
+        εκκίνηση. Καλείται όταν κλείνει το GUI ή ο server και από το atexit, οπότε μόνο
+        η πρώτη κλήση αποθηκεύει.
+        """
+        with self.init_lock:
+            if self.stopped.is_set():
+                return
+            self.stopped.set()
+        if SNAPSHOT:
+            self.save_snapshot()
+
+    def get_customer(self, customer_id: int) -> Customer | None:
+        """
+        Εύρεση του πελάτη ενός ραντεβού. Χρησιμοποιείται από τα AppointmentRecord
+        του cache. Δεν κάνει query εάν ο πελάτης υπάρχει ήδη στο session.
+
+        Args:
+            customer_id (int): Id του πελάτη
+
+        Returns:
+            Customer | None
+        """
+        return self.session.get(Customer, customer_id)
 
     def get_appointment_by_id(self, appointment_id: int) -> Appointment | None:
         """
@@ -303,71 +668,211 @@ class AppointmentModel:
         logger.log_debug(f"Excecuting query of appointment by id={appointment_id}")
         return self.session.query(Appointment).filter_by(id=appointment_id).first()
 
-    def get_appointment_by_date(self, date: datetime) -> Appointment | None:
+    def get_appointment_by_date(self, date: datetime, employee_id: int | None = None) -> Appointment | None:
         """
         Εύρεση ραντεβού με βάση την ημερομηνία
 
         Args:
             date (datetime): Ημερομηνία προς αναζήτηση
+            employee_id (int | None, optional): Ο εργαζόμενος. Defaults to None, όπου
+            επιστρέφεται το ραντεβού οποιουδήποτε εργαζόμενου.
 
         Returns:
             Appointment | None: Το ραντεβού ή None αν δεν υπάρχει
         """
-        logger.log_debug(f"Excecuting query of appointment by {date=}")
-        return self.session.query(Appointment).filter_by(date=date).first()
-
-    def get_appointments_from_to_date(self, from_date: datetime, to_date: datetime) -> list[Appointment]:
+        logger.log_debug(f"Excecuting query of appointment by {date=}, {employee_id=}")
+        query = self.session.query(Appointment).filter_by(date=date)
+        if employee_id is not None:
+            query = query.filter_by(employee_id=employee_id)
+        return query.order_by(Appointment.employee_id).first()
+
+    def get_appointments_from_to_date(
+        self, from_date: datetime, to_date: datetime, employee_id: int | None = None
+    ) -> list[AppointmentRecord]:
         """
-        Εύρεση ραντεβού μεταξύ ημερομηνιών.
+        Εύρεση ραντεβού μεταξύ ημερομηνιών μέσω του cache. Οι περίοδοι που υπάρχουν ήδη
+        στο cache δεν χρειάζονται query, ενώ όσες λείπουν φορτώνονται με ένα query και
+        μένουν στο cache για τις επόμενες κλήσεις.
+
+        Διαστήματα μεγαλύτερα από την χωρητικότητα του cache διαβάζονται απευθείας από
+        την βάση δεδομένων, ώστε να μην αποβάλουν όλο το περιεχόμενο του. Το ίδιο και
+        όσο το cache δεν έχει ολοκληρώσει την αρχική φόρτωση του.
 
         Args:
             from_date (datetime): Αρχή της περιόδου
             to_date (datetime): Τέλος της περιόδου
+            employee_id (int | None, optional): Μόνο τα ραντεβού του εργαζόμενου. Defaults to None.
 
         Returns:
-            list[Appointment]: Λίστα με τα ραντεβού. Επιστρέφει άδεια λίστα εαν δεν υπάρχουν αποτελέσματα
+            list[AppointmentRecord]: Λίστα με τα ραντεβού ταξινομημένα με βάση την ημερομηνία.
+            Επιστρέφει άδεια λίστα εαν δεν υπάρχουν αποτελέσματα
         """
         logger.log_debug(f"Excecuting query of appointment from {str(from_date)} to {str(to_date)}")
-        result = self.session.query(Appointment).filter(Appointment.date >= from_date, Appointment.date < to_date).all()
+        if to_date <= from_date:
+            return []
+
+        # Το to_date δεν περιλαμβάνεται, οπότε όταν πέφτει σε αρχή περιόδου αυτή δεν χρειάζεται
+        last_date = to_date - timedelta.resolution
+        if not self.is_ready or 0 < MAX_BUCKETS < self.cache.hash(last_date) - self.cache.hash(from_date) + 1:
+            return sorted(query_records([(from_date, to_date)], employee_id), key=by_date)
+
+        return [
+            appointment
+            for appointment in self.cache.iter_date_range(from_date, last_date, employee_id)
+            if from_date <= appointment.date < to_date
+        ]
 
-        return result
+    def sync_external_changes(self) -> bool:
+        """
+        Ελέγχει εάν κάποια άλλη διεργασία (πχ ο web server) άλλαξε ραντεβού στην
+        βάση δεδομένων. Εάν ναι, ακυρώνει τις σχετικές περιόδους του cache και
+        ενημερώνει τους subscribers.
+
+        Returns:
+            bool: True εάν βρέθηκαν αλλαγές
+        """
+        # Η αρχική φόρτωση εφαρμόζει μόνη της τις αλλαγές μετά το snapshot
+        if not self.is_ready:
+            return False
+        self.cache.sync(force=True)
+        changes = self.cache.drain_changes()
+        if changes is None:
+            return False
+        self.events.publish(changes)
+        return True
+
+    def prefetch(self, from_date: datetime, to_date: datetime) -> None:
+        """
+        Φορτώνει στο cache τα ραντεβού μεταξύ ημερομηνιών σε δεύτερο thread,
+        χωρίς να περιμένει το αποτέλεσμα.
+
+        Args:
+            from_date (datetime): Αρχή της περιόδου
+            to_date (datetime): Τέλος της περιόδου
+        """
+        logger.log_debug(f"Excecuting prefetch of appointments from {str(from_date)} to {str(to_date)}")
+        self.cache.prefetch(from_date, to_date)
 
     def get_time_between_appointments(
         self,
-        start_date: datetime = datetime.now(),
-        end_date: datetime = datetime.now() + timedelta(days=1),
+        start_date: datetime | None = None,
+        end_date: datetime | None = None,
         minumum_free_period: timedelta = PERIOD,
+        working_hours_only: bool = True,
+        strategy: str | None = None,
+        employee_id: int | None = None,
     ) -> list[tuple[datetime, timedelta]]:
         """
-        Συνάρτηση αναζήτησης κενού χρόνου μεταξύ των ραντεβού.
-        """
-        logger.log_debug("Excecuting calculation of time between appointments")
+        Συνάρτηση αναζήτησης κενού χρόνου μεταξύ των ραντεβού, δες rantevou.src.model.gaps
 
-        result_date: list[datetime] = [start_date]
-        result_duration: list[timedelta] = []
+        Με employee_id τα κενά αφορούν το ημερολόγιο ενός εργαζόμενου και διαβάζονται μόνο
+        τα δικά του ραντεβού. Χωρίς, είναι οι χρόνοι που κανένας εργαζόμενος δεν έχει ραντεβού.
 
-        for appointment in self.cache.iter_date_range(start_date, end_date):
+        Με την στρατηγική "cache" τα κενά υπολογίζονται με NumPy πάνω στα ραντεβού του
+        cache, ενώ με την "sql" υπολογίζονται μέσα στο SQLite και δεν φορτώνεται κανένα
+        ραντεβού. Η "sql" προτιμάται για μεγάλα διαστήματα που δεν χωράνε στο cache.
 
-            # Αγνοεί τα ραντεβού πριν και μετά την ημερομηνία που θέλει ο χρηστης
-            if appointment.end_date < start_date:
-                continue
+        Args:
+            start_date (datetime | None, optional): Αρχή της αναζήτησης. Defaults to τώρα.
+            end_date (datetime | None, optional): Τέλος της αναζήτησης. Defaults to μια μέρα μετά.
+            minumum_free_period (timedelta, optional): Ελάχιστη διάρκεια κενού. Defaults to PERIOD.
+            working_hours_only (bool, optional): Περιορίζει τα κενά στο ωράριο λειτουργίας,
+            ένα κενό ανα μέρα. Defaults to True.
+            strategy (str | None, optional): "cache" ή "sql". Defaults to το gap_strategy των ρυθμίσεων.
+            employee_id (int | None, optional): Ο εργαζόμενος. Defaults to None.
 
-            if appointment.date >= end_date:
-                break
+        Raises:
+            ValueError: Εάν η στρατηγική δεν υπάρχει
 
-            previous_date = result_date[-1]
-            next_date = appointment.date
-            diff = next_date - previous_date
+        Returns:
+            list[tuple[datetime, timedelta]]: Αρχή και διάρκεια κάθε κενού με χρονολογική σειρά
+        """
+        strategy = strategy or self.gap_strategy
+        logger.log_debug(f"Excecuting calculation of time between appointments with {strategy=}")
+        if start_date is None:
+            start_date = datetime.now()
+        if end_date is None:
+            end_date = start_date + timedelta(days=1)
+
+        # Ραντεβού που ξεκινούν πριν το start_date μπορεί να συνεχίζονται μέσα στο διάστημα,
+        # το πολύ όσο το μεγαλύτερο ραντεβού της βάσης δεδομένων
+        lookbehind = max(self.cache.max_duration, PERIOD)
+
+        if strategy == "cache":
+            appointments = self.get_appointments_from_to_date(start_date - lookbehind, end_date, employee_id)
+            starts, ends = gaps.to_arrays(appointments)
+            gap_starts, gap_ends = gaps.find_gaps(starts, ends, start_date, end_date, minumum_free_period)
+        elif strategy == "sql":
+            gap_starts, gap_ends = gaps.query_gaps(
+                start_date, end_date, minumum_free_period, lookbehind, employee_id=employee_id
+            )
+        else:
+            raise ValueError(f"Unknown gap strategy {strategy!r}, expected one of {GAP_STRATEGIES}")
 
-            if diff < minumum_free_period:
-                result_date[-1] = appointment.end_date
-                continue
+        if working_hours_only:
+            gap_starts, gap_ends = gaps.clip_to_working_hours(gap_starts, gap_ends, minumum_free_period)
+        return gaps.to_list(gap_starts, gap_ends)
 
-            if diff >= minumum_free_period:
-                result_date.append(appointment.end_date)
-                result_duration.append(diff)
+    def find_free_slot(
+        self, after: datetime | None = None, duration: timedelta = PERIOD, employee_id: int | None = None
+    ) -> tuple[datetime, timedelta] | None:
+        """
+        Εύρεση του πρώτου κενού διάρκειας τουλάχιστον duration μετά το after, μέσα στο
+        ωράριο λειτουργίας, στο ημερολόγιο ενός εργαζόμενου. Χρησιμοποιεί ένα FreeSlotIndex
+        ανα εργαζόμενο, που χτίζεται με την πρώτη αναζήτηση μόνο από τα δικά του ραντεβού
+        και μετά ενημερώνεται από τις add/update/delete_appointment.
 
-        return [*zip(result_date, result_duration)]
+        Args:
+            after (datetime | None, optional): Αρχή της αναζήτησης. Defaults to τώρα.
+            duration (timedelta, optional): Ελάχιστη διάρκεια του κενού. Defaults to PERIOD.
+            employee_id (int | None, optional): Ο εργαζόμενος. Defaults to None, όπου το
+            κενό είναι χρόνος που κανένας εργαζόμενος δεν έχει ραντεβού, όπως στην get_time_between_appointments.
+
+        Returns:
+            tuple[datetime, timedelta] | None: Αρχή και συνολική διάρκεια του κενού ή None
+            εάν δεν υπάρχει μέσα στις slot_index_days μέρες του ευρετηρίου
+        """
+        logger.log_debug(f"Excecuting search of first free slot of {duration} after {after} for {employee_id=}")
+        if after is None:
+            after = datetime.now()
+
+        if self.is_ready:
+            self.cache.sync()
+        return self._get_slot_index(after, employee_id).find(after, duration)
+
+    def _slot_indexes(self, employee_id: int) -> list[FreeSlotIndex]:
+        """
+        Τα ευρετήρια που αλλάζουν με ένα ραντεβού του εργαζόμενου, το δικό του και αυτό όλων
+        των εργαζομένων
+        """
+        return [index for key, index in self.slots.items() if key is None or key == employee_id]
+
+    def _get_slot_index(self, after: datetime, employee_id: int | None) -> FreeSlotIndex:
+        """
+        Επιστρέφει το FreeSlotIndex του εργαζόμενου, χτίζοντας το ξανά εάν δεν καλύπτει
+        το after. Εάν άλλη διεργασία άλλαξε ραντεβού, ξαναχτίζονται όλα.
+        """
+        index = self.slots.get(employee_id)
+        if index is not None and index.covers(after) and self.slots_applied == self.cache.watcher.applied:
+            return index
+
+        # Με το write_lock καμία εγγραφή δεν χάνεται ανάμεσα στο query και την δημοσίευση
+        with self.write_lock:
+            # Τα ευρετήρια δεν εξαρτώνται από τις φορτωμένες περιόδους, οπότε κάθε αλλαγή μετράει
+            applied = self.cache.watcher.applied
+            if self.slots_applied != applied:
+                self.slots = {}
+                self.slots_applied = applied
+            index = self.slots.get(employee_id)
+            if index is not None and index.covers(after):
+                return index
+
+            logger.log_info(f"Building free slot index of employee {employee_id} from {after.date()}")
+            index = FreeSlotIndex(after.replace(hour=0, minute=0, second=0, microsecond=0))
+            lookbehind = max(self.cache.max_duration, PERIOD)
+            index.load(query_records([(index.start - lookbehind, index.end)], employee_id))
+            self.slots = {**self.slots, employee_id: index}
+            return index
 
     def add_subscriber(self, subscriber: SubscriberInterface):
         """
@@ -376,7 +881,7 @@ class AppointmentModel:
         Args:
             subscriber (SubscriberInterface): Το αντικείμενο που θέλει να παίρνει ενημερώσεις απο
             το μοντέλο. Συνήθως τα στοιχεία GUI. Πρέπει να υλοποιεί την διεπαφή SubscriberInterface,
-            δηλαδή να έχει μέθοδο .subscriber_update.
+            δηλαδή να έχει μέθοδο .subscriber_update που δέχεται ένα Change.
 
         Raises:
             NoSubscriberInterface: Εάν το αντικείμενο δεν εφαρμόζει την διεπαφή SubscriberInterface
@@ -387,25 +892,49 @@ class AppointmentModel:
             raise NoSubscriberInterface(subscriber)
 
         logger.log_debug(f"Adding {subscriber=}")
-        self.subscribers.append(subscriber)
+        self.events.subscribe(subscriber)
 
-    def update_subscribers(self):
+    def remove_subscriber(self, subscriber: SubscriberInterface) -> bool:
         """
-        Ενημέρωση των δηλωμένων subscriber.
+        Αφαιρεί τον subscriber από την λίστα προς ενημέρωση. Οι subscribers που δεν
+        υπάρχουν πλέον αφαιρούνται και αυτόματα.
 
-        Να καλείται όταν γίνεται κάποια μετατροπή στην βάση δεδομένων.
+        Returns:
+            bool: True εάν ο subscriber ήταν δηλωμένος
         """
-        logger.log_info(f"Excecuting notification of {len(self.subscribers)} subscribers")
-        for subscriber in self.subscribers:
-            logger.log_debug(str(subscriber))
-            subscriber.subscriber_update()
+        logger.log_debug(f"Removing {subscriber=}")
+        return self.events.unsubscribe(subscriber)
 
-    def _find_max_id(self) -> int:
+    def get_subscriber_stats(self) -> dict[str, Any]:
         """
-        Ψάχνει το μέγιστο id στο Appointment table για λόγους συγχρονισμού με το cache
+        Returns:
+            dict[str, Any]: Πλήθος subscribers και χρόνοι των ειδοποιήσεων
         """
-        logger.log_debug("Executing recalculation of maximum id")
-        result = self.session.query(func.max(Appointment.id)).scalar()
-        if result is None:
-            return 0
-        return result
+        return self.subscribers.get_stats()
+
+    def set_notification_scheduler(self, scheduler: Callable[[Callable[[], None]], Any] | None) -> None:
+        """
+        Ορίζει πότε ειδοποιούνται οι subscribers. Οι αλλαγές μέχρι να τρέξει ο scheduler
+        ενώνονται σε μια ειδοποίηση. Δες rantevou.src.model.events.EventBus
+
+        Args:
+            scheduler (Callable | None): Πχ το after_idle του Tk. None για άμεση ειδοποίηση
+        """
+        self.events.set_scheduler(scheduler)
+
+    def update_subscribers(self, change: Change | None = None):
+        """
+        Ενημέρωση των δηλωμένων subscriber.
+
+        Να καλείται όταν γίνεται κάποια μετατροπή στην βάση δεδομένων. Οι αλλαγές άλλων
+        διεργασιών που εφαρμόστηκαν στο μεταξύ στο cache προστίθενται στην ίδια ειδοποίηση.
+
+        Args:
+            change (Change | None, optional): Τα ραντεβού που άλλαξαν. None εάν δεν είναι
+            γνωστά, οπότε ενημερώνονται όλοι. Defaults to None.
+        """
+        change = change or Change.everything()
+        external = self.cache.drain_changes()
+        if external is not None:
+            change = change.merge(external)
+        self.events.publish(change)
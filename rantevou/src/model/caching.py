@@ -1,6 +1,23 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Generator
-from .entities import Appointment
+from functools import wraps
+from heapq import merge
+from operator import attrgetter
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Generator, Iterable, Iterator, TypeVar
+from sqlalchemy import Engine, and_, func, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.util import identity_key
+
+from .entities import Appointment, AppointmentRecord
+from .session import engine
+from .coherency import ChangeWatcher
+from .events import Change
+from .locking import ReadWriteLock
+from .metrics import LatencyHistogram
 from ..controller.logging import Logger
 from ..controller import get_config
 
@@ -10,75 +27,591 @@ __hours = config["view_settings"]["working_hours"]
 __rows = config["view_settings"]["rows"]
 PERIOD = timedelta(hours=int(__hours // __rows))
 
+# Όρια μνήμης του cache. Το 0 απενεργοποιεί το αντίστοιχο όριο.
+MAX_BUCKETS = int(config["cache_settings"]["max_buckets"])
+MAX_BYTES = int(config["cache_settings"]["max_bytes"])
+
+# Προσεγγιστικό κόστος μνήμης ανα περίοδο και ανα ραντεβού (AppointmentRecord, datetime,
+# θέσεις στα ευρετήρια), για τον υπολογισμό του max_bytes
+BUCKET_SIZE = 200
+APPOINTMENT_SIZE = 300
+
+# Μέγιστο πλήθος διαστημάτων σε ένα query. Πέρα από αυτό ένα μόνο διάστημα καλύπτει όλες
+# τις περιόδους που λείπουν, ώστε το query να μην ξεπεράσει το όριο βάθους του SQLite
+MAX_RANGES = 64
+# Φορές που η fill διαβάζει την βάση δεδομένων χωρίς κλείδωμα, πριν την διαβάσει με κλείδωμα εγγραφής
+FILL_ATTEMPTS = 3
+
+by_date = attrgetter("date")
+T = TypeVar("T")
+
+
+RECORD_COLUMNS = (
+    Appointment.id,
+    Appointment.date,
+    Appointment.duration,
+    Appointment.customer_id,
+    Appointment.employee_id,
+    Appointment.is_alerted,
+    Appointment.version,
+)
+
+
+def query_records(
+    ranges: Iterable[tuple[datetime, datetime]], employee_id: int | None = None
+) -> list[AppointmentRecord]:
+    """
+    Διαβάζει τα ραντεβού στα διαστήματα [start, end) απευθείας ως AppointmentRecord, χωρίς
+    να δημιουργήσει αντικείμενα ORM ή να φορτώσει τους πελάτες τους. Όλα τα διαστήματα
+    καλύπτονται από ένα μόνο query. Με employee_id διαβάζονται μόνο τα ραντεβού του
+    εργαζόμενου, μέσω του ευρετηρίου (employee_id, date).
+
+    Χρησιμοποιεί δική της σύνδεση που επιστρέφει αμέσως στο pool, ώστε να μην μένει
+    ανοιχτό read transaction που θα εμπόδιζε τις εγγραφές των άλλων threads.
+    """
+    condition = or_(*(and_(Appointment.date >= start, Appointment.date < end) for start, end in ranges))
+    statement = select(*RECORD_COLUMNS).where(condition)
+    if employee_id is not None:
+        statement = statement.where(Appointment.employee_id == employee_id)
+    with engine.connect() as connection:
+        return [AppointmentRecord(*row) for row in connection.execute(statement)]
+
+
+MAX_DURATION = select(func.max(Appointment.duration))
+
+
+def query_max_duration(bind: Engine = engine) -> timedelta:
+    """
+    Returns:
+        timedelta: Η μεγαλύτερη διάρκεια ραντεβού στην βάση δεδομένων. Ένα ραντεβού τέμνει το
+        [start, end) μόνο εάν ξεκινάει μετά το start - max_duration
+    """
+    with bind.connect() as connection:
+        return connection.execute(MAX_DURATION).scalar() or timedelta(0)
+
+
+def query_overlapping(start: datetime, end: datetime) -> list[AppointmentRecord]:
+    """
+    Διαβάζει τα ραντεβού που τέμνουν το [start, end), μαζί με όσα ξεκινούν πριν το start
+    και συνεχίζονται μέσα του. Δεν βασίζεται στο cache, οπότε βρίσκει και ραντεβού άλλων
+    διεργασιών που δεν έχουν εφαρμοστεί ακόμα.
+
+    Returns:
+        list[AppointmentRecord]: Τα ραντεβού ταξινομημένα με βάση την ημερομηνία
+    """
+    with engine.connect() as connection:
+        # Το όριο από την μεγαλύτερη διάρκεια κρατάει την αναζήτηση στο ευρετήριο της ημερομηνίας
+        lookbehind = connection.execute(MAX_DURATION).scalar() or timedelta(0)
+        statement = (
+            select(*RECORD_COLUMNS)
+            .where(Appointment.date >= start - lookbehind, Appointment.date < end)
+            .order_by(Appointment.date)
+        )
+        records = [AppointmentRecord(*row) for row in connection.execute(statement)]
+    return [record for record in records if record.end_date > start]
+
+
+def expire(session: Session, id: int) -> None:
+    appointment = session.identity_map.get(identity_key(Appointment, id))
+    if appointment is not None:
+        session.expire(appointment)
+
+
+class CacheStats:
+    """
+    Μετρητές λειτουργίας του AppointmentCache για διαγνωστικούς σκοπούς.
+
+    * hits: Περίοδοι που ζητήθηκαν και βρέθηκαν στο cache
+    * misses: Περίοδοι που ζητήθηκαν και φορτώθηκαν από την βάση δεδομένων
+    * fills: Queries που έγιναν στην βάση δεδομένων για την φόρτωση περιόδων
+    * latency: Ιστογράμματα χρόνων ανα λειτουργία
+    """
+
+    operations = ("lookup", "iter_date_range", "query_by_date", "fill")
+
+    def __init__(self):
+        self.latency = {operation: LatencyHistogram() for operation in self.operations}
+        self.reset()
+
+    def reset(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        for histogram in self.latency.values():
+            histogram.reset()
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def timed(operation: str) -> Callable:
+    """
+    Decorator που καταγράφει τον χρόνο εκτέλεσης της μεθόδου στο CacheStats του cache
+    """
+
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.stats.latency[operation].record((perf_counter() - start) * 1000)
+
+        return wrapper
+
+    return decorator
+
+
+class IntervalIndex:
+    """
+    Ευρετήριο διαστημάτων των ραντεβού του cache.
+
+    Κρατάει τις αρχές των ραντεβού σε ταξινομημένο πίνακα μαζί με την μέγιστη
+    διάρκεια που έχει δει. Ένα ραντεβού τέμνει το [start, end) μόνο εάν ξεκινάει
+    μετά το start - max_duration και πριν το end, οπότε με δύο δυαδικές αναζητήσεις
+    βρίσκονται όλοι οι υποψήφιοι σε O(log n + k).
+    """
+
+    def __init__(self):
+        self.starts: list[datetime] = []
+        self.appointments: list[AppointmentRecord] = []
+        self.dates: dict[int, datetime] = {}
+        self.max_duration = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self.appointments)
+
+    def add(self, appointment: AppointmentRecord) -> None:
+        if appointment.id in self.dates:
+            self.remove(appointment.id)
+
+        i = bisect_right(self.starts, appointment.date)
+        self.starts.insert(i, appointment.date)
+        self.appointments.insert(i, appointment)
+        self.dates[appointment.id] = appointment.date
+        if appointment.duration > self.max_duration:
+            self.max_duration = appointment.duration
+
+    def remove(self, id: int) -> bool:
+        # Η ημερομηνία κρατιέται ξεχωριστά επειδή το αντικείμενο μπορεί να έχει
+        # ήδη αλλάξει από το session πριν ενημερωθεί το cache
+        date = self.dates.pop(id, None)
+        if date is None:
+            return False
+
+        i = bisect_left(self.starts, date)
+        while i < len(self.starts) and self.starts[i] == date:
+            if self.appointments[i].id == id:
+                del self.starts[i]
+                del self.appointments[i]
+                return True
+            i += 1
+        return False
+
+    def intersecting(self, start: datetime, end: datetime) -> list[AppointmentRecord]:
+        """
+        Επιστρέφει τα ραντεβού που τέμνουν το διάστημα [start, end), ταξινομημένα
+        με βάση την ημερομηνία.
+        """
+        lo = bisect_right(self.starts, start - self.max_duration)
+        hi = bisect_left(self.starts, end)
+        return [
+            appointment
+            for appointment in self.appointments[lo:hi]
+            if appointment.end_date > start or appointment.date >= start
+        ]
+
+    def starting(self, start: datetime, end: datetime) -> list[AppointmentRecord]:
+        """
+        Επιστρέφει τα ραντεβού που ξεκινούν μέσα στο [start, end), ταξινομημένα με
+        βάση την ημερομηνία.
+        """
+        return self.appointments[bisect_left(self.starts, start) : bisect_left(self.starts, end)]
+
+
+class EmployeeIntervals:
+    """
+    Ένα IntervalIndex για κάθε εργαζόμενο. Οι αναζητήσεις για έναν εργαζόμενο
+    κοστίζουν ανάλογα με τα δικά του ραντεβού και όχι με όλα τα ραντεβού του cache.
+    """
+
+    def __init__(self):
+        self.partitions: dict[int, IntervalIndex] = {}
+        # Ο εργαζόμενος κατα την εισαγωγή, επειδή το αντικείμενο μπορεί να αλλάξει
+        self.employees: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.employees)
+
+    @property
+    def max_duration(self) -> timedelta:
+        # Αντίγραφο, ώστε να μην επηρεάζεται από νέους εργαζόμενους που προσθέτει άλλο thread
+        partitions = tuple(self.partitions.values())
+        return max((index.max_duration for index in partitions), default=timedelta(0))
+
+    def date_of(self, id: int) -> datetime | None:
+        employee_id = self.employees.get(id)
+        if employee_id is None:
+            return None
+        return self.partitions[employee_id].dates.get(id)
+
+    def add(self, appointment: AppointmentRecord) -> None:
+        employee_id = appointment.employee_id or 0
+        if self.employees.get(appointment.id, employee_id) != employee_id:
+            self.remove(appointment.id)
+        index = self.partitions.get(employee_id)
+        if index is None:
+            index = self.partitions[employee_id] = IntervalIndex()
+        index.add(appointment)
+        self.employees[appointment.id] = employee_id
+
+    def remove(self, id: int) -> bool:
+        employee_id = self.employees.pop(id, None)
+        if employee_id is None:
+            return False
+        index = self.partitions[employee_id]
+        removed = index.remove(id)
+        if not index:
+            del self.partitions[employee_id]
+        return removed
+
+    def intersecting(self, start: datetime, end: datetime, employee_id: int | None = None) -> list[AppointmentRecord]:
+        """
+        Τα ραντεβού ενός εργαζόμενου, ή όλων εάν employee_id είναι None, που τέμνουν το
+        [start, end), ταξινομημένα με βάση την ημερομηνία.
+        """
+        if employee_id is not None:
+            index = self.partitions.get(employee_id)
+            return index.intersecting(start, end) if index is not None else []
+        return list(merge(*(index.intersecting(start, end) for index in self.partitions.values()), key=by_date))
+
+    def starting(self, start: datetime, end: datetime, employee_id: int) -> list[AppointmentRecord]:
+        index = self.partitions.get(employee_id)
+        return index.starting(start, end) if index is not None else []
+
 
 class AppointmentCache:
 
     logger = Logger("appointment-cache")
 
     def __init__(self, model: Any):  # Any = AppointmentModel
-        self.data: dict[int, list[Appointment]] = {}
+        self.data: OrderedDict[int, list[AppointmentRecord]] = OrderedDict()
         self.id_index: dict[int, int] = {}
+        self.appointments: dict[int, AppointmentRecord] = {}
         self.start: int
         self.end: int
         self.now = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0)  # TODO Config setting
         self.min_index: int
         self.max_index: int
         self.model = model
+        self.intervals = EmployeeIntervals()
+        self.pinned = range(0)
+        self.max_buckets = MAX_BUCKETS
+        self.max_bytes = MAX_BYTES
+        self.evictions = 0
+        self.evicted_appointments = 0
+        self.stats = CacheStats()
+        # Οι αναγνώσεις από περιόδους που υπάρχουν ήδη γίνονται παράλληλα, οι αλλαγές
+        # και οι φορτώσεις από την βάση δεδομένων αποκλειστικά
+        self.lock = ReadWriteLock()
+        # Η σειρά LRU αλλάζει και από αναγνώστες, στην _touch. Όποιος διατρέχει το data
+        # χωρίς κλείδωμα εγγραφής κρατάει και αυτό το lock
+        self.lru_lock = Lock()
+        # Η μεγαλύτερη διάρκεια στην βάση δεδομένων, δες max_duration
+        self._max_duration: timedelta | None = None
+        # Αυξάνεται σε κάθε αλλαγή, ώστε το prefetch να μην αποθηκεύσει αποτελέσματα
+        # που διάβασε πριν από μια αλλαγή που δεν περιέχουν
+        self.generation = 0
+        self.prefetcher = Prefetcher(self)
+        self.watcher = ChangeWatcher(self, engine)
+
+    def add(self, appointment: Appointment | AppointmentRecord) -> bool:
+        with self.lock.write():
+            self.generation += 1
+            self._grow(appointment)
+            return self._add(appointment)
+
+    def add_many(self, appointments: Iterable[Appointment | AppointmentRecord]) -> int:
+        """
+        Προσθέτει πολλά νέα ραντεβού κρατώντας το lock μια φορά
+
+        Returns:
+            int: Πλήθος ραντεβού που ανήκουν σε φορτωμένες περιόδους και προστέθηκαν
+        """
+        with self.lock.write():
+            self.generation += 1
+            appointments = list(appointments)
+            for appointment in appointments:
+                self._grow(appointment)
+            return sum(self._add(appointment) for appointment in appointments)
 
-    def add(self, appointment: Appointment) -> bool:
-        hit = True
+    def _add(self, appointment: Appointment | AppointmentRecord) -> bool:
+        appointment = AppointmentRecord.from_appointment(appointment)
         index = self.hash(appointment.date)
         value = self.data.get(index)
         if value is None:
-            hit = False
-            self.data.setdefault(index, [])
-        self.data[index].append(appointment)
-        self.id_index[appointment.id] = index
-        return hit
-
-    def update(self, appointment) -> bool:
-        try:
-            self.delete(appointment)
-            self.add(appointment)
-        except Exception as e:
-            self.logger.log_error(str(e))
+            # Η περίοδος δεν έχει φορτωθεί. Δεν δημιουργείται μισογεμάτη, το ραντεβού
+            # θα έρθει μαζί με τα υπόλοιπα όταν ζητηθεί
             return False
+        # Οι περίοδοι μένουν ταξινομημένες κατα την εισαγωγή ώστε η lookup να μην
+        # χρειάζεται ταξινόμηση
+        insort(self.data[index], appointment, key=by_date)
+        self.id_index[appointment.id] = index
+        self.appointments[appointment.id] = appointment
+        self.intervals.add(appointment)
         return True
 
-    def delete(self, appointment: Appointment) -> bool:
-        date_index = self.id_index[appointment.id]
-        self.id_index.pop(appointment.id)
-        try:
-            for i, existing in enumerate(self.data[date_index]):
-                if existing.id == appointment.id:
-                    del self.data[date_index][i]
-                    break
+    def update(self, appointment: Appointment | AppointmentRecord) -> bool:
+        with self.lock.write():
+            self.generation += 1
+            self._grow(appointment)
+            try:
+                self._delete(appointment)
+                self._add(appointment)
+            except Exception as e:
+                self.logger.log_error(str(e))
+                return False
             return True
-        except ValueError:
+
+    def delete(self, appointment: Appointment | AppointmentRecord) -> bool:
+        with self.lock.write():
+            self.generation += 1
+            return self._delete(appointment)
+
+    def _delete(self, appointment: Appointment | AppointmentRecord) -> bool:
+        if appointment.id not in self.id_index:
             return False
+        date_index = self.id_index.pop(appointment.id)
+        self.appointments.pop(appointment.id, None)
+
+        # Η θέση βρίσκεται με την ημερομηνία κατα την εισαγωγή, επειδή το αντικείμενο
+        # μπορεί να έχει ήδη αλλάξει από το session
+        date = self.intervals.date_of(appointment.id) or appointment.date
+        self.intervals.remove(appointment.id)
 
-    def lookup(self, date_index: int) -> list[Appointment]:
         values = self.data.get(date_index)
         if values is None:
-            self.query_by_date(self.unhash(date_index), self.unhash(date_index + 1))
-            return self.lookup(date_index)
-        values.sort(key=lambda x: x.date)
-        return values
+            return False
+
+        i = bisect_left(values, date, key=by_date)
+        while i < len(values) and values[i].date == date:
+            if values[i].id == appointment.id:
+                del values[i]
+                return True
+            i += 1
+
+        for i, existing in enumerate(values):
+            if existing.id == appointment.id:
+                del values[i]
+                return True
+        return False
 
-    def lookup_date(self, date: datetime) -> list[Appointment]:
+    @property
+    def max_duration(self) -> timedelta:
+        """
+        Η μεγαλύτερη διάρκεια ραντεβού στην βάση δεδομένων και όχι μόνο στο cache, ώστε τα
+        ραντεβού που ξεκινούν πριν από ένα διάστημα και συνεχίζονται μέσα του να βρίσκονται
+        και όταν οι περίοδοι τους δεν έχουν φορτωθεί. Διαβάζεται μια φορά, μεγαλώνει με τις
+        εγγραφές της διεργασίας και ορίζεται από τον ChangeWatcher μετά από αλλαγές άλλων διεργασιών.
+        """
+        value = self._max_duration
+        if value is None:
+            with self.lock.write():
+                if self._max_duration is None:
+                    self._max_duration = query_max_duration()
+                value = self._max_duration
+        return value
+
+    @max_duration.setter
+    def max_duration(self, value: timedelta) -> None:
+        with self.lock.write():
+            self._max_duration = value
+
+    def _grow(self, appointment: Appointment | AppointmentRecord) -> None:
+        # Μια διάρκεια που μίκρυνε αφήνει το όριο μεγαλύτερο, που είναι μόνο λίγο πιο αργό
+        if self._max_duration is not None and appointment.duration > self._max_duration:
+            self._max_duration = appointment.duration
+
+    @timed("lookup")
+    def lookup(self, date_index: int) -> list[AppointmentRecord]:
+        # Αντίγραφο ώστε ο καλών να μην βλέπει αλλαγές άλλων threads στην λίστα
+        return self._read(date_index, date_index, lambda: self._collect(date_index, date_index))
+
+    def _read(self, first: int, last: int, read: Callable[[], T | None]) -> T:
+        """
+        Φορτώνει τις περιόδους από first μέχρι και last και εκτελεί την read με κλείδωμα
+        ανάγνωσης. Η read επιστρέφει None εάν κάποια περίοδος αποβλήθηκε ή ακυρώθηκε από
+        άλλο thread στο μεταξύ. Τότε η φόρτωση και η read επαναλαμβάνονται με κλείδωμα
+        εγγραφής, όπου δεν μπορεί να μεσολαβήσει κανείς.
+        """
+        self.fill(first, last)
+        with self.lock.read():
+            result = read()
+        if result is not None:
+            return result
+
+        with self.lock.write():
+            self.fill(first, last)
+            result = read()
+        if result is None:
+            raise RuntimeError(f"Periods {first}-{last} missing after fill")
+        return result
+
+    def lookup_date(self, date: datetime) -> list[AppointmentRecord]:
+        self.sync()
         return self.lookup(self.hash(date))
 
-    def lookup_id(self, id: int) -> Appointment | None:
-        appointments = self.data.get(self.id_index[id])
+    def lookup_id(self, id: int) -> AppointmentRecord | None:
+        with self.lock.read():
+            return self.appointments.get(id)
 
-        if appointments is None:
-            return None
+    def copy(self) -> dict[int, list[AppointmentRecord]]:
+        """
+        Returns:
+            dict[int, list[AppointmentRecord]]: Αντίγραφο των φορτωμένων περιόδων, που ο
+            καλών μπορεί να διατρέξει ενώ άλλα threads αλλάζουν το cache
+        """
+        with self.lock.read(), self.lru_lock:
+            return {index: list(values) for index, values in self.data.items()}
 
-        for appointment in appointments:
-            if appointment.id == id:
-                return appointment
+    def pin(self, start: datetime, end: datetime) -> None:
+        """
+        Εξαιρεί τις περιόδους από start μέχρι και end από την αποβολή
+        """
+        with self.lock.write():
+            self.pinned = range(self.hash(start), self.hash(end) + 1)
+
+    @property
+    def size(self) -> int:
+        """
+        Προσεγγιστικό μέγεθος του cache σε bytes
+        """
+        return len(self.data) * BUCKET_SIZE + len(self.id_index) * APPOINTMENT_SIZE
+
+    def is_full(self) -> bool:
+        if self.max_buckets > 0 and len(self.data) > self.max_buckets:
+            return True
+        if self.max_bytes > 0 and self.size > self.max_bytes:
+            return True
+        return False
+
+    def evict(self) -> int:
+        """
+        Αποβάλλει ολόκληρες περιόδους, ξεκινώντας από την λιγότερο πρόσφατα χρησιμοποιημένη,
+        μέχρι το cache να επιστρέψει εντός ορίων. Οι καρφιτσωμένες περίοδοι δεν αποβάλλονται.
+
+        Returns:
+            int: Πλήθος περιόδων που αποβλήθηκαν
+        """
+        with self.lock.write():
+            return self._evict()
+
+    def _evict(self, protected: Iterable[int] = ()) -> int:
+        if not self.is_full():
+            return 0
+
+        # Η πιο πρόσφατη περίοδος και όσες μόλις φορτώθηκαν δεν αποβάλλονται, ώστε
+        # ο καλών να βρίσκει πάντα αυτό που ζήτησε. Το cache μπορεί προσωρινά να
+        # ξεπεράσει τα όρια, θα επανέλθει στην επόμενη φόρτωση.
+        protected = set(protected)
+        evicted = 0
+        for date_index in [*self.data][:-1]:
+            if not self.is_full():
+                break
+            if date_index in self.pinned or date_index in protected:
+                continue
+
+            self.evicted_appointments += self._drop(date_index)
+            evicted += 1
 
-        return None
+        self.evictions += evicted
+        if evicted:
+            self.logger.log_debug(f"Evicted {evicted} periods")
+        return evicted
+
+    def _drop(self, date_index: int) -> int:
+        """
+        Αφαιρεί μια περίοδο και τα ραντεβού της από όλα τα ευρετήρια
+
+        Returns:
+            int: Πλήθος ραντεβού που αφαιρέθηκαν
+        """
+        values = self.data.pop(date_index, [])
+        for appointment in values:
+            self.id_index.pop(appointment.id, None)
+            self.appointments.pop(appointment.id, None)
+            self.intervals.remove(appointment.id)
+        return len(values)
+
+    def invalidate(self, id: int, dates: list[datetime]) -> int:
+        """
+        Ακυρώνει τις περιόδους που επηρεάζονται από μια εξωτερική αλλαγή ενός ραντεβού,
+        δηλαδή αυτές των παλιών και νέων ημερομηνιών του και αυτή στην οποία το έχει
+        καταγεγραμμένο το cache. Ξαναφορτώνονται από την βάση δεδομένων στην επόμενη χρήση.
+
+        Returns:
+            int: Πλήθος περιόδων που ακυρώθηκαν
+        """
+        with self.lock.write():
+            self.generation += 1
+            indexes = {self.hash(date) for date in dates}
+            if id in self.id_index:
+                indexes.add(self.id_index[id])
+
+            invalidated = 0
+            for date_index in indexes:
+                if date_index in self.data:
+                    self._drop(date_index)
+                    invalidated += 1
+
+            # Ένα Appointment που έχει φορτωθεί για εγγραφή λήγει στο session ώστε το επόμενο
+            # query να ξαναδιαβάσει τα στοιχεία του αντί να επιστρέψει τα παλιά από το identity map
+            expire(self.model.session, id)
+            return invalidated
+
+    def clear(self) -> None:
+        """
+        Αδειάζει ολόκληρο το cache
+        """
+        with self.lock.write():
+            self.generation += 1
+            self.data.clear()
+            self.id_index.clear()
+            self.appointments.clear()
+            self.intervals = EmployeeIntervals()
+            self._max_duration = None
+
+    def sync(self, force: bool = False) -> int:
+        """
+        Εφαρμόζει τις αλλαγές που έκαναν άλλες διεργασίες στην βάση δεδομένων. Το
+        κλείδωμα εγγραφής παίρνεται μόνο όταν είναι ώρα για έλεγχο.
+
+        Args:
+            force (bool, optional): Έλεγχος ανεξαρτήτως διαστήματος. Defaults to False.
+        """
+        if not force and not self.watcher.is_due():
+            return 0
+        with self.lock.write():
+            return self.watcher.poll(force)
+
+    def acknowledge(self, change_seqs: Iterable[int]) -> None:
+        """
+        Δηλώνει τις αλλαγές της ίδιας διεργασίας, δες ChangeWatcher.acknowledge
+        """
+        with self.lock.write():
+            self.watcher.acknowledge(change_seqs)
+
+    def drain_changes(self) -> Change | None:
+        """
+        Returns:
+            Change | None: Οι αλλαγές άλλων διεργασιών που εφαρμόστηκαν στο cache από την
+            προηγούμενη κλήση
+        """
+        with self.lock.write():
+            return self.watcher.drain()
 
     def hash(self, date: datetime) -> int:
         return (date - self.now) // PERIOD
@@ -86,31 +619,274 @@ class AppointmentCache:
     def unhash(self, index: int) -> datetime:
         return self.now + index * PERIOD
 
-    def iter_date_range(self, start: datetime, end: datetime | None) -> Generator[Appointment, None, None]:
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Επιστρέφει τους μετρητές του cache σε JSON-compatible μορφή
+        """
+        with self.lock.read():
+            return self._get_stats()
+
+    def _get_stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.stats.hits,
+            "misses": self.stats.misses,
+            "hit_ratio": round(self.stats.hit_ratio, 4),
+            "fills": self.stats.fills,
+            "evictions": self.evictions,
+            "evicted_appointments": self.evicted_appointments,
+            "buckets": len(self.data),
+            "pinned_buckets": len(self.pinned),
+            "appointments": len(self.appointments),
+            "employees": {employee_id: len(index) for employee_id, index in sorted(self.intervals.partitions.items())},
+            "approximate_bytes": self.size,
+            "external_invalidations": self.watcher.invalidations,
+            "prefetches": self.prefetcher.prefetches,
+            "prefetched_periods": self.prefetcher.prefetched_periods,
+            "max_buckets": self.max_buckets,
+            "max_bytes": self.max_bytes,
+            "latency": {name: histogram.to_dict() for name, histogram in self.stats.latency.items()},
+        }
+
+    @timed("iter_date_range")
+    def iter_date_range(
+        self, start: datetime, end: datetime | None, employee_id: int | None = None
+    ) -> Iterator[AppointmentRecord]:
+        """
+        Επιστρέφει τα ραντεβού των περιόδων από start μέχρι και end, ταξινομημένα με
+        βάση την ημερομηνία. Τα αποτελέσματα συλλέγονται κάτω από το κλείδωμα ανάγνωσης,
+        οπότε η επανάληψη δεν επηρεάζεται από αλλαγές άλλων threads.
+
+        Με employee_id επιστρέφονται μόνο τα ραντεβού του εργαζόμενου, από το δικό του ευρετήριο.
+        """
         if end is None:
             end = start
-        self.start = self.hash(start)
-        self.end = self.hash(end)
-        return self.__next__()
+        self.sync()
+        first = self.hash(start)
+        last = self.hash(end)
+        if employee_id is None:
+            return iter(self._read(first, last, lambda: self._collect(first, last)))
+
+        def read() -> list[AppointmentRecord] | None:
+            if any(i not in self.data for i in range(first, last + 1)):
+                return None
+            return self.intervals.starting(self.unhash(first), self.unhash(last + 1), employee_id)
+
+        return iter(self._read(first, last, read))
+
+    def _collect(self, first: int, last: int) -> list[AppointmentRecord] | None:
+        """
+        Συλλέγει τα ραντεβού των περιόδων από first μέχρι και last. Επιστρέφει None εάν
+        κάποια περίοδος αποβλήθηκε ή ακυρώθηκε μετά την fill, ώστε ο καλών να ξαναδοκιμάσει.
+        """
+        result: list[AppointmentRecord] = []
+        for i in range(first, last + 1):
+            values = self.data.get(i)
+            if values is None:
+                return None
+            result.extend(values)
+        return result
 
-    def __iter__(self) -> Generator[Appointment, None, None]:
+    def intersecting(self, start: datetime, end: datetime, employee_id: int | None = None) -> list[AppointmentRecord]:
+        """
+        Επιστρέφει τα ραντεβού που τέμνουν το διάστημα [start, end). Φορτώνει πρώτα
+        από την βάση δεδομένων όσες περιόδους λείπουν, συμπεριλαμβανομένων αυτών πριν
+        το start που μπορεί να περιέχουν ραντεβού που συνεχίζονται μέσα στο διάστημα.
+
+        Με employee_id επιστρέφονται μόνο τα ραντεβού του εργαζόμενου.
+        """
+        self.sync()
+        lookbehind = max(self.max_duration, PERIOD)
+        first = self.hash(start - lookbehind)
+        last = self.hash(end)
+
+        def read() -> list[AppointmentRecord] | None:
+            if any(i not in self.data for i in range(first, last + 1)):
+                return None
+            return self.intervals.intersecting(start, end, employee_id)
+
+        return self._read(first, last, read)
+
+    def __iter__(self) -> Generator[AppointmentRecord, None, None]:
         raise Exception("Use Cache.iter_date_range instead")
 
-    def __next__(self) -> Generator[Appointment, None, None]:
-        for i in range(self.start, self.end + 1):
-            for appointment in self.lookup(i):
-                yield appointment
+    @timed("fill")
+    def fill(self, first: int, last: int) -> int:
+        """
+        Φορτώνει από την βάση δεδομένων τις περιόδους από first μέχρι και last που
+        λείπουν από το cache. Όλες οι περίοδοι που λείπουν καλύπτονται από ένα
+        μόνο query, που διαβάζει μόνο τα διαστήματά τους και όχι τις ενδιάμεσες
+        περιόδους που υπάρχουν ήδη, και καταγράφονται ως φορτωμένες ακόμα κι αν είναι άδειες.
+
+        Returns:
+            int: Πλήθος περιόδων που φορτώθηκαν
+        """
+        # Συνήθης περίπτωση, όλες οι περίοδοι υπάρχουν και αρκεί το κλείδωμα ανάγνωσης
+        with self.lock.read():
+            if self._touch(first, last):
+                self.stats.hits += last - first + 1
+                return 0
+
+        # Το query γίνεται χωρίς κλείδωμα, ώστε οι αναγνώστες να μην περιμένουν την βάση
+        # δεδομένων. Εάν στο μεταξύ άλλαξε το cache, πχ μια add ενός άλλου thread, το
+        # αποτέλεσμα μπορεί να μην την περιέχει και δεν αποθηκεύεται.
+        for _ in range(FILL_ATTEMPTS):
+            with self.lock.read():
+                generation = self.generation
+                missing = [i for i in range(first, last + 1) if i not in self.data]
+            if not missing:
+                self.stats.hits += last - first + 1
+                return 0
+            result = query_records(self.ranges(missing))
+            with self.lock.write():
+                if generation == self.generation:
+                    return self._fill(first, last, missing, result)
+
+        # Με συνεχείς αλλαγές η τελευταία προσπάθεια κρατάει το κλείδωμα εγγραφής
+        with self.lock.write():
+            missing = [i for i in range(first, last + 1) if i not in self.data]
+            if not missing:
+                self.stats.hits += last - first + 1
+                return 0
+            return self._fill(first, last, missing, query_records(self.ranges(missing)))
+
+    def _fill(self, first: int, last: int, missing: list[int], result: list[AppointmentRecord]) -> int:
+        self.stats.hits += last - first + 1 - len(missing)
+        self.stats.misses += len(missing)
+        self.stats.fills += 1
+        # Όλο το διάστημα περνάει στην _store ώστε καμία περίοδος του να μην αποβληθεί.
+        # Οι περίοδοι που υπήρχαν ήδη ή φορτώθηκαν στο μεταξύ δεν ξαναγεμίζουν.
+        return self._store(list(range(first, last + 1)), result)
+
+    def ranges(self, periods: list[int]) -> list[tuple[datetime, datetime]]:
+        """
+        Μετατρέπει ταξινομημένες περιόδους σε διαστήματα [start, end), ενώνοντας τις διαδοχικές
+        """
+        runs: list[list[int]] = []
+        for i in periods:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        if len(runs) > MAX_RANGES:
+            runs = [[periods[0], periods[-1]]]
+        return [(self.unhash(first), self.unhash(last + 1)) for first, last in runs]
+
+    def _touch(self, first: int, last: int) -> bool:
+        """
+        Μετακινεί τις περιόδους στο τέλος της σειράς LRU. Επιστρέφει False εάν κάποια λείπει.
+        """
+        for i in range(first, last + 1):
+            if i not in self.data:
+                return False
+        # Πολλοί αναγνώστες μπορούν να αλλάζουν την σειρά ταυτόχρονα
+        with self.lru_lock:
+            for i in range(first, last + 1):
+                self.data.move_to_end(i)
+        return True
+
+    def missing(self, first: int, last: int) -> list[int]:
+        """
+        Επιστρέφει τις περιόδους από first μέχρι και last που δεν υπάρχουν στο cache
+        """
+        with self.lock.read():
+            return [i for i in range(first, last + 1) if i not in self.data]
+
+    def store(self, periods: list[int], appointments: list[AppointmentRecord], generation: int | None = None) -> int:
+        """
+        Καταγράφει ως φορτωμένες τις περιόδους που λείπουν από το periods και προσθέτει
+        τα ραντεβού που ανήκουν σε αυτές. Οι περίοδοι που φορτώθηκαν στο μεταξύ
+        (πχ από το prefetch) δεν ξαναγεμίζουν.
+
+        Args:
+            generation (int | None, optional): Η τιμή του self.generation πριν το query. Εάν
+            το cache άλλαξε από τότε, τα αποτελέσματα δεν αποθηκεύονται. Defaults to None.
+
+        Returns:
+            int: Πλήθος περιόδων που καταγράφηκαν
+        """
+        with self.lock.write():
+            if generation is not None and generation != self.generation:
+                return 0
+            return self._store(periods, appointments)
+
+    def _store(self, periods: list[int], appointments: list[AppointmentRecord]) -> int:
+        loaded = {i for i in periods if i not in self.data}
+        for i in periods:
+            if i in loaded:
+                self.data[i] = []
+
+        for appointment in appointments:
+            if self.hash(appointment.date) in loaded and appointment.id not in self.id_index:
+                self._add(appointment)
+
+        self._evict(periods)
+        return len(loaded)
+
+    def prefetch(self, start: datetime, end: datetime) -> Future | None:
+        """
+        Ζητάει την φόρτωση των περιόδων από start μέχρι end σε δεύτερο thread
+        """
+        return self.prefetcher.prefetch(self.hash(start), self.hash(end))
 
+    @timed("query_by_date")
     def query_by_date(self, start: datetime, end: datetime):
-        result = self.model.get_appointments_from_to_date(start, end)
-        if len(result) == 0:
-            for i in range(self.hash(start), self.hash(end) + 1):
-                self.data.setdefault(self.hash(start), [])
-        for appointment in result:
-            self.add(appointment)
+        self.fill(self.hash(start), self.hash(end))
 
     def query_by_id(self, id: int):
         appointment = self.model.get_appointment_by_id(id)
         if appointment is None:
             return
         self.query_by_date(appointment.date, appointment.end_date)
+
+
+class Prefetcher:
+    """
+    Φορτώνει περιόδους στο cache σε δεύτερο thread, ώστε η πλοήγηση στο Grid να
+    εξυπηρετείται από το cache χωρίς να περιμένει το tk event loop την βάση δεδομένων.
+
+    Τα AppointmentRecord δεν συνδέονται με κανένα session, οπότε περνάνε στο cache
+    όπως είναι.
+    """
+
+    logger = Logger("cache-prefetch")
+
+    def __init__(self, cache: AppointmentCache):
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-prefetch")
+        self.pending: dict[tuple[int, int], Future] = {}
+        self.prefetches = 0
+        self.prefetched_periods = 0
+
+    def prefetch(self, first: int, last: int) -> Future | None:
+        if not self.cache.missing(first, last):
+            return None
+
+        key = (first, last)
+        future = self.pending.get(key)
+        if future is not None and not future.done():
+            return future
+
+        future = self.executor.submit(self.run, first, last)
+        self.pending[key] = future
+        future.add_done_callback(lambda _: self.pending.pop(key, None))
+        return future
+
+    def run(self, first: int, last: int) -> int:
+        missing = self.cache.missing(first, last)
+        if not missing:
+            return 0
+
+        start = self.cache.unhash(missing[0])
+        end = self.cache.unhash(missing[-1] + 1)
+        generation = self.cache.generation
+        try:
+            result = query_records(self.cache.ranges(missing))
+        except Exception as e:
+            self.logger.log_error(f"Prefetch from {start} to {end} failed: {e}")
+            return 0
+
+        stored = self.cache.store(missing, result, generation)
+        self.prefetches += 1
+        self.prefetched_periods += stored
+        self.logger.log_debug(f"Prefetched {stored} periods from {start} to {end}")
+        return stored
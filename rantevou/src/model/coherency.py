@@ -0,0 +1,307 @@
+"""
+Συγχρονισμός του cache των ραντεβού μεταξύ διεργασιών.
+
+Το GUI και ο web server μπορούν να τρέχουν ταυτόχρονα πάνω στην ίδια βάση δεδομένων,
+το καθένα με το δικό του AppointmentCache. Κάθε αλλαγή στον πίνακα appointment
+καταγράφεται από triggers στον πίνακα appointment_change. Κάθε διεργασία ελέγχει
+με το PRAGMA data_version, σε δική της σύνδεση, εάν κάποια άλλη σύνδεση έχει κάνει
+commit και μόνο τότε διαβάζει τις νέες εγγραφές και ακυρώνει τις περιόδους του cache
+που επηρεάζονται.
+
+Οι εγγραφές της ίδιας διεργασίας επιστρέφουν με το RETURNING και το seq των αλλαγών
+τους (CHANGE_SEQ), ώστε να αναγνωρίζονται χωρίς επιπλέον query.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from time import monotonic
+from typing import Any, Iterable
+
+from sqlalchemy import Engine, column, func, select, table, text
+
+from .events import Change
+from .migrations import columns
+from ..controller.logging import Logger
+from ..controller import get_config
+
+cfg = get_config()
+SYNC_INTERVAL = int(cfg["cache_settings"]["sync_interval_ms"]) / 1000
+
+logger = Logger("cache-coherency")
+
+EPOCH = datetime(1970, 1, 1)
+
+CHANGE_LOG_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS appointment_change (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        appointment_id INTEGER NOT NULL,
+        old_date DATETIME,
+        new_date DATETIME,
+        created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        old_duration DATETIME,
+        new_duration DATETIME
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS appointment_change_insert AFTER INSERT ON appointment
+    BEGIN
+        INSERT INTO appointment_change (appointment_id, old_date, old_duration, new_date, new_duration)
+        VALUES (NEW.id, NULL, NULL, NEW.date, NEW.duration);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS appointment_change_update AFTER UPDATE ON appointment
+    BEGIN
+        INSERT INTO appointment_change (appointment_id, old_date, old_duration, new_date, new_duration)
+        VALUES (NEW.id, OLD.date, OLD.duration, NEW.date, NEW.duration);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS appointment_change_delete AFTER DELETE ON appointment
+    BEGIN
+        INSERT INTO appointment_change (appointment_id, old_date, old_duration, new_date, new_duration)
+        VALUES (OLD.id, OLD.date, OLD.duration, NULL, NULL);
+    END
+    """,
+)
+CHANGE_TRIGGERS = ("appointment_change_insert", "appointment_change_update", "appointment_change_delete")
+
+_sqlite_sequence = table("sqlite_sequence", column("name"), column("seq"))
+
+# Το seq της τελευταίας αλλαγής πριν από το statement. Στο RETURNING όλες οι γραμμές ενός
+# statement παίρνουν την ίδια τιμή, επειδή τα AFTER triggers εκτελούνται μετά, οπότε οι
+# αλλαγές του statement είναι οι CHANGE_SEQ + 1 .. CHANGE_SEQ + πλήθος γραμμών
+CHANGE_SEQ = func.coalesce(
+    select(_sqlite_sequence.c.seq).where(_sqlite_sequence.c.name == "appointment_change").scalar_subquery(), 0
+).label("change_seq")
+
+# Οι εγγραφές του appointment_change διατηρούνται για μια μέρα. Μια διεργασία που
+# έμεινε πίσω περισσότερο ακυρώνει ολόκληρο το cache της.
+PRUNE_CHANGES = "DELETE FROM appointment_change WHERE created < datetime('now', '-1 day')"
+
+
+def install_change_log(engine: Engine) -> None:
+    """
+    Δημιουργεί τον πίνακα appointment_change και τα triggers που τον γεμίζουν,
+    εάν δεν υπάρχουν ήδη, και καθαρίζει τις παλιές εγγραφές.
+    """
+    with engine.begin() as connection:
+        # Ο πίνακας παλαιότερων εκδόσεων δεν είχε τις διάρκειες, ούτε τις έγραφαν τα triggers του
+        existing = columns(connection, "appointment_change")
+        if existing and "old_duration" not in existing:
+            logger.log_info("Adding durations to appointment_change")
+            connection.exec_driver_sql("ALTER TABLE appointment_change ADD COLUMN old_duration DATETIME")
+            connection.exec_driver_sql("ALTER TABLE appointment_change ADD COLUMN new_duration DATETIME")
+            for trigger in CHANGE_TRIGGERS:
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+        for statement in CHANGE_LOG_DDL:
+            connection.execute(text(statement))
+        connection.execute(text(PRUNE_CHANGES))
+
+
+def parse_date(value: Any) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def parse_duration(value: Any) -> timedelta:
+    # Το SQLAlchemy αποθηκεύει τις διάρκειες στο SQLite ως ημερομηνίες μετά το 1970-01-01
+    date = parse_date(value)
+    return timedelta(0) if date is None else date - EPOCH
+
+
+def parse_range(date: Any, duration: Any) -> tuple[datetime, datetime] | None:
+    """
+    Returns:
+        tuple[datetime, datetime] | None: Το [date, date + duration) μιας θέσης ραντεβού. Οι
+        εγγραφές από πριν προστεθούν οι διάρκειες στο appointment_change έχουν μηδενική διάρκεια
+    """
+    start = parse_date(date)
+    if start is None:
+        return None
+    return start, start + parse_duration(duration)
+
+
+class ChangeWatcher:
+    """
+    Παρακολουθεί τις αλλαγές στον πίνακα appointment από άλλες συνδέσεις και
+    ακυρώνει τις αντίστοιχες περιόδους του cache.
+
+    Κρατάει μια δική του σύνδεση επειδή το PRAGMA data_version αλλάζει μόνο όταν
+    κάνει commit κάποια άλλη σύνδεση, και έχει νόημα μόνο όταν συγκρίνεται στην ίδια.
+    """
+
+    def __init__(self, cache: Any, engine: Engine):  # Any = AppointmentCache
+        self.cache = cache
+        self.connection = engine.raw_connection()
+        self.data_version = self.get_data_version()
+        self.last_seq = self.get_last_seq()
+        self.last_poll = monotonic()
+        self.interval = SYNC_INTERVAL
+        self.invalidations = 0
+        # Πλήθος αλλαγών άλλων διεργασιών που εφαρμόστηκαν, ακόμα κι αν δεν ακύρωσαν καμία
+        # φορτωμένη περίοδο. Όσοι κρατάνε δικά τους δεδομένα εκτός cache το συγκρίνουν
+        self.applied = 0
+        self.changes: Change | None = None
+        # Αλλαγές της ίδιας διεργασίας μετά από αλλαγές άλλων που δεν έχουν διαβαστεί ακόμα
+        self.acknowledged: set[int] = set()
+
+    def get_data_version(self) -> int:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("PRAGMA data_version")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def get_last_seq(self) -> int:
+        cursor = self.connection.cursor()
+        try:
+            # Το sqlite_sequence κρατάει το τελευταίο seq ακόμα κι αν ο πίνακας έχει αδειάσει
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'appointment_change'")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def has_changes_after(self, seq: int) -> bool:
+        """
+        Returns:
+            bool: True εάν το appointment_change έχει ακόμα όλες τις αλλαγές μετά το seq,
+            δηλαδή καμία δεν έχει σβηστεί από τον καθαρισμό των παλιών εγγραφών. Έχει νόημα
+            μόνο για seq μικρότερο από το τελευταίο, αφού χωρίς νεότερες αλλαγές το
+            appointment_change μπορεί να είναι άδειο
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT MIN(seq) FROM appointment_change")
+            first_seq = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+            self.connection.rollback()
+        return first_seq is not None and first_seq <= seq + 1
+
+    def is_due(self) -> bool:
+        """
+        Returns:
+            bool: True εάν έχει περάσει το sync_interval_ms από τον τελευταίο έλεγχο
+        """
+        return monotonic() - self.last_poll >= self.interval
+
+    def poll(self, force: bool = False) -> int:
+        """
+        Ελέγχει για αλλαγές από άλλες συνδέσεις. Χωρίς το force ο έλεγχος γίνεται το
+        πολύ μια φορά ανα sync_interval_ms.
+
+        Args:
+            force (bool, optional): Έλεγχος ανεξαρτήτως διαστήματος. Defaults to False.
+
+        Returns:
+            int: Πλήθος αλλαγών που εφαρμόστηκαν στο cache
+        """
+        if not force and not self.is_due():
+            return 0
+        self.last_poll = monotonic()
+
+        data_version = self.get_data_version()
+        if data_version == self.data_version:
+            return 0
+        self.data_version = data_version
+        return self.apply_changes()
+
+    def catch_up(self, seq: int) -> int:
+        """
+        Εφαρμόζει στο cache όλες τις αλλαγές μετά το seq. Χρησιμοποιείται όταν το
+        cache φορτώνεται από snapshot που γράφτηκε όταν το τελευταίο seq ήταν αυτό.
+
+        Returns:
+            int: Πλήθος αλλαγών που εφαρμόστηκαν στο cache
+        """
+        self.last_seq = seq
+        return self.apply_changes()
+
+    def acknowledge(self, change_seqs: Iterable[int]) -> None:
+        """
+        Δηλώνει τις αλλαγές που έκανε η ίδια η διεργασία και έχει ήδη εφαρμόσει στο cache,
+        ώστε να μην εφαρμοστούν ξανά σαν αλλαγές άλλης διεργασίας. Δεν κάνει κανένα query.
+
+        Args:
+            change_seqs (Iterable[int]): Το CHANGE_SEQ κάθε γραμμής που επέστρεψε μια εγγραφή
+        """
+        counts: dict[int, int] = {}
+        for change_seq in change_seqs:
+            counts[change_seq] = counts.get(change_seq, 0) + 1
+        for change_seq, n in counts.items():
+            self.acknowledged.update(range(change_seq + 1, change_seq + n + 1))
+
+        # Χωρίς αλλαγές άλλων ενδιάμεσα το last_seq προχωράει αμέσως
+        while self.last_seq + 1 in self.acknowledged:
+            self.last_seq += 1
+            self.acknowledged.remove(self.last_seq)
+        # Όσες διαβάστηκαν ήδη από το apply_changes πριν δηλωθούν
+        self.acknowledged = {seq for seq in self.acknowledged if seq > self.last_seq}
+
+    def apply_changes(self) -> int:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute("SELECT MIN(seq) FROM appointment_change")
+            first_seq = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT seq, appointment_id, old_date, old_duration, new_date, new_duration "
+                "FROM appointment_change WHERE seq > ? ORDER BY seq",
+                (self.last_seq,),
+            )
+            changes = cursor.fetchall()
+        finally:
+            cursor.close()
+            # Κλείνει το read transaction ώστε το επόμενο data_version να είναι ενημερωμένο
+            self.connection.rollback()
+
+        if not changes:
+            return 0
+
+        # Οι εγγραφές που χρειαζόμασταν έχουν σβηστεί, το cache δεν είναι πλέον αξιόπιστο
+        if first_seq is not None and first_seq > self.last_seq + 1:
+            logger.log_warn("Change log was pruned past the last seen change, clearing cache")
+            self.last_seq = changes[-1][0]
+            self.acknowledged.clear()
+            self.cache.clear()
+            self.invalidations += 1
+            self.applied += len(changes)
+            self.record(Change.everything())
+            return len(changes)
+
+        applied = []
+        longest = timedelta(0)
+        for seq, appointment_id, old_date, old_duration, new_date, new_duration in changes:
+            self.last_seq = seq
+            if seq in self.acknowledged:
+                self.acknowledged.remove(seq)
+                continue
+            spans = (parse_range(old_date, old_duration), parse_range(new_date, new_duration))
+            ranges = [span for span in spans if span is not None]
+            self.invalidations += self.cache.invalidate(appointment_id, [start for start, _ in ranges])
+            applied.append((appointment_id, ranges))
+            longest = max(longest, parse_duration(new_duration))
+
+        if applied:
+            self.applied += len(applied)
+            # Ένα ραντεβού άλλης διεργασίας μπορεί να είναι μεγαλύτερο από όσα ξέρει το cache
+            if longest > self.cache.max_duration:
+                self.cache.max_duration = longest
+            logger.log_info(f"Applied {len(applied)} external appointment changes")
+            self.record(Change.at(applied))
+        return len(applied)
+
+    def record(self, change: Change) -> None:
+        self.changes = change if self.changes is None else self.changes.merge(change)
+
+    def drain(self) -> Change | None:
+        """
+        Returns:
+            Change | None: Οι αλλαγές άλλων διεργασιών που εφαρμόστηκαν από την προηγούμενη κλήση
+        """
+        changes, self.changes = self.changes, None
+        return changes
@@ -1,41 +1,105 @@
 """
 Ορισμός του μοντέλου δεδομένων των πελατών. Ορίζει μεθόδους αναζήτησης στην βάση δεδομένων,
 καθώς και εισαγωγή, επεξεργασία και διαγραφή.
+
+Οι αναζητήσεις γίνονται με τον πίνακα FTS5 customer_fts όταν είναι διαθέσιμος, αλλιώς
+βρίσκουν τα ids των πελατών από το ευρετήριο στην μνήμη, ή από τα αποτελέσματα μιας
+προηγούμενης αναζήτησης, και διαβάζουν από την βάση δεδομένων μόνο τους πελάτες της
+σελίδας. Δες rantevou.src.model.customer_index
 """
 
 from __future__ import annotations
 
 from math import ceil
+from threading import Lock
+from typing import Any, Callable
 
-from sqlalchemy import func, or_, desc
+from sqlalchemy import ColumnElement, func, or_, desc, select
 from sqlalchemy.exc import DatabaseError
+from sqlalchemy.orm import Query
 
-from .session import session
+from .session import engine, session
 from .entities import Customer
+from .customer_index import (
+    SEARCH_COLUMNS,
+    CustomerIndex,
+    SearchCache,
+    drop_customer_fts,
+    fts_count,
+    fts_join,
+    fts_matches,
+    fts_query,
+    install_customer_change_log,
+    install_customer_fts,
+    is_prefix_query,
+)
 from .interfaces import SubscriberInterface
-from .exceptions import IdMissing, IdOnNewCustomer, CustomerDBError
+from .events import SubscriberRegistry
+from .exceptions import IdMissing, IdOnNewCustomer, CustomerDBError, InvalidCursor
+from .pagination import CountCache, Cursor, CustomerPage, seek
 from ..controller.logging import Logger
+from ..controller import get_config
 
 logger = Logger("customer-model")
 
+cfg = get_config().get("search_settings", {})
+# "fts", "index" ή "like"
+SEARCH_BACKEND = cfg.get("backend", "fts")
+# Πόσες αναζητήσεις κρατάει το cache του πλήθους αποτελεσμάτων
+COUNT_CACHE_SIZE = int(cfg.get("count_cache_size", 256))
+# Πόσες αναζητήσεις με το LIKE κρατάει το cache αποτελεσμάτων, για την πληκτρολόγηση
+RESULT_CACHE_SIZE = int(cfg.get("result_cache_size", 32))
+# Το πλήθος των αναζητήσεων με LIKE εκτιμάται από τους πρώτους COUNT_SAMPLE πελάτες,
+# αντί να διαβαστεί όλος ο πίνακας
+ESTIMATE_COUNTS = bool(cfg.get("estimate_counts", False))
+COUNT_SAMPLE = 10_000
+MIN_SAMPLE_MATCHES = 100
+
+# Πέρα από αυτό το πλήθος αποτελεσμάτων η ταξινόμηση γίνεται με το LIKE αντί για "id IN (...)"
+MAX_ID_FILTER = 10_000
+# Το bm25 υπολογίζεται για όλα τα αποτελέσματα, οπότε πέρα από αυτό το πλήθος η σειρά
+# είναι του customer_fts
+MAX_RANKED = 10_000
+
 
 class CustomerModel:
     """
     Μοντέλο δεδομένων πελάτη. Εφαρμόοζει singleton pattern.
     """
 
-    subscribers: list[SubscriberInterface]
+    subscribers: SubscriberRegistry
+    index: CustomerIndex
+    counts: CountCache
+    results: SearchCache
+    fts: bool
     _instance = None
+    init_lock = Lock()
     session = session
     max_id: int
 
     def __new__(cls, *args, **kwargs) -> CustomerModel:
-        if cls._instance is None:
-            cls._instance = super(CustomerModel, cls).__new__(cls, *args, **kwargs)
-            cls.subscribers = []
-            max_id = cls.session.query(func.max(Customer.id)).scalar() or 0
-            if isinstance(max_id, int):
-                cls.max_id = max_id
+        if cls._instance is not None:
+            return cls._instance
+
+        with cls.init_lock:
+            if cls._instance is None:
+                instance = super(CustomerModel, cls).__new__(cls, *args, **kwargs)
+                cls.subscribers = SubscriberRegistry()
+                install_customer_change_log(engine)
+                if SEARCH_BACKEND == "fts":
+                    cls.fts = install_customer_fts(engine)
+                else:
+                    drop_customer_fts(engine)
+                    cls.fts = False
+                cls.index = CustomerIndex(engine)
+                if SEARCH_BACKEND != "like" and not cls.fts:
+                    cls.index.start()
+                cls.counts = CountCache(engine, COUNT_CACHE_SIZE)
+                cls.results = SearchCache(engine, RESULT_CACHE_SIZE)
+                max_id = cls.session.query(func.max(Customer.id)).scalar() or 0
+                if isinstance(max_id, int):
+                    cls.max_id = max_id
+                cls._instance = instance
 
         return cls._instance
 
@@ -122,6 +186,10 @@ class CustomerModel:
             session.rollback()
             raise CustomerDBError(str(e)) from e
 
+        self.index.put(customer)
+        self.counts.clear()
+        self.results.clear()
+
         # Ενημέρωση subscriber
         self.notify_subscribers()
         return customer
@@ -157,6 +225,10 @@ class CustomerModel:
             session.rollback()
             raise CustomerDBError(customer, str(e)) from e
 
+        self.index.remove(customer.id)
+        self.counts.clear()
+        self.results.clear()
+
         # Ενημέρωση subscriber
         self.notify_subscribers()
         return True
@@ -175,7 +247,7 @@ class CustomerModel:
             raise IdMissing(customer)
 
         try:
-            (
+            updated = (
                 session.query(Customer)
                 .filter_by(id=customer.id)
                 .update(
@@ -189,10 +261,17 @@ class CustomerModel:
                     }
                 )
             )
+            # Χωρίς commit η αλλαγή χάνεται όταν κλείσει το session του thread
+            session.commit()
         except DatabaseError as e:
             session.rollback()
             raise CustomerDBError(customer, str(e)) from e
 
+        if updated:
+            self.index.put(customer)
+            self.counts.clear()
+            self.results.clear()
+
         # Ενημερώνει το cache και τους subscribers
         self.notify_subscribers()
         return True
@@ -204,15 +283,30 @@ class CustomerModel:
             subscriber (SubscriberInterface)
         """
         logger.log_info(f"Excecuting subscription of {subscriber}")
-        self.subscribers.append(subscriber)
+        self.subscribers.add(subscriber)
+
+    def remove_subscriber(self, subscriber: SubscriberInterface) -> bool:
+        """
+        Αφαιρεί τον subscriber από την λίστα προς ενημέρωση
+
+        Returns:
+            bool: True εάν ο subscriber ήταν δηλωμένος
+        """
+        return self.subscribers.remove(subscriber)
+
+    def get_subscriber_stats(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Πλήθος subscribers και χρόνοι των ειδοποιήσεων
+        """
+        return self.subscribers.get_stats()
 
     def notify_subscribers(self) -> None:
         """
         Ενημερώνει τους subscribers
         """
-        logger.log_info(f"Excecuting notification of {len(self.subscribers)} subscribers")
-        for sub in self.subscribers:
-            sub.subscriber_update()
+        count = self.subscribers.notify()
+        logger.log_info(f"Excecuted notification of {count} subscribers")
 
     def get_customer_by_id(self, id_: int) -> Customer | None:
         """
@@ -246,22 +340,118 @@ class CustomerModel:
         Returns:
             list[Customer]: Αποτελέσματα αναζήτησης
         """
+        match = self.fts_query(query)
+        if match is not None:
+            matches = fts_matches(match)
+            return session.query(Customer).select_from(fts_join(matches)).order_by(matches.c.rank).all()
 
-        return (
-            session.query(Customer)
-            .filter(
-                or_(
-                    Customer.name.like(f"{query}%"),
-                    Customer.surname.like(f"{query}%"),
-                    Customer.normalized_name.like(f"{query}%"),
-                    Customer.normalized_surname.like(f"{query}%"),
-                    Customer.email.like(f"{query}%"),
-                    Customer.phone.like(f"{query}%"),
-                )
-            )
-            .all()
+        ids = self.search_ids(query)
+        if ids is None:
+            return session.query(Customer).filter(self.__like(query)).all()
+        return self.get_customers_by_ids(ids)
+
+    def fts_query(self, query: str) -> str | None:
+        """
+        Returns:
+            str | None: Η έκφραση MATCH για το customer_fts. None εάν το FTS5 δεν είναι
+            διαθέσιμο ή το query δεν έχει λέξεις
+        """
+        if not self.fts or not query:
+            return None
+        return fts_query(query)
+
+    def search_ids(self, query: str) -> list[int] | None:
+        """
+        Βρίσκει τα ids των πελατών με κάποιο στοιχείο που ξεκινάει με το query, με τα ίδια
+        αποτελέσματα όπως το LIKE 'query%'. Χωρίς το ευρετήριο, τα αποτελέσματα έρχονται
+        από το cache αποτελεσμάτων ή από ένα LIKE που διαβάζει μέχρι MAX_ID_FILTER πελάτες.
+
+        Returns:
+            list[int] | None: Τα ids σε αύξουσα σειρά. None εάν το query περιέχει
+            wildcards του LIKE ή έχει περισσότερα από MAX_ID_FILTER αποτελέσματα πριν
+            φορτωθεί το ευρετήριο, οπότε η αναζήτηση πρέπει να γίνει στην βάση δεδομένων
+        """
+        if not is_prefix_query(query):
+            return None
+        ids = self.index.search(query)
+        if ids is None:
+            ids = self.results.search(query)
+        if ids is None:
+            ids = self.__load_results(query)
+        return ids
+
+    def __load_results(self, query: str) -> list[int] | None:
+        rows = self.session.execute(
+            select(Customer.id, *SEARCH_COLUMNS)
+            .where(self.__like(query))
+            .order_by(Customer.id)
+            .limit(MAX_ID_FILTER + 1)
+        ).all()
+        # Τα αποτελέσματα κρατιούνται μόνο εάν είναι όλα
+        if len(rows) > MAX_ID_FILTER:
+            return None
+        self.results.put_rows(query, rows)
+        return [row[0] for row in rows]
+
+    def get_customers_by_ids(self, ids: list[int]) -> list[Customer]:
+        """
+        Διαβάζει τους πελάτες από την βάση δεδομένων
+
+        Returns:
+            list[Customer]: Οι πελάτες στην σειρά των ids
+        """
+        found: dict[int, Customer] = {}
+        for i in range(0, len(ids), MAX_ID_FILTER):
+            chunk = ids[i : i + MAX_ID_FILTER]
+            found.update((customer.id, customer) for customer in session.query(Customer).filter(Customer.id.in_(chunk)))
+        return [found[id_] for id_ in ids if id_ in found]
+
+    @staticmethod
+    def __like(query: str) -> ColumnElement[bool]:
+        return or_(
+            Customer.name.like(f"{query}%"),
+            Customer.surname.like(f"{query}%"),
+            Customer.normalized_name.like(f"{query}%"),
+            Customer.normalized_surname.like(f"{query}%"),
+            Customer.email.like(f"{query}%"),
+            Customer.phone.like(f"{query}%"),
         )
 
+    def count_customers(self, search_query: str, match: str | None, counter: Callable[[], int]) -> int:
+        """
+        Το πλήθος των αποτελεσμάτων μιας αναζήτησης από το cache, ώστε η αλλαγή σελίδας να
+        μην μετράει ξανά. Το cache αδειάζει σε κάθε εγγραφή πελάτη.
+
+        Args:
+            search_query (str): Η συμβολοσειρά αναζήτησης
+            match (str | None): Η έκφραση MATCH εάν η αναζήτηση γίνεται με το FTS5
+            counter (Callable[[], int]): Υπολογίζει το πλήθος όταν δεν είναι στο cache
+
+        Returns:
+            int
+        """
+        # Το FTS5 ταιριάζει λέξεις και το LIKE ολόκληρα στοιχεία, οπότε δίνουν άλλο πλήθος
+        key = (search_query, match is not None)
+        count = self.counts.get(key)
+        if count is None:
+            count = counter()
+            self.counts.put(key, count)
+        return count
+
+    def __count(self, search_query: str, query: Query) -> int:
+        if not ESTIMATE_COUNTS or not search_query:
+            return query.count()
+        total = self.count_customers("", None, self.session.query(Customer).count)
+        if total <= COUNT_SAMPLE:
+            return query.count()
+        # Τα ids είναι το πρωτεύον κλειδί, οπότε το δείγμα διαβάζεται από το ευρετήριο
+        bound = self.session.query(Customer.id).order_by(Customer.id).offset(COUNT_SAMPLE - 1).limit(1).scalar()
+        sample = query.filter(Customer.id <= bound).count()
+        # Με λίγα αποτελέσματα στο δείγμα η εκτίμηση δεν είναι αξιόπιστη
+        if sample < MIN_SAMPLE_MATCHES:
+            return query.count()
+        return round(sample * total / COUNT_SAMPLE)
+
     def __find_max_id(self) -> int:
         result = self.session.query(func.max(Customer.id)).scalar()
         if result is None:
@@ -293,7 +483,9 @@ class CustomerModel:
             Αποτελέσματα ανα σελίδα, άπειρα αποτελέσματα εάν είναι 0. Defaults to 0.
 
             search_query (str, optional):
-            Η συμβολοσειρά αναζήτησης. Αάπειρα αποτελέσματα εάν είναι κενή. Defaults to "".
+            Η συμβολοσειρά αναζήτησης. Αάπειρα αποτελέσματα εάν είναι κενή. Με FTS5 κάθε λέξη
+            της είναι πρόθεμα μιας λέξης του πελάτη, αλλιώς όλη είναι πρόθεμα ενός στοιχείου
+            του πελάτη. Defaults to "".
 
             sorted_by (str, optional):
             Στήλη στην οποία θα γίνει ταξινόμηση. Αγνοεί αν είναι άδειο. Defaults to "".
@@ -306,18 +498,35 @@ class CustomerModel:
             Πλειάδα με την λίστα των πελατών και το σύνολο των σελίδων
         """
         query = self.session.query(Customer)
+        match = self.fts_query(search_query)
+        ids = self.search_ids(search_query) if search_query and match is None else None
+        count = None
+
+        # Χωρίς ταξινόμηση η σελίδα είναι ένα κομμάτι των ids
+        if ids is not None and not sorted_by:
+            count = len(ids)
+            if page_number > 0 and page_length > 0:
+                ids = ids[(page_number - 1) * page_length : page_number * page_length]
+            return self.get_customers_by_ids(ids), self.__pages(count, page_length)
 
         # Δημιουργία query αναζήτησης
-        if search_query:
-            filter_ = or_(
-                Customer.name.like(f"{search_query}%"),
-                Customer.surname.like(f"{search_query}%"),
-                Customer.normalized_name.like(f"{search_query}%"),
-                Customer.normalized_surname.like(f"{search_query}%"),
-                Customer.email.like(f"{search_query}%"),
-                Customer.phone.like(f"{search_query}%"),
-            )
-            query = query.filter(filter_)
+        if match is not None:
+            count = self.count_customers(search_query, match, lambda: fts_count(self.session, match))
+            matches = fts_matches(match)
+            query = query.select_from(fts_join(matches))
+            # Χωρίς στήλη ταξινόμησης πρώτα τα πιο σχετικά αποτελέσματα
+            if not sorted_by:
+                query = query.order_by(matches.c.rank if count <= MAX_RANKED else matches.c.rowid)
+        elif ids is not None and len(ids) <= MAX_ID_FILTER:
+            query = query.filter(Customer.id.in_(ids))
+            count = len(ids)
+        elif search_query:
+            query = query.filter(self.__like(search_query))
+            if ids is not None:
+                count = len(ids)
+
+        if count is None:
+            count = self.count_customers(search_query, None, lambda: self.__count(search_query, query))
 
         # Δημιουργία query ταξινόμησης
         if sorted_by:
@@ -326,20 +535,110 @@ class CustomerModel:
                 order_property = desc(order_property)
             query = query.order_by(order_property)
 
-        count = query.count()
-
         # Δημιουργία query σελιδοποίησης
         if page_number > 0 and page_length > 0:
             query = query.limit(page_length)
             query = query.offset((page_number - 1) * page_length)
 
+        logger.log_info(f"Executing {query}")
+        return query.all(), self.__pages(count, page_length)
+
+    @staticmethod
+    def __pages(count: int, page_length: int) -> int:
         if page_length <= 0:
-            count = 1
-        else:
-            count = ceil(count / page_length)
+            return 1
+        return ceil(count / page_length)
 
-        logger.log_info(f"Executing {query}")
-        return query.all(), count
+    def get_customer_page(
+        self,
+        page_length: int,
+        search_query: str = "",
+        sorted_by: str = "",
+        descending: bool = False,
+        cursor: str | None = None,
+    ) -> CustomerPage:
+        """
+        Σελιδοποίηση με κλειδί. Κάθε σελίδα ξεκινάει από το cursor της προηγούμενης, οπότε
+        κοστίζει το ίδιο σε όποιο βάθος κι αν είναι. Δες rantevou.src.model.pagination
+
+        Args:
+            page_length (int): Αποτελέσματα ανα σελίδα
+            search_query (str, optional): Όπως στην get_customers. Defaults to "".
+            sorted_by (str, optional): Στήλη ταξινόμησης, ταξινόμηση με το id εάν είναι
+            άδειο. Defaults to "".
+            descending (bool, optional): True για φθήνουσα. Defaults to False.
+            cursor (str | None, optional): Το next_cursor ή prev_cursor μιας σελίδας με τις
+            ίδιες παραμέτρους. None για την πρώτη σελίδα. Defaults to None.
+
+        Raises:
+            InvalidCursor: Εάν το cursor δεν είναι έγκυρο ή έχει άλλη ταξινόμηση
+
+        Returns:
+            CustomerPage: Οι πελάτες, τα cursors της επόμενης και προηγούμενης σελίδας και,
+            μόνο για την πρώτη σελίδα, το πλήθος των αποτελεσμάτων
+        """
+        position = Cursor.decode(cursor) if cursor else None
+        query = self.session.query(Customer)
+        count = None
+        key_name = sorted_by or "id"
+        key = Customer.__dict__[sorted_by] if sorted_by else None
+        nullable = bool(sorted_by) and Customer.__table__.c[sorted_by].nullable
+        rank = None
+
+        match = self.fts_query(search_query)
+        if match is not None:
+            if position is None:
+                count = self.count_customers(search_query, match, lambda: fts_count(self.session, match))
+            matches = fts_matches(match)
+            query = query.select_from(fts_join(matches))
+            # Η επόμενη σελίδα συνεχίζει με την σειρά της πρώτης, ακόμα και εάν άλλαξε το πλήθος
+            if not sorted_by and (position.key == "rank" if position else count <= MAX_RANKED):
+                key_name, key = "rank", matches.c.rank
+                rank = matches.c.rank
+                query = query.add_columns(rank)
+        elif search_query:
+            ids = self.search_ids(search_query)
+            if ids is not None and len(ids) <= MAX_ID_FILTER:
+                query = query.filter(Customer.id.in_(ids))
+                if position is None:
+                    count = len(ids)
+            else:
+                query = query.filter(self.__like(search_query))
+
+        if position is not None and (position.key != key_name or position.descending != descending):
+            raise InvalidCursor(cursor)
+        if position is None and count is None:
+            count = self.count_customers(search_query, None, lambda: self.__count(search_query, query))
+
+        # Μια εγγραφή παραπάνω δείχνει εάν υπάρχει και άλλη σελίδα προς αυτή την κατεύθυνση
+        rows = seek(query, key, nullable, descending, position, page_length + 1)
+        more = len(rows) > page_length
+        rows = rows[:page_length]
+        backwards = position is not None and position.before
+        if backwards:
+            rows.reverse()
+
+        customers = [row[0] for row in rows] if rank is not None else rows
+        if not customers:
+            return CustomerPage([], count=count)
+
+        def cursor_at(i: int, before: bool) -> str:
+            value = None
+            if rank is not None:
+                value = rows[i][1]
+            elif sorted_by:
+                value = getattr(customers[i], sorted_by)
+            return Cursor(key_name, descending, value, customers[i].id, before).encode()
+
+        # Προς την κατεύθυνση που ήρθαμε υπάρχει πάντα σελίδα, εκτός από την πρώτη
+        has_next = more if not backwards else True
+        has_prev = more if backwards else position is not None
+        return CustomerPage(
+            customers,
+            next_cursor=cursor_at(-1, before=False) if has_next else None,
+            prev_cursor=cursor_at(0, before=True) if has_prev else None,
+            count=count,
+        )
 
     def merge(self, customer: Customer) -> Customer:
         """
@@ -0,0 +1,535 @@
+"""
+Ευρετήρια για την αναζήτηση πελατών.
+
+Το customer_fts είναι πίνακας FTS5 του SQLite πάνω στα normalized ονόματα, το email και
+το τηλέφωνο, που ενημερώνεται από triggers. Ταιριάζει προθέματα λέξεων ("νικ παπ"
+βρίσκει τον Νίκο Παπαδόπουλο) και ταξινομεί τα αποτελέσματα με το bm25. Δημιουργείται
+μόνο εάν το SQLite υποστηρίζει FTS5.
+
+Εάν δεν υπάρχει FTS5, ή εάν το επιλέξουν τα search_settings, χρησιμοποιείται το
+ευρετήριο προθεμάτων στην μνήμη. Τότε τα triggers και ο πίνακας customer_fts διαγράφονται,
+αφού ένα SQLite χωρίς FTS5 δεν μπορεί να γράψει στον customer όσο υπάρχουν τα triggers.
+
+Το LIKE 'q%' του SQLite δεν χρησιμοποιεί τα ευρετήρια των στηλών, επειδή δεν κάνει
+διάκριση πεζών-κεφαλαίων, οπότε κάθε αναζήτηση διαβάζει όλο τον πίνακα. Το CustomerIndex
+κρατάει τα πεδία αναζήτησης όλων των πελατών σε έναν ταξινομημένο πίνακα, όπου οι
+τιμές που ξεκινούν με ένα πρόθεμα είναι μια συνεχόμενη περιοχή που βρίσκεται με δύο
+δυαδικές αναζητήσεις. Επιστρέφει μόνο ids, οι πελάτες διαβάζονται από την βάση
+δεδομένων μόνο για την σελίδα που εμφανίζεται.
+
+Το ευρετήριο φορτώνεται μια φορά, σε background thread εάν είναι ενεργό το
+background_preload. Μέχρι να φορτωθεί οι αναζητήσεις γίνονται με το LIKE.
+
+Χωρίς το ευρετήριο, το SearchCache κρατάει τα αποτελέσματα των πρόσφατων αναζητήσεων με
+το LIKE. Όσο ο χρήστης πληκτρολογεί, κάθε query συνεχίζει το προηγούμενο και τα
+αποτελέσματα του είναι υποσύνολο των προηγούμενων, οπότε βρίσκονται στην μνήμη χωρίς
+να διαβαστεί ξανά ο πίνακας.
+
+Οι αλλαγές της ίδιας διεργασίας εφαρμόζονται αμέσως από το CustomerModel. Οι αλλαγές
+άλλων διεργασιών καταγράφονται από triggers στον πίνακα customer_change, όπως των
+ραντεβού στο rantevou.src.model.coherency.
+"""
+
+from __future__ import annotations
+
+import re
+import string
+import unicodedata
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, defaultdict
+from threading import Lock, Thread
+from time import monotonic
+from typing import Any, Generic, Hashable, Iterable, TypeVar
+
+from sqlalchemy import Engine, Float, Integer, Subquery, bindparam, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import Join
+
+from .entities import Customer
+from ..controller.logging import Logger
+from ..controller import get_config
+
+V = TypeVar("V")
+
+cfg = get_config()
+SYNC_INTERVAL = int(cfg["cache_settings"]["sync_interval_ms"]) / 1000
+BACKGROUND_PRELOAD = bool(cfg["cache_settings"].get("background_preload", True))
+
+logger = Logger("customer-index")
+
+SEARCH_COLUMNS = (
+    Customer.name,
+    Customer.surname,
+    Customer.normalized_name,
+    Customer.normalized_surname,
+    Customer.email,
+    Customer.phone,
+)
+
+CUSTOMER_CHANGE_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS customer_change (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        customer_id INTEGER NOT NULL,
+        created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_change_insert AFTER INSERT ON customer
+    BEGIN
+        INSERT INTO customer_change (customer_id) VALUES (NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_change_update AFTER UPDATE ON customer
+    BEGIN
+        INSERT INTO customer_change (customer_id) VALUES (NEW.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_change_delete AFTER DELETE ON customer
+    BEGIN
+        INSERT INTO customer_change (customer_id) VALUES (OLD.id);
+    END
+    """,
+)
+
+# Το lower του SQLite (χωρίς ICU) αλλάζει μόνο τους λατινικούς χαρακτήρες, όπως το LIKE.
+# Η ταξινόμηση γίνεται στο SQLite, που είναι πολύ πιο γρήγορο από την Python σε αυτό.
+LOAD_KEYS = (
+    " UNION ".join(
+        f"SELECT lower({column.key}) AS key, id FROM customer WHERE {column.key} != ''" for column in SEARCH_COLUMNS
+    )
+    + " ORDER BY key, id"
+)
+# Με external content ο πίνακας κρατάει μόνο το ευρετήριο, τα κείμενα διαβάζονται από
+# τον customer
+CUSTOMER_FTS_TABLE = """
+    CREATE VIRTUAL TABLE customer_fts USING fts5(
+        normalized_name, normalized_surname, email, phone,
+        content = 'customer', content_rowid = 'id', tokenize = 'unicode61'
+    )
+    """
+CUSTOMER_FTS_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_fts_insert AFTER INSERT ON customer
+    BEGIN
+        INSERT INTO customer_fts (rowid, normalized_name, normalized_surname, email, phone)
+        VALUES (NEW.id, NEW.normalized_name, NEW.normalized_surname, NEW.email, NEW.phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_fts_delete AFTER DELETE ON customer
+    BEGIN
+        INSERT INTO customer_fts (customer_fts, rowid, normalized_name, normalized_surname, email, phone)
+        VALUES ('delete', OLD.id, OLD.normalized_name, OLD.normalized_surname, OLD.email, OLD.phone);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS customer_fts_update AFTER UPDATE ON customer
+    BEGIN
+        INSERT INTO customer_fts (customer_fts, rowid, normalized_name, normalized_surname, email, phone)
+        VALUES ('delete', OLD.id, OLD.normalized_name, OLD.normalized_surname, OLD.email, OLD.phone);
+        INSERT INTO customer_fts (rowid, normalized_name, normalized_surname, email, phone)
+        VALUES (NEW.id, NEW.normalized_name, NEW.normalized_surname, NEW.email, NEW.phone);
+    END
+    """,
+)
+CUSTOMER_FTS_TRIGGER_NAMES = ("customer_fts_insert", "customer_fts_delete", "customer_fts_update")
+# Ο προσωρινός πίνακας δεν γράφεται στο αρχείο της βάσης δεδομένων
+FTS5_PROBE = "CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(value)"
+FTS_COUNT = text("SELECT count(*) FROM customer_fts WHERE customer_fts MATCH :match")
+FTS_MATCHES = text("SELECT rowid, rank FROM customer_fts WHERE customer_fts MATCH :match").columns(
+    rowid=Integer, rank=Float
+)
+# Ο tokenizer unicode61 χωρίζει τις λέξεις στα κενά και τα σημεία στίξης, τα σημεία
+# τονισμού που μένουν μετά το NFKD ανήκουν στην λέξη
+FTS_TOKEN = re.compile(r"(?:[^\W_]|[\u0300-\u036f])+")
+
+PRUNE_CHANGES = "DELETE FROM customer_change WHERE created < datetime('now', '-1 day')"
+LAST_SEQ = "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'customer_change'"
+
+# Το LIKE του SQLite δεν κάνει διάκριση πεζών-κεφαλαίων μόνο στους λατινικούς χαρακτήρες
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+MAX_CHAR = chr(0x10FFFF)
+
+
+def install_customer_change_log(engine: Engine) -> None:
+    """
+    Δημιουργεί τον πίνακα customer_change και τα triggers που τον γεμίζουν,
+    εάν δεν υπάρχουν ήδη, και καθαρίζει τις παλιές εγγραφές.
+    """
+    with engine.begin() as connection:
+        for statement in CUSTOMER_CHANGE_DDL:
+            connection.execute(text(statement))
+        connection.execute(text(PRUNE_CHANGES))
+
+
+def fts5_available(engine: Engine) -> bool:
+    """
+    Returns:
+        bool: True εάν το SQLite υποστηρίζει FTS5
+    """
+    try:
+        with engine.connect() as connection:
+            connection.execute(text(FTS5_PROBE))
+            connection.execute(text("DROP TABLE temp.fts5_probe"))
+    except OperationalError as e:
+        logger.log_warn(f"Full text search is not available: {e}")
+        return False
+    return True
+
+
+def install_customer_fts(engine: Engine) -> bool:
+    """
+    Δημιουργεί τον πίνακα customer_fts και τα triggers του, εάν δεν υπάρχουν ήδη. Όταν
+    δημιουργούνται τα triggers ο πίνακας γεμίζει ξανά με όλους τους πελάτες, αφού χωρίς αυτά
+    δεν ενημερωνόταν. Χωρίς FTS5 διαγράφει τα triggers και τον πίνακα με την drop_customer_fts.
+
+    Returns:
+        bool: True εάν η αναζήτηση με FTS5 είναι διαθέσιμη
+    """
+    if not fts5_available(engine):
+        drop_customer_fts(engine)
+        return False
+
+    with engine.begin() as connection:
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'customer_fts'")).first()
+        triggers = connection.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN :names").bindparams(
+                bindparam("names", expanding=True)
+            ),
+            {"names": CUSTOMER_FTS_TRIGGER_NAMES},
+        ).scalar()
+        if exists is None:
+            connection.execute(text(CUSTOMER_FTS_TABLE))
+        if exists is None or triggers < len(CUSTOMER_FTS_TRIGGER_NAMES):
+            for statement in CUSTOMER_FTS_TRIGGERS:
+                connection.execute(text(statement))
+            connection.execute(text("INSERT INTO customer_fts (customer_fts) VALUES ('rebuild')"))
+            logger.log_info("Built customer_fts")
+    return True
+
+
+def drop_customer_fts(engine: Engine) -> None:
+    """
+    Διαγράφει τα triggers του customer_fts και τον πίνακα, όταν η αναζήτηση δεν γίνεται με
+    FTS5. Ένα SQLite χωρίς FTS5 δεν μπορεί να διαγράψει τον πίνακα, αλλά χωρίς τα triggers
+    οι εγγραφές στον customer δεν τον αγγίζουν.
+    """
+    with engine.begin() as connection:
+        for name in CUSTOMER_FTS_TRIGGER_NAMES:
+            connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("DROP TABLE IF EXISTS customer_fts"))
+    except OperationalError as e:
+        logger.log_warn(f"Could not drop customer_fts: {e}")
+
+
+class CrossJoin(Join):
+    """
+    Join που στο SQLite γράφεται ως CROSS JOIN, οπότε ο αριστερός πίνακας είναι πάντα
+    στο εξωτερικό loop.
+    """
+
+    inherit_cache = True
+
+
+@compiles(CrossJoin, "sqlite")
+def compile_cross_join(join: CrossJoin, compiler, **kwargs) -> str:
+    # Ο αριστερός πίνακας είναι το FTS_MATCHES, που δεν περιέχει JOIN
+    return compiler.visit_join(join, **kwargs).replace(" JOIN ", " CROSS JOIN ", 1)
+
+
+def fts_query(query: str) -> str | None:
+    """
+    Μετατρέπει την αναζήτηση σε έκφραση MATCH του FTS5, όπου κάθε λέξη της αναζήτησης
+    είναι πρόθεμα μιας λέξης του πελάτη. Οι λέξεις κανονικοποιούνται όπως τα normalized
+    στοιχεία του Customer.
+
+    Returns:
+        str | None: Η έκφραση ή None εάν η αναζήτηση δεν έχει λέξεις
+    """
+    normalized = unicodedata.normalize("NFKD", query).lower().replace("\u0301", "")
+    tokens = FTS_TOKEN.findall(normalized)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def fts_count(session: Session, match: str) -> int:
+    """
+    Returns:
+        int: Πλήθος πελατών που ταιριάζουν στην έκφραση match, χωρίς join με τον customer
+    """
+    return session.execute(FTS_COUNT, {"match": match}).scalar() or 0
+
+
+def fts_matches(match: str) -> Subquery:
+    """
+    Returns:
+        Subquery: Τα rowid και rank των πελατών που ταιριάζουν στην έκφραση match
+    """
+    return FTS_MATCHES.bindparams(match=match).subquery("fts")
+
+
+def fts_join(matches: Subquery) -> Join:
+    """
+    Οι πελάτες του fts_matches, με το customer_fts πρώτο στο join. Αλλιώς το SQLite
+    μπορεί να διαβάσει τον customer από ένα ευρετήριο, πχ για την ταξινόμηση, και να
+    εκτελεί το MATCH ξανά για κάθε πελάτη.
+    """
+    return CrossJoin(matches, Customer.__table__, Customer.id == matches.c.rowid)
+
+
+def fold(value: str) -> str:
+    return value.translate(ASCII_LOWER)
+
+
+def search_keys(values: Iterable[str | None]) -> tuple[str, ...]:
+    """
+    Returns:
+        tuple[str, ...]: Οι διαφορετικές τιμές των πεδίων αναζήτησης, όπως τις συγκρίνει το LIKE
+    """
+    return tuple({fold(value) for value in values if value})
+
+
+def is_prefix_query(query: str) -> bool:
+    """
+    Returns:
+        bool: False εάν το query περιέχει χαρακτήρες που το LIKE ερμηνεύει ως wildcards
+    """
+    return "%" not in query and "_" not in query
+
+
+class CustomerIndex:
+    """
+    Ταξινομημένος πίνακας (τιμή, id) με τις τιμές όλων των πεδίων αναζήτησης όλων των
+    πελατών, σε δύο παράλληλες λίστες.
+    """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.keys: list[str] = []
+        self.ids: list[int] = []
+        # Οι τιμές κάθε πελάτη στον πίνακα, για την αφαίρεση του
+        self.entries: dict[int, tuple[str, ...]] = {}
+        self.lock = Lock()
+        self.loaded = False
+        self.last_seq = 0
+        self.last_poll = 0.0
+        self.interval = SYNC_INTERVAL
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def start(self, background: bool = BACKGROUND_PRELOAD) -> None:
+        """
+        Φορτώνει το ευρετήριο, σε daemon thread εάν background
+        """
+        if not background:
+            self._safe_load()
+            return
+        Thread(target=self._safe_load, name="customer-index", daemon=True).start()
+
+    def _safe_load(self) -> None:
+        try:
+            self.load()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Οι αναζητήσεις συνεχίζουν με το LIKE
+            logger.log_error(f"Failed to load customer index: {e}")
+
+    def load(self) -> None:
+        """
+        Χτίζει το ευρετήριο από την αρχή
+        """
+        with self.engine.connect() as connection:
+            # Το seq διαβάζεται πρώτο, ώστε μια αλλαγή ανάμεσα στα δύο queries να εφαρμοστεί ξανά
+            last_seq = connection.execute(text(LAST_SEQ)).scalar() or 0
+            pairs = connection.exec_driver_sql(LOAD_KEYS).all()
+
+        entries: dict[int, list[str]] = defaultdict(list)
+        for key, id_ in pairs:
+            entries[id_].append(key)
+        with self.lock:
+            self.entries = {id_: tuple(keys) for id_, keys in entries.items()}
+            self.keys = [key for key, _ in pairs]
+            self.ids = [id_ for _, id_ in pairs]
+            self.last_seq = last_seq
+            self.last_poll = monotonic()
+            self.loaded = True
+        logger.log_info(f"Loaded customer index with {len(entries)} customers")
+
+    def put(self, customer: Customer) -> None:
+        """
+        Καταγράφει έναν νέο ή αλλαγμένο πελάτη
+        """
+        with self.lock:
+            if self.loaded:
+                self._put(customer.id, [getattr(customer, column.key) for column in SEARCH_COLUMNS])
+
+    def remove(self, id_: int) -> None:
+        with self.lock:
+            self._remove(id_)
+
+    def _put(self, id_: int, values: Iterable[str | None]) -> None:
+        self._remove(id_)
+        keys = search_keys(values)
+        for key in keys:
+            i = bisect_right(self.keys, key)
+            self.keys.insert(i, key)
+            self.ids.insert(i, id_)
+        self.entries[id_] = keys
+
+    def _remove(self, id_: int) -> None:
+        for key in self.entries.pop(id_, ()):
+            i = bisect_left(self.keys, key)
+            while i < len(self.keys) and self.keys[i] == key:
+                if self.ids[i] == id_:
+                    del self.keys[i]
+                    del self.ids[i]
+                    break
+                i += 1
+
+    def search(self, query: str) -> list[int] | None:
+        """
+        Βρίσκει τους πελάτες με κάποιο πεδίο που ξεκινάει με το query, όπως το LIKE 'query%'
+
+        Returns:
+            list[int] | None: Τα ids των πελατών σε αύξουσα σειρά. None εάν το ευρετήριο
+            δεν έχει φορτωθεί ακόμα
+        """
+        if not self.loaded:
+            return None
+        self.refresh()
+        prefix = fold(query)
+        with self.lock:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + MAX_CHAR, lo)
+            ids = set(self.ids[lo:hi])
+        return sorted(ids)
+
+    def refresh(self) -> None:
+        """
+        Εφαρμόζει τις αλλαγές άλλων διεργασιών, το πολύ μια φορά ανα sync_interval_ms
+        """
+        if monotonic() - self.last_poll < self.interval:
+            return
+        self.last_poll = monotonic()
+
+        with self.engine.connect() as connection:
+            first_seq = connection.execute(text("SELECT MIN(seq) FROM customer_change")).scalar()
+            changes = connection.execute(
+                text("SELECT seq, customer_id FROM customer_change WHERE seq > :seq ORDER BY seq"),
+                {"seq": self.last_seq},
+            ).all()
+            if not changes:
+                return
+
+            # Οι εγγραφές που χρειαζόμασταν έχουν σβηστεί
+            if first_seq is not None and first_seq > self.last_seq + 1:
+                logger.log_warn("Customer change log was pruned past the last seen change, reloading index")
+                self.load()
+                return
+
+            ids = {customer_id for _, customer_id in changes}
+            rows = connection.execute(select(Customer.id, *SEARCH_COLUMNS).where(Customer.id.in_(ids))).all()
+
+        with self.lock:
+            for id_ in ids:
+                self._remove(id_)
+            for row in rows:
+                self._put(row[0], row[1:])
+            self.last_seq = changes[-1][0]
+        logger.log_debug(f"Applied {len(ids)} customer changes to the index")
+
+
+class ChangeLogCache(Generic[V]):
+    """
+    Cache αποτελεσμάτων αναζήτησης για τα max_size πιο πρόσφατα κλειδιά.
+
+    Αδειάζει σε κάθε εγγραφή πελάτη από αυτή την διεργασία. Τις εγγραφές άλλων διεργασιών
+    τις βρίσκει από τον πίνακα customer_change, με έναν έλεγχο το πολύ ανα sync_interval_ms.
+    """
+
+    def __init__(self, engine: Engine, max_size: int):
+        self.engine = engine
+        self.max_size = max_size
+        self.values: OrderedDict[Hashable, V] = OrderedDict()
+        self.lock = Lock()
+        self.last_seq: int | None = None
+        self.last_poll = 0.0
+        self.interval = SYNC_INTERVAL
+
+    def get(self, key: Hashable) -> V | None:
+        self.poll()
+        with self.lock:
+            value = self.values.get(key)
+            if value is not None:
+                self.values.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        with self.lock:
+            self.values[key] = value
+            self.values.move_to_end(key)
+            while len(self.values) > self.max_size:
+                self.values.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.values.clear()
+
+    def poll(self) -> None:
+        """
+        Αδειάζει το cache εάν άλλαξαν πελάτες από την τελευταία φορά
+        """
+        if monotonic() - self.last_poll < self.interval:
+            return
+        self.last_poll = monotonic()
+        with self.engine.connect() as connection:
+            last_seq = connection.execute(text(LAST_SEQ)).scalar() or 0
+        if last_seq != self.last_seq:
+            self.clear()
+            self.last_seq = last_seq
+
+
+class SearchCache(ChangeLogCache[list[tuple[int, tuple[str, ...]]]]):
+    """
+    Τα αποτελέσματα των πρόσφατων αναζητήσεων με το LIKE 'query%', ως ids με τα κλειδιά
+    αναζήτησης κάθε πελάτη.
+    """
+
+    def put_rows(self, query: str, rows: Iterable[Any]) -> None:
+        """
+        Args:
+            query (str): Η αναζήτηση, χωρίς wildcards
+            rows (Iterable[Any]): Όλα τα αποτελέσματα της, ως (id, *SEARCH_COLUMNS)
+        """
+        self.put(fold(query), [(row[0], search_keys(row[1:])) for row in rows])
+
+    def search(self, query: str) -> list[int] | None:
+        """
+        Βρίσκει τα αποτελέσματα του query από το cache. Εάν δεν υπάρχουν, τα βρίσκει
+        φιλτράροντας τα αποτελέσματα του μεγαλύτερου query του cache που είναι πρόθεμα του.
+
+        Returns:
+            list[int] | None: Τα ids σε αύξουσα σειρά. None εάν κανένα query του cache δεν
+            είναι πρόθεμα του query
+        """
+        prefix = fold(query)
+        entries = self.get(prefix)
+        if entries is None:
+            with self.lock:
+                parents = [key for key in self.values if isinstance(key, str) and prefix.startswith(key)]
+            if not parents:
+                return None
+            entries = self.get(max(parents, key=len))
+            if entries is None:
+                return None
+            entries = [(id_, keys) for id_, keys in entries if any(key.startswith(prefix) for key in keys)]
+            self.put(prefix, entries)
+        return [id_ for id_, _ in entries]
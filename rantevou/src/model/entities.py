@@ -4,6 +4,7 @@
 
 Συμπεριλαμβάνει:
     Appointment: Αναπαράσταση του ραντεβού
+    AppointmentRecord: Ελαφριά αναπαράσταση του ραντεβού μόνο για ανάγνωση, για το cache
     Customer: Αναπαράσταση του πελάτη
 """
 
@@ -11,10 +12,10 @@ from __future__ import annotations
 
 import re
 import unicodedata
-from typing import Any
+from typing import Any, Callable
 from datetime import datetime, timedelta
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase, validates
 
 from .exceptions import ValidationError
@@ -30,18 +31,22 @@ class Appointment(Base):
         date: Ημερομηνία του ραντεβού, μικρότερες μονάδες από τα λεπτά αγνοούνται
         is_alerted: Εάν ο πελάτης έχει ενημερωθεί με email
         customer_id: Εξωτερικό κλειδί, id του πελάτη που σχετίζεται με το ραντεβού
-        employee_id: Για μελλοντική χρήση, το id του εργαζόμενου που εξυπηρετεί
+        employee_id: Το id του εργαζόμενου που εξυπηρετεί. Κάθε εργαζόμενος έχει δικό του
+            ημερολόγιο, η ημερομηνία είναι μοναδική μόνο για τον ίδιο εργαζόμενο
+        version: Αυξάνεται σε κάθε ενημέρωση, για τον εντοπισμό αλλαγών από άλλους
         customer: Ο πελάτης που έχει σχέση με το ραντεβού, ορίζεται από το customer_id
     """
 
     __tablename__ = "appointment"
+    __table_args__ = (Index("ix_appointment_employee_date", "employee_id", "date", unique=True),)
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    date: Mapped[datetime] = mapped_column(nullable=False, unique=True, index=True)
+    date: Mapped[datetime] = mapped_column(nullable=False, index=True)
     is_alerted: Mapped[bool] = mapped_column(default=False)
     duration: Mapped[timedelta] = mapped_column(default=timedelta(minutes=20))
     customer_id: Mapped[int | None] = mapped_column(ForeignKey("customer.id"), nullable=True)
     employee_id: Mapped[int] = mapped_column(default=0)
+    version: Mapped[int] = mapped_column(default=1, server_default=text("1"))
 
     customer = relationship(
         "Customer",
@@ -238,6 +243,98 @@ class Appointment(Base):
         return dict_
 
 
+class AppointmentRecord:
+    """
+    Αναπαράσταση ραντεβού μόνο για ανάγνωση, χωρίς σύνδεση με το session.
+
+    Το cache κρατάει αυτά τα αντικείμενα αντί για Appointment, επειδή δεν έχουν
+    κατάσταση ORM, θέση στο identity map ή φορτωμένο πελάτη και έχουν __slots__.
+    Υποστηρίζουν τις ίδιες μεθόδους ανάγνωσης με το Appointment. Ο πελάτης
+    φορτώνεται μόνο όταν ζητηθεί, μέσω του customer_loader που ορίζει το μοντέλο.
+
+    Για εγγραφή στην βάση δεδομένων χρησιμοποίησε την .to_appointment
+    """
+
+    __slots__ = ("id", "date", "duration", "customer_id", "employee_id", "is_alerted", "version")
+
+    customer_loader: Callable[[int], Customer | None] | None = None
+
+    # Οι περισσότερες διάρκειες είναι ίδιες, το ίδιο timedelta μοιράζεται μεταξύ τους
+    durations: dict[timedelta, timedelta] = {}
+
+    def __init__(
+        self,
+        id: int,
+        date: datetime,
+        duration: timedelta,
+        customer_id: int | None = None,
+        employee_id: int = 0,
+        is_alerted: bool = False,
+        version: int | None = None,
+    ):
+        self.id = id
+        self.date = date
+        self.duration = self.durations.setdefault(duration, duration)
+        self.customer_id = customer_id
+        self.employee_id = employee_id
+        self.is_alerted = bool(is_alerted)
+        self.version = version
+
+    @classmethod
+    def from_appointment(cls, appointment: Appointment | AppointmentRecord) -> AppointmentRecord:
+        if isinstance(appointment, AppointmentRecord):
+            return appointment
+        return cls(
+            appointment.id,
+            appointment.date,
+            appointment.duration,
+            appointment.customer_id,
+            appointment.employee_id or 0,
+            appointment.is_alerted,
+            appointment.version,
+        )
+
+    def to_appointment(self) -> Appointment:
+        """
+        Δημιουργεί Appointment με τα ίδια στοιχεία, για χρήση στις εγγραφές.
+        Το αντικείμενο δεν είναι συνδεδεμένο με το session.
+
+        Returns:
+            Appointment: Transient αντικείμενο με το id του ραντεβού
+        """
+        return Appointment(
+            id=self.id,
+            date=self.date,
+            duration=self.duration,
+            customer_id=self.customer_id,
+            employee_id=self.employee_id,
+            is_alerted=self.is_alerted,
+            version=self.version,
+        )
+
+    @property
+    def customer(self) -> Customer | None:
+        """
+        Returns:
+            Customer | None: Ο πελάτης του ραντεβού, φορτώνεται κατα την κλήση
+        """
+        # Μέσω της κλάσης ώστε μια απλή συνάρτηση να μην γίνει bound method
+        loader = AppointmentRecord.customer_loader
+        if self.customer_id is None or loader is None:
+            return None
+        return loader(self.customer_id)
+
+    __str__ = Appointment.__str__
+    values = Appointment.values
+    end_date = Appointment.end_date
+    time_to_appointment = Appointment.time_to_appointment
+    overlap = Appointment.overlap
+    time_between_appointments = Appointment.time_between_appointments
+    time_between_dates = Appointment.time_between_dates
+    to_dict_api = Appointment.to_dict_api
+    to_dict_native = Appointment.to_dict_native
+
+
 class Customer(Base):
     """
     Ορισμός της οντότητας "πελάτης"
@@ -262,8 +359,8 @@ class Customer(Base):
     __tablename__ = "customer"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    name: Mapped[str] = mapped_column(nullable=False)
-    surname: Mapped[str] = mapped_column(nullable=True)
+    name: Mapped[str] = mapped_column(nullable=False, index=True)
+    surname: Mapped[str] = mapped_column(nullable=True, index=True)
     normalized_name: Mapped[str] = mapped_column(nullable=False, index=True)
     normalized_surname: Mapped[str] = mapped_column(nullable=True, index=True)
     email: Mapped[str] = mapped_column(unique=True, nullable=True, index=True)
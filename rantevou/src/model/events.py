@@ -0,0 +1,232 @@
+"""
+Ειδοποιήσεις των subscribers για αλλαγές στα ραντεβού.
+
+Κάθε εγγραφή δημοσιεύει ένα Change με τα ids και τα διαστήματα των ραντεβού που
+άλλαξαν, ώστε κάθε subscriber να ανανεώνεται μόνο εάν η αλλαγή αφορά την περίοδο
+που δείχνει. Με scheduler (πχ το after_idle του Tk) οι αλλαγές που δημοσιεύονται
+μέχρι να τρέξει ο scheduler ενώνονται σε μια ειδοποίηση.
+
+Οι subscribers κρατιούνται με weak references, ώστε τα widgets που καταστράφηκαν να
+μην μένουν στην μνήμη και να μην ειδοποιούνται.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Iterable
+from weakref import WeakMethod
+
+from .entities import Appointment, AppointmentRecord
+from .interfaces import SubscriberInterface
+from .metrics import LatencyHistogram
+from ..controller.logging import Logger
+
+logger = Logger("appointment-events")
+
+# Πέρα από αυτό το πλήθος διαστημάτων ένα Change κρατάει μόνο ένα που τα καλύπτει όλα
+MAX_RANGES = 64
+MAX_IDS = 1024
+
+
+@dataclass(frozen=True)
+class Change:
+    """
+    Περιγραφή μιας αλλαγής στα ραντεβού.
+
+    Attributes:
+        ids: Τα ids των ραντεβού που άλλαξαν. None εάν δεν είναι γνωστά
+        ranges: Τα διαστήματα [start, end) που επηρεάζονται, με την παλιά και την νέα
+        θέση των ραντεβού. None εάν δεν είναι γνωστά, οπότε επηρεάζονται όλα
+    """
+
+    ids: frozenset[int] | None = frozenset()
+    ranges: tuple[tuple[datetime, datetime], ...] | None = ()
+
+    @classmethod
+    def everything(cls) -> Change:
+        return cls(ids=None, ranges=None)
+
+    @classmethod
+    def of(cls, appointments: Iterable[Appointment | AppointmentRecord]) -> Change:
+        appointments = list(appointments)
+        return cls(
+            ids=frozenset(appointment.id for appointment in appointments),
+            ranges=tuple((appointment.date, appointment.end_date) for appointment in appointments),
+        ).compact()
+
+    @classmethod
+    def at(cls, changes: Iterable[tuple[int, Iterable[tuple[datetime, datetime]]]]) -> Change:
+        """
+        Αλλαγές για τις οποίες δεν υπάρχουν τα ραντεβού αλλά μόνο οι θέσεις τους, πχ από
+        άλλες διεργασίες. Κάθε αλλαγή έχει το id και τα διαστήματα [start, end) της παλιάς
+        και της νέας θέσης του ραντεβού.
+        """
+        ids = set()
+        ranges = []
+        for id_, spans in changes:
+            ids.add(id_)
+            ranges.extend(spans)
+        return cls(ids=frozenset(ids), ranges=tuple(ranges)).compact()
+
+    @property
+    def bounds(self) -> tuple[datetime, datetime] | None:
+        """
+        Returns:
+            tuple[datetime, datetime] | None: Το διάστημα που καλύπτει όλη την αλλαγή
+        """
+        if not self.ranges:
+            return None
+        return min(start for start, _ in self.ranges), max(end for _, end in self.ranges)
+
+    def merge(self, other: Change) -> Change:
+        ids = None if self.ids is None or other.ids is None else self.ids | other.ids
+        ranges = None if self.ranges is None or other.ranges is None else self.ranges + other.ranges
+        return Change(ids=ids, ranges=ranges).compact()
+
+    def compact(self) -> Change:
+        ids = self.ids
+        if ids is not None and len(ids) > MAX_IDS:
+            ids = None
+        ranges = self.ranges
+        if ranges is not None and len(ranges) > MAX_RANGES:
+            ranges = (self.bounds,)  # type: ignore
+        if ids is self.ids and ranges is self.ranges:
+            return self
+        return Change(ids=ids, ranges=ranges)
+
+    def intersects(self, start: datetime, end: datetime) -> bool:
+        """
+        Ελέγχει εάν η αλλαγή επηρεάζει το διάστημα [start, end). Ένα διάστημα μηδενικής
+        διάρκειας επηρεάζει το [start, end) εάν ξεκινάει μέσα σε αυτό.
+        """
+        if self.ranges is None:
+            return True
+        return any(
+            range_start < end and (range_end > start or range_start >= start) for range_start, range_end in self.ranges
+        )
+
+
+class SubscriberRegistry:
+    """
+    Οι subscribers ενός μοντέλου, με weak references στην subscriber_update τους.
+
+    Το registry δεν κρατάει ζωντανούς τους subscribers. Ένα widget που καταστράφηκε και
+    δεν χρησιμοποιείται πουθενά αλλού αφαιρείται αυτόματα στην επόμενη ειδοποίηση.
+    """
+
+    def __init__(self):
+        self.references: list[WeakMethod] = []
+        self.lock = Lock()
+        self.latency = LatencyHistogram()
+        self.pruned = 0
+
+    def add(self, subscriber: SubscriberInterface) -> None:
+        reference = WeakMethod(subscriber.subscriber_update)
+        with self.lock:
+            if reference not in self.references:
+                self.references.append(reference)
+
+    def remove(self, subscriber: SubscriberInterface) -> bool:
+        """
+        Returns:
+            bool: True εάν ο subscriber ήταν δηλωμένος
+        """
+        reference = WeakMethod(subscriber.subscriber_update)
+        with self.lock:
+            if reference not in self.references:
+                return False
+            self.references.remove(reference)
+            return True
+
+    def __len__(self) -> int:
+        return len(self.alive())
+
+    def alive(self) -> list[Callable[..., Any]]:
+        """
+        Returns:
+            list[Callable]: Οι subscriber_update των subscribers που υπάρχουν ακόμα. Οι
+            υπόλοιποι αφαιρούνται.
+        """
+        with self.lock:
+            methods = [reference() for reference in self.references]
+            if None in methods:
+                self.pruned += methods.count(None)
+                self.references = [ref for ref, method in zip(self.references, methods) if method is not None]
+                methods = [method for method in methods if method is not None]
+        return methods  # type: ignore
+
+    def notify(self, *args: Any) -> int:
+        """
+        Καλεί την subscriber_update όλων των subscribers με τα args
+
+        Returns:
+            int: Πλήθος subscribers που ειδοποιήθηκαν
+        """
+        methods = self.alive()
+        start = perf_counter()
+        try:
+            for method in methods:
+                method(*args)
+        finally:
+            self.latency.record((perf_counter() - start) * 1000)
+        return len(methods)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Πλήθος subscribers, πόσοι αφαιρέθηκαν αυτόματα και ιστόγραμμα
+            του χρόνου κάθε ειδοποίησης
+        """
+        return {"subscribers": len(self), "pruned": self.pruned, "latency": self.latency.to_dict()}
+
+
+class EventBus:
+    """
+    Λίστα subscribers και ουρά αλλαγών προς δημοσίευση.
+
+    Χωρίς scheduler οι subscribers ειδοποιούνται αμέσως. Με scheduler, η πρώτη αλλαγή
+    προγραμματίζει την flush και οι επόμενες ενώνονται με αυτή μέχρι να εκτελεστεί.
+    """
+
+    def __init__(self):
+        self.subscribers = SubscriberRegistry()
+        self.scheduler: Callable[[Callable[[], None]], Any] | None = None
+        self.pending: Change | None = None
+        self.lock = Lock()
+
+    def subscribe(self, subscriber: SubscriberInterface) -> None:
+        self.subscribers.add(subscriber)
+
+    def unsubscribe(self, subscriber: SubscriberInterface) -> bool:
+        return self.subscribers.remove(subscriber)
+
+    def set_scheduler(self, scheduler: Callable[[Callable[[], None]], Any] | None) -> None:
+        """
+        Args:
+            scheduler (Callable | None): Δέχεται την flush και την εκτελεί αργότερα, πχ
+            το after_idle του Tk. None για άμεση ειδοποίηση.
+        """
+        self.scheduler = scheduler
+
+    def publish(self, change: Change) -> None:
+        with self.lock:
+            scheduled = self.pending is not None
+            self.pending = change if self.pending is None else self.pending.merge(change)
+            scheduler = self.scheduler
+
+        if scheduler is None:
+            self.flush()
+        elif not scheduled:
+            scheduler(self.flush)
+
+    def flush(self) -> None:
+        with self.lock:
+            change, self.pending = self.pending, None
+        if change is None:
+            return
+
+        count = self.subscribers.notify(change)
+        logger.log_info(f"Excecuted notification of {count} subscribers")
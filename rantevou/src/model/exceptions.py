@@ -158,3 +158,7 @@ class IdOnNewCustomer(CustomerModelException):
 
 class CustomerDBError(CustomerModelException):
     """Some went wrong during db transaction"""
+
+
+class InvalidCursor(CustomerModelException):
+    """Pagination cursor is malformed or belongs to another ordering"""
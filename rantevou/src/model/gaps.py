@@ -0,0 +1,225 @@
+"""
+Υπολογισμός του ελεύθερου χρόνου μεταξύ των ραντεβού με NumPy.
+
+Υπάρχουν δύο τρόποι υπολογισμού των κενών:
+    * cache: Τα ραντεβού του cache μετατρέπονται σε δύο ταξινομημένους πίνακες datetime64
+      με τις αρχές και τα τέλη τους. Τα κενά βρίσκονται με πράξεις σε όλο τον πίνακα
+      αντί για επανάληψη ανα ραντεβού.
+    * sql: Τα κενά υπολογίζονται από το SQLite με window functions και στην Python
+      φτάνουν μόνο τα κενά, όχι τα ραντεβού.
+
+Και στους δύο το αποτέλεσμα είναι πίνακες αρχής και τέλους των κενών, που περιορίζονται
+στο ωράριο με την clip_to_working_hours.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import DateTime, Engine, bindparam, text
+
+from .caching import MAX_DURATION
+from .entities import Appointment, AppointmentRecord
+from .session import engine
+from ..controller import get_config
+
+cfg = get_config()["view_settings"]
+OPENING_HOUR = timedelta(hours=int(cfg["opening_hour"]))
+WORKING_HOURS = timedelta(hours=int(cfg["working_hours"]))
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+SECOND = timedelta(seconds=1)
+
+DAY = np.timedelta64(1, "D")
+TICK = np.timedelta64(1, "us")
+
+
+def to_arrays(appointments: Iterable[Appointment | AppointmentRecord]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Μετατρέπει τα ραντεβού σε πίνακες αρχής και τέλους, ταξινομημένους με βάση την αρχή
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Αρχές και τέλη σε datetime64[us]
+    """
+    appointments = list(appointments)
+    # Η μετατροπή των datetime απευθείας σε datetime64 είναι πολύ πιο αργή από τους ακεραίους
+    starts = np.fromiter(((a.date - EPOCH) // MICROSECOND for a in appointments), np.int64, len(appointments))
+    durations = np.fromiter((a.duration // MICROSECOND for a in appointments), np.int64, len(appointments))
+    starts = starts.astype("datetime64[us]")
+    durations = durations.astype("timedelta64[us]")
+    order = np.argsort(starts, kind="stable")
+    starts = starts[order]
+    return starts, starts + durations[order]
+
+
+def find_gaps(
+    starts: np.ndarray,
+    ends: np.ndarray,
+    start_date: datetime,
+    end_date: datetime,
+    minimum: timedelta,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Βρίσκει τα κενά τουλάχιστον minimum μεταξύ των ραντεβού μέσα στο [start_date, end_date).
+
+    Τα ραντεβού που επικαλύπτονται μετράνε ως ένα συνεχές διάστημα, με τέλος το
+    μεγαλύτερο τέλος μέχρι εκείνο το σημείο.
+
+    Args:
+        starts (np.ndarray): Ταξινομημένες αρχές των ραντεβού σε datetime64[us]
+        ends (np.ndarray): Τα αντίστοιχα τέλη των ραντεβού
+        start_date (datetime): Αρχή της αναζήτησης
+        end_date (datetime): Τέλος της αναζήτησης
+        minimum (timedelta): Ελάχιστη διάρκεια κενού
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Αρχές και τέλη των κενών
+    """
+    start = np.datetime64(start_date, "us")
+    end = np.datetime64(end_date, "us")
+
+    # Το κενό πριν από κάθε ραντεβού ξεκινάει εκεί που τελειώνουν όλα τα προηγούμενα
+    busy_until = np.maximum.accumulate(ends) if len(ends) else ends
+    gap_starts = np.maximum(np.concatenate(([start], busy_until)), start)
+    gap_ends = np.minimum(np.concatenate((starts, [end])), end)
+
+    return select_gaps(gap_starts, gap_ends, minimum)
+
+
+# Οι ημερομηνίες μετατρέπονται σε δευτερόλεπτα από το 1970 μέσω της julianday, που σε
+# αντίθεση με την unixepoch υπάρχει σε όλες τις εκδόσεις του SQLite. Το duration
+# αποθηκεύεται ως ημερομηνία μετά την 1/1/1970, οπότε η ίδια μετατροπή δίνει την διάρκεια.
+# Το busy_until είναι το μεγαλύτερο τέλος μέχρι κάθε ραντεβού, ώστε τα ραντεβού που
+# επικαλύπτονται να μετράνε ως ένα διάστημα.
+GAPS_SQL = """
+    WITH spans AS (
+        SELECT
+            CAST(round((julianday(date) - 2440587.5) * 86400) AS INTEGER) AS start_s,
+            CAST(round((julianday(date) + julianday(duration) - 4881175) * 86400) AS INTEGER) AS end_s
+        FROM appointment
+        WHERE {employee}date >= :from_date AND date < :to_date
+    ),
+    busy AS (
+        SELECT start_s, MAX(end_s) OVER (ORDER BY start_s ROWS UNBOUNDED PRECEDING) AS busy_until
+        FROM spans
+    ),
+    gaps AS (
+        SELECT LAG(busy_until, 1, :start_s) OVER (ORDER BY start_s) AS gap_start, start_s AS gap_end
+        FROM busy
+        UNION ALL
+        SELECT COALESCE(MAX(busy_until), :start_s), :end_s
+        FROM busy
+    )
+    SELECT MAX(gap_start, :start_s) AS gap_start, MIN(gap_end, :end_s) AS gap_end
+    FROM gaps
+    WHERE MIN(gap_end, :end_s) - MAX(gap_start, :start_s) >= MAX(:minimum_s, 1)
+    ORDER BY gap_start
+    """
+_DATES = (bindparam("from_date", type_=DateTime()), bindparam("to_date", type_=DateTime()))
+GAPS_QUERY = text(GAPS_SQL.format(employee="")).bindparams(*_DATES)
+# Ξεχωριστό query και όχι "(:employee_id IS NULL OR ...)", ώστε το SQLite να διαβάζει
+# μόνο τα ραντεβού του εργαζόμενου από το ευρετήριο (employee_id, date)
+EMPLOYEE_GAPS_QUERY = text(GAPS_SQL.format(employee="employee_id = :employee_id AND ")).bindparams(*_DATES)
+
+
+def query_gaps(
+    start_date: datetime,
+    end_date: datetime,
+    minimum: timedelta,
+    lookbehind: timedelta | None = None,
+    bind: Engine = engine,
+    employee_id: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Υπολογίζει τα κενά όπως η find_gaps, αλλά μέσα στο SQLite με window functions.
+
+    Args:
+        start_date (datetime): Αρχή της αναζήτησης
+        end_date (datetime): Τέλος της αναζήτησης
+        minimum (timedelta): Ελάχιστη διάρκεια κενού
+        lookbehind (timedelta | None, optional): Πόσο πριν το start_date ψάχνονται ραντεβού
+        που μπορεί να συνεχίζονται μέσα στο διάστημα. Πρέπει να είναι τουλάχιστον η μεγαλύτερη
+        διάρκεια στην βάση δεδομένων. Defaults to None, όπου διαβάζεται από την βάση δεδομένων.
+        bind (Engine, optional): Η βάση δεδομένων. Defaults to engine.
+        employee_id (int | None, optional): Μόνο τα ραντεβού του εργαζόμενου. Defaults to
+        None, όπου τα κενά είναι οι χρόνοι που κανένας εργαζόμενος δεν έχει ραντεβού.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Αρχές και τέλη των κενών σε datetime64[us]
+    """
+    parameters = {
+        "to_date": end_date,
+        "start_s": (start_date - EPOCH) // SECOND,
+        "end_s": (end_date - EPOCH) // SECOND,
+        "minimum_s": -(-minimum // SECOND),
+    }
+    query = GAPS_QUERY
+    if employee_id is not None:
+        query = EMPLOYEE_GAPS_QUERY
+        parameters["employee_id"] = employee_id
+    with bind.connect() as connection:
+        if lookbehind is None:
+            lookbehind = connection.execute(MAX_DURATION).scalar() or timedelta(0)
+        parameters["from_date"] = start_date - lookbehind
+        rows = connection.execute(query, parameters).all()
+
+    # Το np.array πάνω σε αντικείμενα Row είναι πολύ πιο αργό από την fromiter
+    values = np.fromiter(chain.from_iterable(rows), np.int64, 2 * len(rows))
+    result = values.reshape(-1, 2).astype("datetime64[s]").astype("datetime64[us]")
+    return result[:, 0], result[:, 1]
+
+
+def clip_to_working_hours(
+    gap_starts: np.ndarray,
+    gap_ends: np.ndarray,
+    minimum: timedelta,
+    opening_hour: timedelta = OPENING_HOUR,
+    working_hours: timedelta = WORKING_HOURS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Περιορίζει τα κενά στο ωράριο λειτουργίας. Ένα κενό που καλύπτει πολλές μέρες
+    σπάει σε ένα κενό ανα μέρα. Όσα κομμάτια μένουν μικρότερα από minimum αγνοούνται.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Αρχές και τέλη των κενών μέσα στο ωράριο
+    """
+    if not len(gap_starts):
+        return gap_starts, gap_ends
+
+    opening = np.timedelta64(opening_hour, "us")
+    working = np.timedelta64(working_hours, "us")
+
+    # Η μέρα κάθε χρονικής στιγμής μετράει από την ώρα ανοίγματος
+    first_day = (gap_starts - opening).astype("datetime64[D]")
+    last_day = (gap_ends - opening - TICK).astype("datetime64[D]")
+    counts = (last_day - first_day) // DAY + 1
+
+    # Ένα κομμάτι για κάθε μέρα που καλύπτει κάθε κενό
+    owner = np.repeat(np.arange(len(gap_starts)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    opens = (first_day[owner] + offset * DAY).astype("datetime64[us]") + opening
+
+    piece_starts = np.maximum(gap_starts[owner], opens)
+    piece_ends = np.minimum(gap_ends[owner], opens + working)
+    return select_gaps(piece_starts, piece_ends, minimum)
+
+
+def select_gaps(gap_starts: np.ndarray, gap_ends: np.ndarray, minimum: timedelta) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Κρατάει τα μη κενά διαστήματα με διάρκεια τουλάχιστον minimum
+    """
+    durations = gap_ends - gap_starts
+    mask = (durations > np.timedelta64(0, "us")) & (durations >= np.timedelta64(minimum, "us"))
+    return gap_starts[mask], gap_ends[mask]
+
+
+def to_list(gap_starts: np.ndarray, gap_ends: np.ndarray) -> list[tuple[datetime, timedelta]]:
+    """
+    Μετατρέπει τα κενά στην μορφή που επιστρέφει το μοντέλο, ζεύγη αρχής και διάρκειας
+    """
+    return list(zip(gap_starts.tolist(), (gap_ends - gap_starts).tolist()))
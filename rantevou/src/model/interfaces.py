@@ -3,13 +3,14 @@
 Δεν προορίζονται για instantiation.
 """
 
-from typing import Protocol, runtime_checkable
+from typing import Any, Protocol, runtime_checkable
 
 
 @runtime_checkable
 class SubscriberInterface(Protocol):
     """
-    Ορισμός του subscriber interface για τα models
+    Ορισμός του subscriber interface για τα models. Το AppointmentModel δίνει
+    ένα rantevou.src.model.events.Change με την αλλαγή, το CustomerModel τίποτα.
     """
 
-    def subscriber_update(self): ...
+    def subscriber_update(self, change: Any = None): ...
@@ -0,0 +1,97 @@
+"""
+Κλείδωμα readers-writer για τις δομές του μοντέλου που μοιράζονται μεταξύ threads,
+όπως το AppointmentCache όταν τρέχει ο threaded Flask server.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from threading import Condition, Lock, get_ident
+from typing import Generator
+
+
+class ReadWriteLock:
+    """
+    Επιτρέπει πολλούς αναγνώστες ταυτόχρονα ή έναν μόνο writer.
+
+    * Προτεραιότητα στους writers: όσο περιμένει writer δεν μπαίνουν νέοι αναγνώστες.
+    * Reentrant: ένα thread μπορεί να ξαναπάρει το κλείδωμα που ήδη κρατάει και ο
+      writer μπορεί να πάρει και κλείδωμα ανάγνωσης.
+    * Δεν επιτρέπεται αναβάθμιση από ανάγνωση σε εγγραφή, θα προκαλούσε deadlock
+      με δεύτερο αναγνώστη που κάνει το ίδιο.
+
+    >>> lock = ReadWriteLock()
+    >>> with lock.read():
+    ...     pass
+    >>> with lock.write():
+    ...     pass
+    """
+
+    def __init__(self):
+        self.condition = Condition(Lock())
+        self.readers: dict[int, int] = {}
+        self.writer: int | None = None
+        self.writer_depth = 0
+        self.waiting_writers = 0
+
+    def acquire_read(self) -> None:
+        me = get_ident()
+        with self.condition:
+            if self.writer == me or me in self.readers:
+                self.readers[me] = self.readers.get(me, 0) + 1
+                return
+            while self.writer is not None or self.waiting_writers:
+                self.condition.wait()
+            self.readers[me] = 1
+
+    def release_read(self) -> None:
+        me = get_ident()
+        with self.condition:
+            count = self.readers[me] - 1
+            if count:
+                self.readers[me] = count
+                return
+            del self.readers[me]
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self) -> None:
+        me = get_ident()
+        with self.condition:
+            if self.writer == me:
+                self.writer_depth += 1
+                return
+            if me in self.readers:
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+
+            self.waiting_writers += 1
+            try:
+                while self.writer is not None or self.readers:
+                    self.condition.wait()
+            finally:
+                self.waiting_writers -= 1
+            self.writer = me
+            self.writer_depth = 1
+
+    def release_write(self) -> None:
+        with self.condition:
+            self.writer_depth -= 1
+            if self.writer_depth == 0:
+                self.writer = None
+                self.condition.notify_all()
+
+    @contextmanager
+    def read(self) -> Generator[None, None, None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Generator[None, None, None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
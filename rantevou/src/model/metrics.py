@@ -0,0 +1,43 @@
+"""
+Μετρήσεις χρόνων εκτέλεσης για διαγνωστικούς σκοπούς
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Any
+
+# Όρια (σε ms) των κάδων του ιστογράμματος καθυστέρησης
+LATENCY_BOUNDS_MS = (0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+
+class LatencyHistogram:
+    """
+    Ιστόγραμμα χρόνων εκτέλεσης μιας λειτουργίας, πχ του cache ή των ειδοποιήσεων
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float) -> None:
+        self.counts[bisect_left(LATENCY_BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def to_dict(self) -> dict[str, Any]:
+        # Ο τελευταίος κάδος (le_ms=None) μετράει ότι ξεπερνάει το μεγαλύτερο όριο
+        bounds: list[float | None] = [*LATENCY_BOUNDS_MS, None]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else 0,
+            "max_ms": round(self.max_ms, 4),
+            "buckets": [{"le_ms": bound, "count": count} for bound, count in zip(bounds, self.counts)],
+        }
@@ -0,0 +1,70 @@
+"""
+Αλλαγές στο σχήμα βάσεων δεδομένων που δημιουργήθηκαν από παλαιότερες εκδόσεις.
+
+Το create_all δημιουργεί μόνο όσους πίνακες λείπουν και δεν αλλάζει τους υπάρχοντες.
+Κάθε αλλαγή ελέγχει πρώτα εάν έχει ήδη εφαρμοστεί, ώστε να μπορεί να τρέχει σε κάθε εκκίνηση.
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Connection, Engine
+
+from ..controller.logging import Logger
+
+logger = Logger("migrations")
+
+
+def columns(connection: Connection, table: str) -> set[str]:
+    return {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def add_appointment_version(connection: Connection) -> None:
+    if "version" in columns(connection, "appointment"):
+        return
+    logger.log_info("Adding version column to appointment")
+    connection.exec_driver_sql("ALTER TABLE appointment ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def indexes(connection: Connection, table: str) -> dict[str, bool]:
+    """
+    Returns:
+        dict[str, bool]: Τα ευρετήρια του πίνακα και εάν είναι unique
+    """
+    return {row[1]: bool(row[2]) for row in connection.exec_driver_sql(f"PRAGMA index_list({table})")}
+
+
+def scope_appointment_date_to_employee(connection: Connection) -> None:
+    # Η ημερομηνία ήταν μοναδική σε όλη την βάση δεδομένων. Η μοναδικότητα υπήρχε μόνο
+    # στο ευρετήριο, οπότε αρκεί να αντικατασταθεί χωρίς να ξαναχτιστεί ο πίνακας
+    existing = indexes(connection, "appointment")
+    if existing.get("ix_appointment_date"):
+        logger.log_info("Replacing unique appointment date index")
+        connection.exec_driver_sql("DROP INDEX ix_appointment_date")
+        connection.exec_driver_sql("CREATE INDEX ix_appointment_date ON appointment (date)")
+    if "ix_appointment_employee_date" not in existing:
+        logger.log_info("Adding (employee_id, date) index to appointment")
+        connection.exec_driver_sql(
+            "CREATE UNIQUE INDEX ix_appointment_employee_date ON appointment (employee_id, date)"
+        )
+
+
+def add_customer_sort_indexes(connection: Connection) -> None:
+    # Η σελιδοποίηση με κλειδί χρειάζεται ευρετήριο σε κάθε στήλη ταξινόμησης. Τα email
+    # και phone έχουν ήδη από το unique
+    existing = indexes(connection, "customer")
+    for column in ("name", "surname"):
+        if f"ix_customer_{column}" not in existing:
+            logger.log_info(f"Adding {column} index to customer")
+            connection.exec_driver_sql(f"CREATE INDEX ix_customer_{column} ON customer ({column})")
+
+
+MIGRATIONS = (add_appointment_version, scope_appointment_date_to_employee, add_customer_sort_indexes)
+
+
+def migrate(engine: Engine) -> None:
+    """
+    Εφαρμόζει όσες αλλαγές σχήματος λείπουν, σε ένα transaction
+    """
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            migration(connection)
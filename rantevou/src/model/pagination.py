@@ -0,0 +1,160 @@
+"""
+Σελιδοποίηση με κλειδί (keyset) για τους πελάτες.
+
+Αντί για OFFSET, κάθε σελίδα ξεκινάει μετά την τελευταία εγγραφή της προηγούμενης, με
+συνθήκη (στήλη ταξινόμησης, id) > (τιμή, id) που το SQLite απαντάει από το ευρετήριο της
+στήλης. Έτσι η σελίδα 5000 κοστίζει όσο η πρώτη. Η θέση δίνεται στην καλούσα ως cursor,
+ένα κείμενο που απλά επιστρέφεται για την επόμενη ή την προηγούμενη σελίδα.
+
+Το SQLite βάζει τα NULL πρώτα στην αύξουσα σειρά. Σε στήλες που δέχονται NULL οι εγγραφές
+χωρίζονται σε δύο τμήματα, με και χωρίς τιμή, που διαβάζονται με ξεχωριστά queries, αφού
+ένα "OR στήλη IS NULL" στην συνθήκη δεν αφήνει το SQLite να χρησιμοποιήσει το ευρετήριο.
+
+Το πλήθος των αποτελεσμάτων κάθε αναζήτησης κρατιέται στο CountCache, ώστε η αλλαγή
+σελίδας και η επανάληψη μιας αναζήτησης να μην μετράνε ξανά όλο τον πίνακα.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import ColumnElement, tuple_
+from sqlalchemy.orm import Query
+
+from .entities import Customer
+from .exceptions import InvalidCursor
+from .customer_index import ChangeLogCache
+
+
+@dataclass(frozen=True)
+class Cursor:
+    """
+    Θέση σε μια ταξινομημένη λίστα πελατών.
+
+    Attributes:
+        key: Το κλειδί ταξινόμησης, όνομα στήλης, "rank" ή "id"
+        descending: Εάν η ταξινόμηση είναι φθίνουσα
+        value: Η τιμή του κλειδιού στην εγγραφή. None για το "id"
+        id: Το id της εγγραφής
+        before: True για τις εγγραφές πριν από αυτή, False για τις επόμενες
+    """
+
+    key: str
+    descending: bool
+    value: Any
+    id: int
+    before: bool = False
+
+    def encode(self) -> str:
+        payload = json.dumps([self.key, self.descending, self.value, self.id, self.before], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> Cursor:
+        """
+        Raises:
+            InvalidCursor: Εάν το token δεν είναι cursor
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+            key, descending, value, id_, before = payload
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError) as e:
+            raise InvalidCursor(token) from e
+        if not isinstance(key, str) or not isinstance(id_, int):
+            raise InvalidCursor(token)
+        if not isinstance(value, (str, int, float, type(None))):
+            raise InvalidCursor(token)
+        return cls(key, bool(descending), value, id_, bool(before))
+
+
+@dataclass
+class CustomerPage:
+    """
+    Μια σελίδα πελατών.
+
+    Attributes:
+        customers: Οι πελάτες της σελίδας
+        next_cursor: Cursor για την επόμενη σελίδα. None εάν αυτή είναι η τελευταία
+        prev_cursor: Cursor για την προηγούμενη σελίδα. None εάν αυτή είναι η πρώτη
+        count: Πλήθος όλων των αποτελεσμάτων. Υπολογίζεται μόνο για την πρώτη σελίδα
+    """
+
+    customers: list[Customer]
+    next_cursor: str | None = None
+    prev_cursor: str | None = None
+    count: int | None = None
+
+
+def seek(
+    query: Query,
+    key: ColumnElement | None,
+    nullable: bool,
+    descending: bool,
+    position: Cursor | None,
+    limit: int,
+) -> list[Any]:
+    """
+    Διαβάζει μέχρι limit εγγραφές του query μετά ή πριν από το position, ταξινομημένες
+    με βάση το key και το id.
+
+    Args:
+        query (Query): Το query αναζήτησης, χωρίς ταξινόμηση και σελιδοποίηση
+        key (ColumnElement | None): Η στήλη ταξινόμησης. None για ταξινόμηση με το id
+        nullable (bool): Εάν η στήλη δέχεται NULL
+        descending (bool): Φθίνουσα ταξινόμηση
+        position (Cursor | None): Η θέση. None για την αρχή της λίστας
+        limit (int): Μέγιστο πλήθος εγγραφών
+
+    Returns:
+        list[Any]: Οι εγγραφές με την σειρά που διαβάστηκαν, δηλαδή από το position προς
+        τα πίσω εάν position.before
+    """
+    backwards = position is not None and position.before
+    reverse = descending != backwards
+
+    def after(left: Any, right: Any) -> ColumnElement[bool]:
+        return left < right if reverse else left > right
+
+    def order(*columns: Any) -> list[Any]:
+        return [column.desc() if reverse else column.asc() for column in columns]
+
+    if key is None:
+        segments = [(None, None)]
+    elif not nullable:
+        segments = [(key, None)]
+    else:
+        # Τα NULL είναι πρώτα στην αύξουσα σειρά και τελευταία στην φθίνουσα
+        segments = [(None, key.is_(None)), (key, key.is_not(None))]
+        if reverse:
+            segments.reverse()
+
+    rows: list[Any] = []
+    started = position is None
+    for column, condition in segments:
+        segment = query if condition is None else query.filter(condition)
+        if not started:
+            # Το τμήμα του position, τα προηγούμενα έχουν ήδη περάσει
+            in_nulls = position.value is None  # type: ignore
+            if nullable and (column is None) != in_nulls:
+                continue
+            started = True
+            if column is None:
+                segment = segment.filter(after(Customer.id, position.id))  # type: ignore
+            else:
+                seek_from = tuple_(position.value, position.id)  # type: ignore
+                segment = segment.filter(after(tuple_(column, Customer.id), seek_from))
+        columns = (Customer.id,) if column is None else (column, Customer.id)
+        rows.extend(segment.order_by(*order(*columns)).limit(limit - len(rows)).all())
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+class CountCache(ChangeLogCache[int]):
+    """
+    Το πλήθος των αποτελεσμάτων ανα αναζήτηση
+    """
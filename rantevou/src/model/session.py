@@ -1,11 +1,14 @@
+import os
 from pathlib import Path
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 
 from .entities import Base
+from .migrations import migrate
 
-DB_PATH = Path(__file__).parent.parent.parent / "data" / "rantevou.db"
+# Το RANTEVOU_DB επιτρέπει την χρήση άλλης βάσης δεδομένων, πχ στα tests
+DB_PATH = Path(os.environ.get("RANTEVOU_DB") or Path(__file__).parent.parent.parent / "data" / "rantevou.db")
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{str(DB_PATH)}"
 
 if not DB_PATH.exists():
@@ -14,5 +17,9 @@ if not DB_PATH.exists():
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
 Base.metadata.create_all(bind=engine)
+migrate(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-session = SessionLocal()
+
+# Κάθε thread (πχ τα requests του threaded Flask server) έχει το δικό του session.
+# Το session είναι proxy προς το session του τρέχοντος thread.
+session = scoped_session(SessionLocal)
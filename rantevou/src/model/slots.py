@@ -0,0 +1,208 @@
+"""
+Ευρετήριο ελεύθερου χρόνου για την εύρεση του πρώτου κενού μιας ελάχιστης διάρκειας
+μετά από μια χρονική στιγμή, χωρίς υπολογισμό όλων των κενών του διαστήματος.
+
+Ο χρόνος χωρίζεται σε θέσεις των step λεπτών. Κάθε θέση μετράει πόσα ραντεβού την
+καλύπτουν, ενώ οι θέσεις εκτός ωραρίου είναι μόνιμα κατειλημμένες. Ένα segment tree
+κρατάει για κάθε κόμβο το μήκος της ελεύθερης σειράς θέσεων στην αρχή του, στο τέλος
+του και την μεγαλύτερη μέσα του, οπότε η αναζήτηση και η ενημέρωση κοστίζουν O(log n).
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Iterable
+
+from .entities import Appointment, AppointmentRecord
+from ..controller import get_config
+
+cfg = get_config()
+STEP = timedelta(minutes=int(cfg["view_settings"]["step"]))
+OPENING_HOUR = timedelta(hours=int(cfg["view_settings"]["opening_hour"]))
+WORKING_HOURS = timedelta(hours=int(cfg["view_settings"]["working_hours"]))
+HORIZON = timedelta(days=int(cfg["cache_settings"]["slot_index_days"]))
+
+DAY = timedelta(days=1)
+
+
+class FreeSlotIndex:
+    """
+    Segment tree πάνω στις θέσεις των step λεπτών από start μέχρι start + horizon.
+
+    >>> index = FreeSlotIndex(datetime(2025, 6, 9))
+    >>> index.find(datetime(2025, 6, 9, 8), timedelta(minutes=40))
+    (datetime.datetime(2025, 6, 9, 9, 0), datetime.timedelta(seconds=28800))
+    """
+
+    def __init__(
+        self,
+        start: datetime,
+        horizon: timedelta = HORIZON,
+        step: timedelta = STEP,
+        opening_hour: timedelta = OPENING_HOUR,
+        working_hours: timedelta = WORKING_HOURS,
+    ):
+        self.start = start
+        self.end = start + horizon
+        self.step = step
+        self.size = horizon // step
+        self.lock = Lock()
+
+        self.leaves = 1
+        while self.leaves < self.size:
+            self.leaves *= 2
+
+        # Οι θέσεις εκτός ωραρίου ξεκινούν με ένα ραντεβού που δεν αφαιρείται ποτέ
+        self.counts = [0] * self.size
+        midnight = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        for i in range(self.size):
+            time_of_day = (start - midnight + i * step - opening_hour) % DAY
+            if time_of_day >= working_hours:
+                self.counts[i] = 1
+
+        # Οι θέσεις πέρα από το size, μέχρι την δύναμη του 2, μένουν κατειλημμένες
+        self.prefix = [0] * (2 * self.leaves)
+        self.suffix = [0] * (2 * self.leaves)
+        self.best = [0] * (2 * self.leaves)
+        self.spans: dict[int, tuple[int, int]] = {}
+        self._build()
+
+    def load(self, appointments: Iterable[Appointment | AppointmentRecord]) -> None:
+        """
+        Καταγράφει πολλά ραντεβού μαζί και ξαναχτίζει το δέντρο μια φορά, σε O(n)
+        """
+        with self.lock:
+            for appointment in appointments:
+                span = self._span(appointment)
+                if span is None:
+                    continue
+                self.spans[appointment.id] = span
+                for i in range(*span):
+                    self.counts[i] += 1
+            self._build()
+
+    def _build(self) -> None:
+        for i in range(self.size):
+            free = int(self.counts[i] == 0)
+            node = self.leaves + i
+            self.prefix[node] = self.suffix[node] = self.best[node] = free
+        for node in range(self.leaves - 1, 0, -1):
+            self._pull(node, self.leaves >> (node.bit_length() - 1))
+
+    def add(self, appointment: Appointment | AppointmentRecord) -> None:
+        """
+        Καταγράφει ένα νέο ραντεβού. Εάν υπάρχει ήδη το ραντεβού με το ίδιο id, αντικαθίσταται.
+        """
+        with self.lock:
+            self._remove(appointment.id)
+            span = self._span(appointment)
+            if span is None:
+                return
+            self.spans[appointment.id] = span
+            self._update(span, 1)
+
+    def remove(self, id: int) -> None:
+        with self.lock:
+            self._remove(id)
+
+    def _remove(self, id: int | None) -> None:
+        span = self.spans.pop(id, None) if id is not None else None
+        if span is not None:
+            self._update(span, -1)
+
+    def find(self, after: datetime, duration: timedelta) -> tuple[datetime, timedelta] | None:
+        """
+        Βρίσκει το πρώτο κενό διάρκειας τουλάχιστον duration που ξεκινάει από το after
+        και μετά. Τα κενά ξεκινούν πάντα σε αρχή θέσης.
+
+        Returns:
+            tuple[datetime, timedelta] | None: Αρχή και συνολική διάρκεια του κενού ή None
+            εάν δεν υπάρχει μέχρι το τέλος του ευρετηρίου
+        """
+        first = max(0, -((self.start - after) // self.step))
+        slots = max(1, -(-duration // self.step))
+        with self.lock:
+            if first >= self.size:
+                return None
+            position = self._find(1, 0, self.leaves, first, slots, 0)[0]
+            if position is None:
+                return None
+            end = self._first_busy(1, 0, self.leaves, position)
+        end = self.size if end is None else min(end, self.size)
+        return self.start + position * self.step, (end - position) * self.step
+
+    def covers(self, date: datetime) -> bool:
+        """
+        True εάν το date είναι στο πρώτο μισό του ευρετηρίου, ώστε μια αναζήτηση από
+        αυτό να καλύπτει τουλάχιστον το μισό horizon
+        """
+        return self.start <= date < self.start + (self.end - self.start) / 2
+
+    def _span(self, appointment: Appointment | AppointmentRecord) -> tuple[int, int] | None:
+        """
+        Οι θέσεις που τέμνει το ραντεβού, μέσα στα όρια του ευρετηρίου
+        """
+        first = max(0, (appointment.date - self.start) // self.step)
+        last = min(self.size, -((self.start - appointment.date - appointment.duration) // self.step))
+        if first >= last:
+            return None
+        return first, last
+
+    def _update(self, span: tuple[int, int], delta: int) -> None:
+        for i in range(*span):
+            count = self.counts[i] + delta
+            self.counts[i] = count
+            node = self.leaves + i
+            free = int(count == 0)
+            if self.best[node] == free:
+                continue
+            self.prefix[node] = self.suffix[node] = self.best[node] = free
+            length = 1
+            node //= 2
+            while node:
+                length *= 2
+                self._pull(node, length)
+                node //= 2
+
+    def _pull(self, node: int, length: int) -> None:
+        left, right = 2 * node, 2 * node + 1
+        half = length // 2
+        prefix, suffix, best = self.prefix, self.suffix, self.best
+        prefix[node] = prefix[left] if prefix[left] < half else half + prefix[right]
+        suffix[node] = suffix[right] if suffix[right] < half else half + suffix[left]
+        best[node] = max(best[left], best[right], suffix[left] + prefix[right])
+
+    def _find(self, node: int, lo: int, hi: int, first: int, slots: int, carry: int) -> tuple[int | None, int]:
+        """
+        Διατρέχει τους κόμβους από αριστερά προς τα δεξιά. Το carry είναι το μήκος της
+        ελεύθερης σειράς που τελειώνει ακριβώς πριν το lo και ξεκινάει μετά το first.
+
+        Returns:
+            tuple[int | None, int]: Η θέση του κενού, εάν βρέθηκε, και το νέο carry
+        """
+        if hi <= first:
+            return None, 0
+        if lo >= first:
+            if carry + self.prefix[node] >= slots:
+                return lo - carry, 0
+            if self.best[node] < slots:
+                length = hi - lo
+                return None, carry + length if self.prefix[node] == length else self.suffix[node]
+
+        mid = (lo + hi) // 2
+        position, carry = self._find(2 * node, lo, mid, first, slots, carry)
+        if position is not None:
+            return position, 0
+        return self._find(2 * node + 1, mid, hi, first, slots, carry)
+
+    def _first_busy(self, node: int, lo: int, hi: int, first: int) -> int | None:
+        if hi <= first or self.prefix[node] == hi - lo:
+            return None
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        position = self._first_busy(2 * node, lo, mid, first)
+        if position is not None:
+            return position
+        return self._first_busy(2 * node + 1, mid, hi, first)
@@ -0,0 +1,191 @@
+"""
+Αποθήκευση του cache των ραντεβού σε αρχείο, ώστε η εφαρμογή να ξεκινάει με
+γεμάτο cache χωρίς να διαβάσει ξανά το αρχικό παράθυρο από την βάση δεδομένων.
+
+Το αρχείο έχει μια επικεφαλίδα με το τελευταίο seq του appointment_change και
+το μέγιστο id ραντεβού τη στιγμή της αποθήκευσης, τις αρχές των φορτωμένων
+περιόδων και τα ραντεβού, όλα σε σταθερή δυαδική μορφή.
+
+Κατά την φόρτωση:
+    * Εάν η βάση δεδομένων είναι παλαιότερη από το snapshot, αυτό αγνοείται.
+    * Εάν είναι νεότερη, οι αλλαγές μετά το seq του snapshot εφαρμόζονται από
+      το appointment_change όπως και στον συγχρονισμό μεταξύ διεργασιών. Εάν
+      κάποιες έχουν ήδη σβηστεί από το appointment_change, το snapshot αγνοείται.
+
+Το AppointmentModel αποθηκεύει το snapshot περιοδικά και όταν κλείνει η εφαρμογή, οπότε
+μετά από ένα crash το snapshot είναι το πολύ snapshot_interval_s παλιό.
+"""
+
+from __future__ import annotations
+
+import os
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from sqlalchemy import func, select
+
+from .entities import Appointment, AppointmentRecord
+from .caching import PERIOD
+from .session import DB_PATH, engine
+from ..controller.logging import Logger
+
+logger = Logger("cache-snapshot")
+
+# Δίπλα στην βάση δεδομένων, ώστε μια διεργασία με άλλο RANTEVOU_DB (πχ τα tests) να
+# μην ξεκινάει από το snapshot άλλης βάσης δεδομένων
+SNAPSHOT_PATH = DB_PATH.with_name(f"{DB_PATH.name}.snapshot")
+
+MAGIC = b"RNTVSNAP"
+VERSION = 3
+
+# magic, version, seq, max_id, PERIOD σε μs, πλήθος περιόδων και ραντεβού
+HEADER = struct.Struct("<8sHqqqII")
+PERIOD_ROW = struct.Struct("<q")
+# id, date, duration, customer_id (-1 για None), employee_id, is_alerted, version (-1 για None)
+APPOINTMENT_ROW = struct.Struct("<qqqqq?q")
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class SnapshotError(Exception):
+    """
+    Το αρχείο του snapshot είναι κατεστραμμένο ή δεν αντιστοιχεί στην βάση δεδομένων
+    """
+
+
+def to_us(value: datetime | timedelta) -> int:
+    if isinstance(value, datetime):
+        value = value - EPOCH
+    return value // MICROSECOND
+
+
+def read(file: BinaryIO, row: struct.Struct) -> tuple:
+    data = file.read(row.size)
+    if len(data) != row.size:
+        raise SnapshotError("Truncated snapshot")
+    return row.unpack(data)
+
+
+def save_snapshot(cache: Any, path: Path = SNAPSHOT_PATH) -> int:  # Any = AppointmentCache
+    """
+    Αποθηκεύει τις φορτωμένες περιόδους του cache στο path. Γράφει πρώτα σε
+    προσωρινό αρχείο ώστε ένα snapshot που διακόπηκε να μην αντικαταστήσει το παλιό.
+
+    Returns:
+        int: Πλήθος ραντεβού που αποθηκεύτηκαν
+    """
+    # Οι αλλαγές που δεν έχουν εφαρμοστεί ακόμα θα γράφονταν με λάθος seq
+    cache.sync(force=True)
+    # Το max_id του μοντέλου δεν μικραίνει με τις διαγραφές, οπότε διαβάζεται από την βάση δεδομένων
+    with engine.connect() as connection:
+        max_id = connection.execute(select(func.max(Appointment.id))).scalar() or 0
+    # Με κλείδωμα εγγραφής, ώστε ούτε η σειρά LRU να αλλάξει όσο διατρέχεται το data
+    with cache.lock.write():
+        seq = cache.watcher.last_seq
+        periods = [cache.unhash(i) for i in cache.data]
+        appointments = [appointment for values in cache.data.values() for appointment in values]
+
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC, VERSION, seq, max_id, to_us(PERIOD), len(periods), len(appointments)
+            )
+        )
+        for period in periods:
+            file.write(PERIOD_ROW.pack(to_us(period)))
+        for appointment in appointments:
+            file.write(
+                APPOINTMENT_ROW.pack(
+                    appointment.id,
+                    to_us(appointment.date),
+                    to_us(appointment.duration),
+                    -1 if appointment.customer_id is None else appointment.customer_id,
+                    appointment.employee_id or 0,
+                    bool(appointment.is_alerted),
+                    -1 if appointment.version is None else appointment.version,
+                )
+            )
+    os.replace(tmp_path, path)
+
+    logger.log_info(f"Saved cache snapshot with {len(periods)} periods and {len(appointments)} appointments")
+    return len(appointments)
+
+
+def load_snapshot(cache: Any, path: Path = SNAPSHOT_PATH) -> int:  # Any = AppointmentCache
+    """
+    Γεμίζει το άδειο cache από το snapshot, χωρίς queries στην βάση δεδομένων. Ένα
+    snapshot που δεν αντιστοιχεί στην βάση δεδομένων αγνοείται.
+
+    Returns:
+        int: Πλήθος ραντεβού που φορτώθηκαν
+    """
+    if not path.exists():
+        return 0
+
+    try:
+        with path.open("rb") as file:
+            seq, periods, appointments = read_snapshot(file, cache)
+    except (OSError, SnapshotError, struct.error) as e:
+        logger.log_warn(f"Ignoring cache snapshot: {e}")
+        return 0
+
+    db_seq = cache.watcher.last_seq
+    if seq > db_seq:
+        logger.log_warn("Ignoring cache snapshot newer than the database")
+        return 0
+
+    # Χωρίς όλες τις αλλαγές μετά το snapshot δεν ξέρουμε ποιες περίοδοι του άλλαξαν
+    if seq < db_seq and not cache.watcher.has_changes_after(seq):
+        logger.log_warn("Ignoring cache snapshot older than the change log")
+        return 0
+
+    cache.store(periods, appointments)
+
+    # Οι αλλαγές μετά το snapshot ακυρώνουν τις περιόδους τους, που θα ξαναφορτωθούν κανονικά
+    if seq < db_seq:
+        cache.watcher.catch_up(seq)
+
+    logger.log_info(f"Loaded cache snapshot with {len(periods)} periods and {len(appointments)} appointments")
+    return len(appointments)
+
+
+def read_snapshot(file: BinaryIO, cache: Any) -> tuple[int, list[int], list[AppointmentRecord]]:
+    magic, version, seq, max_id, period, n_periods, n_appointments = read(file, HEADER)
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError("Unknown snapshot format")
+    if period != to_us(PERIOD):
+        raise SnapshotError("Snapshot was written with a different period length")
+    if seq == cache.watcher.last_seq and max_id != cache.model.max_id:
+        raise SnapshotError("Snapshot does not match the database")
+
+    periods = []
+    for _ in range(n_periods):
+        (start,) = read(file, PERIOD_ROW)
+        start = EPOCH + start * MICROSECOND
+        index = cache.hash(start)
+        # Με διαφορετική αρχή της ημέρας οι περίοδοι δεν ευθυγραμμίζονται
+        if cache.unhash(index) != start:
+            raise SnapshotError("Snapshot periods are not aligned with the cache")
+        periods.append(index)
+
+    appointments = []
+    for _ in range(n_appointments):
+        id_, date, duration, customer_id, employee_id, is_alerted, version = read(file, APPOINTMENT_ROW)
+        appointments.append(
+            AppointmentRecord(
+                id_,
+                EPOCH + date * MICROSECOND,
+                duration * MICROSECOND,
+                None if customer_id < 0 else customer_id,
+                employee_id,
+                is_alerted,
+                None if version < 0 else version,
+            )
+        )
+
+    return seq, periods, appointments
+
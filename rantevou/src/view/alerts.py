@@ -157,7 +157,7 @@ class AlertsView(SideView, SubscriberInterface):
         while len(self.rows) > len(self.appointments):
             self.rows.pop().destroy()
 
-    def subscriber_update(self):
+    def subscriber_update(self, change=None):
         self.update_content()
 
     def show_in_sidepanel(self):
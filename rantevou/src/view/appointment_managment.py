@@ -10,7 +10,7 @@ from .sidepanel import SidePanel
 from .forms import AppointmentForm, CustomerForm
 from .abstract_views import SideView, EntryWithPlaceholder
 from .exceptions import *
-from ..model.entities import Appointment, Customer
+from ..model.entities import Appointment, AppointmentRecord, Customer
 from ..controller.appointments_controller import AppointmentControl
 from ..controller.logging import Logger
 from ..controller.mailer import Mailer
@@ -25,7 +25,7 @@ class EditAppointmentView(SideView):
     """
 
     name: str = "edit"
-    appointment: Appointment
+    appointment: Appointment | AppointmentRecord
     customer: Customer | None
 
     def __init__(self, master: SidePanel, *args, **kwargs):
@@ -50,7 +50,7 @@ class EditAppointmentView(SideView):
         self.delete_button = ttk.Button(self.main_frame, text="Delete", command=self.delete)
         self.delete_button.pack()
 
-    def update_content(self, caller, caller_data: Appointment | Any | None):
+    def update_content(self, caller, caller_data: Appointment | AppointmentRecord | Any | None):
         self.reset()
         appointment = caller_data
 
@@ -59,7 +59,7 @@ class EditAppointmentView(SideView):
         if appointment is None:
             raise ViewWrongDataError(self, caller, appointment)
 
-        if not isinstance(appointment, Appointment):
+        if not isinstance(appointment, (Appointment, AppointmentRecord)):
             raise ViewWrongDataError(self, caller, appointment)
 
         self.appointment = appointment
@@ -44,7 +44,8 @@ class SearchResult(ttk.Button, Caller):
         minutes = self.duration.total_seconds() // 60
         duration = f"{minutes} λεπτά"
 
-        if (self.date + self.user_input).hour >= CLOSING_HOUR:
+        closing = self.date.replace(hour=CLOSING_HOUR, minute=0, second=0, microsecond=0)
+        if self.date + self.user_input > closing:
             duration = "Εκτός Ωραρίου"
 
         date = self.date.strftime("%d/%m, %H:%M")
@@ -7,7 +7,7 @@ from . import abstract_views
 from .sidepanel import SidePanel
 from .exceptions import *
 
-from ..model.entities import Appointment
+from ..model.entities import Appointment, AppointmentRecord
 from ..controller.logging import Logger
 
 
@@ -127,7 +127,7 @@ class AppointmentView(abstract_views.SideView):
         if len(caller_data) == 0:
             return
 
-        if not isinstance(caller_data[0], Appointment):
+        if not isinstance(caller_data[0], (Appointment, AppointmentRecord)):
             raise ViewWrongDataError(self, caller, caller_data[0])
 
         buttons: list[AppointmentViewButton] = []
@@ -21,11 +21,14 @@ from ..controller.mailer import Mailer
 from ..controller import get_config
 
 from ..model.entities import Appointment, Customer
+from ..model.events import Change
 
 logger = Logger("AppointmentsTab")
 cfg: dict[str, Any] = get_config()["view_settings"]
 cfg["group_period"] = timedelta(hours=cfg["working_hours"] // cfg["rows"])
 cfgb = get_config()["buttons"]
+SYNC_INTERVAL = get_config()["cache_settings"]["sync_interval_ms"]
+EMPLOYEES = int(cfg["employees"])
 
 
 class AppointmentsTab(AppFrame, SubscriberInterface):
@@ -53,6 +56,9 @@ class AppointmentsTab(AppFrame, SubscriberInterface):
 
     group_period = cfg["group_period"]
 
+    # Ο εργαζόμενος του οποίου το ημερολόγιο δείχνει το Grid. None για όλους
+    employee_id: int | None = None
+
     # appointment_groups = AppointmentControl().get_appointments_grouped_in_periods(
     #     start=start_date, period=timedelta(minutes=120)
     # )
@@ -62,8 +68,17 @@ class AppointmentsTab(AppFrame, SubscriberInterface):
         SubscriberInterface.__init__(self)
         self.main_panel = Grid(self, AppointmentsTab.start_date)
         self.main_panel.pack(fill="both", expand=True)
+        self.sync_external_changes()
+
+    def sync_external_changes(self):
+        """
+        Ελέγχει περιοδικά για αλλαγές από άλλες διεργασίες (πχ τον web server)
+        που μοιράζονται την ίδια βάση δεδομένων.
+        """
+        AppointmentControl().sync_external_changes()
+        self.after(SYNC_INTERVAL, self.sync_external_changes)
 
-    def subscriber_update(self):
+    def subscriber_update(self, change: Change | None = None):
         pass
 
 
@@ -99,6 +114,15 @@ class GridNavBar(ttk.Frame):
         for widget in [self.move_to_year, self.move_to_month, self.move_to_day]:
             widget.bind("<Key>", lambda x: x.keysym == "Return" and root.move_date(self.year, self.month, self.day))
 
+        self.employee = ttk.Combobox(
+            self,
+            values=["Όλοι", *(f"Εργαζόμενος {i + 1}" for i in range(EMPLOYEES))],
+            state="readonly",
+            width=14,
+        )
+        self.employee.current(0)
+        self.employee.bind("<<ComboboxSelected>>", lambda _: root.set_employee(self.selected_employee))
+
         self.send_email_button = ttk.Button(self, text="@", command=self.send_email)
         self.print_button = ttk.Button(self, text="Print", command=self.print)
         self.export_excel = ttk.Button(self, text="Export", command=self.export_to_worksheet)
@@ -111,6 +135,12 @@ class GridNavBar(ttk.Frame):
         self.send_email_button.pack(side=tk.LEFT)
         self.print_button.pack(side=tk.LEFT)
         self.export_excel.pack(side=tk.LEFT)
+        self.employee.pack(side=tk.LEFT, padx=6)
+
+    @property
+    def selected_employee(self) -> int | None:
+        index = self.employee.current()
+        return index - 1 if index > 0 else None
 
     def set_date(self, delta: timedelta):
         self.now += delta
@@ -120,7 +150,9 @@ class GridNavBar(ttk.Frame):
 
     def _get_appointments_from_entry(self) -> list[Appointment]:
         start_date = datetime(year=self.year.get(), month=self.month.get(), day=self.day.get())
-        return AppointmentControl().get_appointments_from_to_date(start=start_date, end=start_date + timedelta(days=1))
+        return AppointmentControl().get_appointments_from_to_date(
+            start=start_date, end=start_date + timedelta(days=1), employee_id=AppointmentsTab.employee_id
+        )
 
     def send_email(self):
         appointments = self._get_appointments_from_entry()
@@ -225,15 +257,51 @@ class Grid(ttk.Frame):
             )
             self.columns[i].pack(side=tk.LEFT, fill="both", expand=True, pady=10)
 
+        self.prefetch()
+
+    def load(self):
+        """
+        Φορτώνει στο cache όλη την εβδομάδα, μαζί με τις γειτονικές περιόδους που
+        χρειάζονται τα κελιά, με ένα query. Έτσι τα κελιά εξυπηρετούνται όλα από το cache
+        αντί να φορτώνει το καθένα ξεχωριστά τις δικές του περιόδους.
+        """
+        week = timedelta(days=len(self.columns))
+        AppointmentControl().get_appointments_from_to_date(
+            self.start_date - self.period_duration, self.start_date + week + 2 * self.period_duration
+        )
+
+    def prefetch(self):
+        """
+        Φορτώνει στο παρασκήνιο την προηγούμενη και την επόμενη εβδομάδα, ώστε
+        η επόμενη μετακίνηση να εξυπηρετηθεί από το cache.
+        """
+        week = timedelta(days=len(self.columns))
+        AppointmentControl().prefetch_appointments(self.start_date - week, self.start_date)
+        AppointmentControl().prefetch_appointments(self.start_date + week, self.start_date + 2 * week)
+
     def move_left(self, step=1):
         self.start_date -= timedelta(days=step)
+        self.load()
         for column in self.columns:
             column.move_left(step)
+        self.prefetch()
 
     def move_right(self, step=1):
         self.start_date += timedelta(days=step)
+        self.load()
         for column in self.columns:
             column.move_right(step)
+        self.prefetch()
+
+    def set_employee(self, employee_id: int | None):
+        """
+        Δείχνει μόνο το ημερολόγιο ενός εργαζόμενου, ή όλων για None
+        """
+        AppointmentsTab.employee_id = employee_id
+        for column in self.columns:
+            for row in column.rows:
+                row.cache = None
+                row.draw()
 
     def move_date(self, year: IntVar, month: IntVar, day: IntVar):
         date = datetime(
@@ -346,7 +414,8 @@ class GridCell(ttk.Frame, SubscriberInterface):
         **kwargs,
     ):
         super().__init__(root, *args, **kwargs)
-        SubscriberInterface.__init__(self)
+        # Τα κελιά δείχνουν μόνο το πλήθος των ραντεβού, οι αλλαγές πελατών δεν τα αφορούν
+        SubscriberInterface.__init__(self, customers=False)
 
         self.group_index = appointment_group_index
         self.period_start = period_start
@@ -364,7 +433,7 @@ class GridCell(ttk.Frame, SubscriberInterface):
     @property
     def appointments(self):
         result = AppointmentControl().get_appointments_from_to_date(
-            self.period_start, self.period_start + timedelta(hours=2)
+            self.period_start, self.period_start + timedelta(hours=2), AppointmentsTab.employee_id
         )
         result.sort(key=lambda x: x.date)
         return result
@@ -375,12 +444,13 @@ class GridCell(ttk.Frame, SubscriberInterface):
             start_date=self.period_start,
             end_date=self.period_end,
             minumum_free_period=timedelta(0),
+            employee_id=AppointmentsTab.employee_id,
         )
 
     @property
     def previous_period_appointments(self):
         appointments = AppointmentControl().get_appointments_from_to_date(
-            self.period_start - timedelta(hours=2), self.period_start
+            self.period_start - timedelta(hours=2), self.period_start, AppointmentsTab.employee_id
         )
         appointments.sort(key=lambda x: x.date)
         return appointments
@@ -388,12 +458,15 @@ class GridCell(ttk.Frame, SubscriberInterface):
     @property
     def next_period_appointments(self):
         appointments = AppointmentControl().get_appointments_from_to_date(
-            self.period_start + timedelta(hours=2), self.period_end + timedelta(hours=4)
+            self.period_start + timedelta(hours=2), self.period_end + timedelta(hours=4), AppointmentsTab.employee_id
         )
         appointments.sort(key=lambda x: x.date)
         return appointments
 
-    def subscriber_update(self):
+    def subscriber_update(self, change: Change | None = None):
+        # Ανανεώνεται μόνο εάν η αλλαγή αφορά την περίοδο του κελιού
+        if change is not None and not change.intersects(self.period_start, self.period_end):
+            return
         self.cache = None
         self.draw()
 
@@ -462,6 +535,8 @@ class GridCell(ttk.Frame, SubscriberInterface):
         #     return sidepanel.select_view("appointments", self, self.cache)
 
         min_duration = timedelta(minutes=cfg["minimum_appointment_duration"])
+        # Τα κενά ραντεβού ανήκουν στον εργαζόμενο που επιλέχθηκε
+        employee_id = AppointmentsTab.employee_id or 0
 
         # Εάν δεν υπάρχουν ραντεβού στην συγκεκριμένη περίοδο, κατασκευάζει μια
         # λίστα με άδεια ραντεβού
@@ -473,6 +548,7 @@ class GridCell(ttk.Frame, SubscriberInterface):
                     Appointment(
                         date=self.period_start + i * min_duration,
                         duration=min_duration,
+                        employee_id=employee_id,
                     )
                     for i in range(self.period_duration // min_duration)
                 ],
@@ -514,7 +590,8 @@ class GridCell(ttk.Frame, SubscriberInterface):
             # diff -> ελεύθερος χρόνος μεταξύ 2 ραντεβού
             # full_appointments -> πόσα 20λεπτα ραντεβού χωράνε στο diff
             # remainer -> χρόνος λιγότερος των 20 λεπτών που απομένει
-            diff = previous.time_between_appointments(next)
+            # Στο ημερολόγιο όλων των εργαζομένων τα ραντεβού μπορεί να επικαλύπτονται
+            diff = max(previous.time_between_appointments(next), timedelta(0))
             full_appointments = diff // min_duration
             remainer = diff % min_duration
 
@@ -528,6 +605,7 @@ class GridCell(ttk.Frame, SubscriberInterface):
                         Appointment(
                             date=date,
                             duration=duration,
+                            employee_id=employee_id,
                         )
                     )
 
@@ -541,6 +619,7 @@ class GridCell(ttk.Frame, SubscriberInterface):
                         Appointment(
                             date=date,
                             duration=duration,
+                            employee_id=employee_id,
                         )
                     )
 
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 
 import tkinter as tk
+from math import ceil
 from tkinter import ttk
 from tkinter.messagebox import askyesno
 from typing import Any, Literal, Protocol, runtime_checkable
@@ -9,6 +10,7 @@ from .abstract_views import AppFrame
 from .sidepanel import SidePanel
 from .shared import set_customer
 from ..model.entities import Customer, Appointment
+from ..model.pagination import CustomerPage
 from ..controller.customers_controller import CustomerControl
 from ..controller.appointments_controller import AppointmentControl
 from ..controller.logging import Logger
@@ -83,6 +85,7 @@ class SearchBar(ttk.Frame):
                 self.searchbar.delete(0, tk.END)
                 self.sheet.reset()
                 self.sheet.populate_sheet()
+                self.sheet.pagination.reset()
                 self.searchbar.delete(0, tk.END)
                 return
 
@@ -97,6 +100,7 @@ class SearchBar(ttk.Frame):
         self.sheet.current_page = 1
         self.sheet.search_query = self.searchbar.get()
         self.sheet.populate_sheet()
+        self.sheet.pagination.reset()
 
 
 class CustomerSheet(ttk.Treeview, SubscriberInterface):
@@ -105,6 +109,9 @@ class CustomerSheet(ttk.Treeview, SubscriberInterface):
     αυτόματης συμπλήρωσης φόρμας ραντεβού με στοιχεία πελάτη. Έχει γίνει
     σελιδοποίηση στις 100 εγγραφές ανα σελίδα επειδή το rendering είναι
     σχετικά αργό.
+
+    Οι σελίδες αλλάζουν με τα cursors της τρέχουσας σελίδας, οπότε η αλλαγή
+    σελίδας δεν μετράει ξανά τους πελάτες και δεν εξαρτάται από το βάθος.
     """
 
     column_names: list[str]
@@ -120,12 +127,17 @@ class CustomerSheet(ttk.Treeview, SubscriberInterface):
         self.sidepanel = self.nametowidget(".!sidepanel")
         self.page_length = config["view_settings"]["page_length"]
         self.current_page = 1
-        self.customers, self.max_page = self.get_customer_page()
 
         self.search_query = ""
         self.sorted_by = ""
         self.descending = False
 
+        self.customers: list[Customer] = []
+        self.max_page = 1
+        self.next_cursor: str | None = None
+        self.prev_cursor: str | None = None
+        self.get_customer_page()
+
         self.focus_values = []
         self.focus_column_index = 0
         self.search_data = None
@@ -141,7 +153,7 @@ class CustomerSheet(ttk.Treeview, SubscriberInterface):
 
         self.page = 0
 
-        self.populate_sheet()
+        self.populate_sheet(update=False)
         self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview, style="Vertical.TScrollbar")
         self.scrollbar.pack(side="right", fill="y")
         self.configure(yscrollcommand=self.scrollbar.set)
@@ -184,32 +196,44 @@ class CustomerSheet(ttk.Treeview, SubscriberInterface):
             _, date, _, duration, *_ = appointment.values
             self.insert("", "end", values=("", date, duration))
 
-    def get_customer_page(self) -> tuple[list[Customer], int]:
+    def get_customer_page(self, cursor: str | None = None) -> CustomerPage:
         """
-        Βοηθητική συνάρτηση αρχικοποίησης.
+        Φέρνει την σελίδα του cursor, ή την πρώτη σελίδα εάν είναι None, με την τρέχουσα
+        αναζήτηση και ταξινόμηση. Το πλήθος των σελίδων ανανεώνεται μόνο στην πρώτη σελίδα.
         """
-        return CustomerControl().get_customers(page_length=self.page_length, page_number=self.current_page)
+        page = CustomerControl().get_customer_page(
+            self.page_length,
+            search_query=self.search_query,
+            sorted_by=self.sorted_by,
+            descending=self.descending,
+            cursor=cursor,
+        )
+        self.customers = page.customers
+        self.next_cursor = page.next_cursor
+        self.prev_cursor = page.prev_cursor
+        if page.count is not None:
+            self.max_page = max(1, ceil(page.count / self.page_length))
+        return page
 
     def go_left(self):
         self.current_page = self.pagination.current_page
-        self.populate_sheet()
+        self.populate_sheet(cursor=self.prev_cursor)
 
     def go_right(self):
         self.current_page = self.pagination.current_page
-        self.populate_sheet()
+        self.populate_sheet(cursor=self.next_cursor)
 
-    def subscriber_update(self):
+    def subscriber_update(self, change=None):
         """
         Εφαρμογή του subscriber pattern. Καλείται από το μοντελο όταν γίνεται
         μια σημαντική αλλαγή στα δεδομένα.
         """
-        self.pagination.reset()
         self.reset()
-        self.current_page = 1
-        self.customers, self.max_page = self.get_customer_page()
+        self.get_customer_page()
+        self.pagination.reset()
         self.populate_sheet(update=False)
 
-    def populate_sheet(self, update=True):
+    def populate_sheet(self, update=True, cursor: str | None = None):
         """
         Η κεντρική συνάρτηση του customer tab. Ορίζει την δημιουργία του query
         στην βάση δεδομένων βάση του πως αλλάζουν την κατάσταση της τα υπόλοιπα
@@ -221,15 +245,14 @@ class CustomerSheet(ttk.Treeview, SubscriberInterface):
 
         Εφόσον είναι περιορισμένη στις 100 εγγραφές ανα σελίδα είναι αρκετά
         αποδοτική.
+
+        Args:
+            update (bool, optional): Φέρνει την σελίδα από το controller. Defaults to True.
+            cursor (str | None, optional): Το cursor της σελίδας, None για την πρώτη.
+            Defaults to None.
         """
         if update:
-            self.customers, self.max_page = CustomerControl().get_customers(
-                page_number=self.current_page,
-                page_length=self.page_length,
-                search_query=self.search_query,
-                sorted_by=self.sorted_by,
-                descending=self.descending,
-            )
+            self.get_customer_page(cursor)
 
         self.switch("customer")
         self.delete(*self.get_children())
@@ -256,7 +279,9 @@ class CustomerSheet(ttk.Treeview, SubscriberInterface):
         colname = self.column_names[self.focus_column_index]
         self.sorted_by = colname
         self.descending = reverse
+        self.current_page = 1
         self.populate_sheet()
+        self.pagination.reset()
         self.heading(colname, command=lambda: self.sort(not reverse))
 
     def populate_appointment_view(self, *args):
@@ -342,7 +367,7 @@ class ManagementBar(ttk.Frame):
 
         elif self.show_button["text"] == "Back":
             self.show_button["text"] = "Show"
-            self.sheet.populate_sheet()
+            self.sheet.populate_sheet(update=False)
 
 
 class Pagination(ttk.Frame):
@@ -391,7 +416,7 @@ class Pagination(ttk.Frame):
         """
         Αλλαγή σελίδας, μείωση κατα 1
         """
-        if self.current_page == 1:
+        if self.sheet.prev_cursor is None:
             return
 
         self.current_page -= 1
@@ -403,7 +428,7 @@ class Pagination(ttk.Frame):
         """
         Αλλαγή σελίδας, αύξηση κατα 1
         """
-        if self.current_page == self.sheet.max_page:
+        if self.sheet.next_cursor is None:
             return
 
         self.current_page += 1
@@ -417,6 +442,7 @@ class Pagination(ttk.Frame):
         """
         self.current_page = 1
         self.max_page = self.sheet.max_page
+        self.page_label.config(text=str(self.current_page))
 
 
 class CustomersTab(AppFrame):
@@ -1,5 +1,6 @@
 from tkinter import ttk
 from ..controller.logging import Logger
+from ..controller import get_config
 from ..model.entities import Appointment, Customer
 
 from .shared import (
@@ -9,6 +10,7 @@ from .shared import (
     form_appointment_hour,
     form_appointment_minute,
     form_appointment_duration,
+    form_appointment_employee,
     set_appointment,
     get_appointment,
     reset_appointment,
@@ -25,6 +27,7 @@ from .shared import (
 )
 
 logger = Logger("entry")
+EMPLOYEES = int(get_config()["view_settings"]["employees"])
 
 
 class AppointmentForm(ttk.Frame):
@@ -53,6 +56,11 @@ class AppointmentForm(ttk.Frame):
         self.app_label_duration = ttk.Label(self, text="Duration")
         self.app_entry_duration = ttk.Entry(self, width=2, textvariable=form_appointment_duration)
 
+        self.app_label_employee = ttk.Label(self, text="Employee")
+        self.app_entry_employee = ttk.Spinbox(
+            self, width=2, from_=0, to=EMPLOYEES - 1, state="readonly", textvariable=form_appointment_employee
+        )
+
         self.app_label_date.grid(row=0, column=0, sticky="e", padx=3)
         self.app_entry_day.grid(row=0, column=1, sticky="we")
         self.app_entry_month.grid(row=0, column=2, sticky="we")
@@ -65,6 +73,9 @@ class AppointmentForm(ttk.Frame):
         self.app_label_duration.grid(row=2, column=0, sticky="e", padx=3)
         self.app_entry_duration.grid(row=2, column=1, sticky="we")
 
+        self.app_label_employee.grid(row=3, column=0, sticky="e", padx=3)
+        self.app_entry_employee.grid(row=3, column=1, sticky="we")
+
     def get(self) -> Appointment:
         return get_appointment()
 
@@ -67,14 +67,16 @@ Thread(target=__load, daemon=True).start()
 
 __appointment_id: int | None = None
 __appointment_customer_id: int | None = None
-__appointment_employee_id: int | None = None
 __appointment_alerted: bool = False
+# Το version του ραντεβού όταν φορτώθηκε στην φόρμα, ώστε η αποθήκευση να μην σβήσει αλλαγές άλλων
+__appointment_version: int | None = None
 form_appointment_year: IntVar = IntVar()
 form_appointment_month: IntVar = IntVar()
 form_appointment_day: IntVar = IntVar()
 form_appointment_hour: IntVar = IntVar()
 form_appointment_minute: IntVar = IntVar()
 form_appointment_duration: IntVar = IntVar()
+form_appointment_employee: IntVar = IntVar()
 
 __customer_id: int | None = None
 form_customer_name: StringVar = StringVar()
@@ -95,19 +97,20 @@ def set_appointment(appointment: Appointment | None) -> None:
     """
     global __appointment_id
     global __appointment_customer_id
-    global __appointment_employee_id
     global __appointment_alerted
+    global __appointment_version
     global form_appointment_year
     global form_appointment_month
     global form_appointment_day
     global form_appointment_hour
     global form_appointment_minute
     global form_appointment_duration
+    global form_appointment_employee
 
     if appointment is None:
         __appointment_id = None
         __appointment_customer_id = None
-        __appointment_employee_id = None
+        __appointment_version = None
 
         form_appointment_year.set(0)
         form_appointment_month.set(0)
@@ -115,12 +118,13 @@ def set_appointment(appointment: Appointment | None) -> None:
         form_appointment_hour.set(0)
         form_appointment_minute.set(0)
         form_appointment_duration.set(0)
+        form_appointment_employee.set(0)
         return
 
     __appointment_id = appointment.id
     __appointment_customer_id = appointment.customer_id
-    __appointment_employee_id = appointment.employee_id
     __appointment_alerted = appointment.is_alerted
+    __appointment_version = appointment.version
 
     form_appointment_year.set(appointment.date.year or 0)
     form_appointment_month.set(appointment.date.month or 0)
@@ -128,6 +132,7 @@ def set_appointment(appointment: Appointment | None) -> None:
     form_appointment_hour.set(appointment.date.hour or 0)
     form_appointment_minute.set(appointment.date.minute or 0)
     form_appointment_duration.set(int(appointment.duration.total_seconds() // 60) or 0)
+    form_appointment_employee.set(appointment.employee_id or 0)
 
 
 def get_appointment() -> Appointment:
@@ -139,14 +144,15 @@ def get_appointment() -> Appointment:
     """
     global __appointment_id
     global __appointment_customer_id
-    global __appointment_employee_id
     global __appointment_alerted
+    global __appointment_version
     global form_appointment_year
     global form_appointment_month
     global form_appointment_day
     global form_appointment_hour
     global form_appointment_minute
     global form_appointment_duration
+    global form_appointment_employee
 
     date = datetime(
         year=form_appointment_year.get(),
@@ -160,8 +166,9 @@ def get_appointment() -> Appointment:
         duration=timedelta(minutes=form_appointment_duration.get()),
         id=__appointment_id,
         customer_id=__appointment_customer_id,
-        employee_id=__appointment_employee_id,
+        employee_id=form_appointment_employee.get(),
         is_alerted=__appointment_alerted,
+        version=__appointment_version,
     )
 
     return appointment
@@ -173,19 +180,20 @@ def reset_appointment() -> None:
     """
     global __appointment_id
     global __appointment_customer_id
-    global __appointment_employee_id
     global __appointment_alerted
+    global __appointment_version
     global form_appointment_year
     global form_appointment_month
     global form_appointment_day
     global form_appointment_hour
     global form_appointment_minute
     global form_appointment_duration
+    global form_appointment_employee
 
     __appointment_id = None
     __appointment_customer_id = None
-    __appointment_employee_id = None
     __appointment_alerted = False
+    __appointment_version = None
 
     now = datetime.now()
 
@@ -195,6 +203,7 @@ def reset_appointment() -> None:
     form_appointment_hour.set(now.hour)
     form_appointment_minute.set(now.minute)
     form_appointment_duration.set(min_duration)
+    form_appointment_employee.set(0)
 
 
 def set_customer(customer: Customer | None) -> None:
@@ -122,8 +122,7 @@ class SearchBar(ttk.Frame):
         Λαμβάνει τα δεδομένα από το μοντέλο και τα στέλνει στο SideView με όνομα "search"
         για να εμφανιστούν.
 
-        Η .get_time_between_appointments είναι σχετικά αργή και χρήζει βελτίωσης, κυρίως
-        να μεταφερθεί η αναζήτηση κατευθείαν στην βάση δεδομένων.
+        Τα κενά περιορίζονται στο ωράριο λειτουργίας, ένα ανα μέρα.
         """
         user_input: timedelta | str = self.entry.get()
 
@@ -13,6 +13,7 @@ from .customers import CustomersTab
 from .stats import Statistics
 from .sidepanel import SidePanel, SearchBar
 from ..controller import get_config
+from ..controller.appointments_controller import AppointmentControl
 
 from .alerts import AlertsView
 from .appointment_managment import EditAppointmentView, AddAppointmentView
@@ -60,6 +61,9 @@ class Window(tk.Tk):
         self.style_config()
         self.title(title)
 
+        # Οι ειδοποιήσεις για αλλαγές στα ραντεβού φτάνουν μια φορά ανα κύκλο του event loop
+        AppointmentControl().set_notification_scheduler(self.after_idle)
+
         # Αρχικοποιήσεις των κεντρικών widget
         self.tabs = Notebook(self)
         self.side_panel = SidePanel(self)
@@ -0,0 +1,139 @@
+"""
+Κοινά fixtures των tests του μοντέλου των ραντεβού.
+
+Όλα τα tests μοιράζονται το singleton AppointmentModel και την προσωρινή βάση δεδομένων
+του conftest.py της ρίζας. Κάθε test παίρνει δικές του μέρες από το fixture day, ώστε
+τα ραντεβού του να μην συμπίπτουν με αυτά των υπόλοιπων tests.
+"""
+
+import atexit
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from itertools import count
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from ..src.model.appointment import AppointmentModel, PRELOAD_WINDOW
+from ..src.model.caching import AppointmentCache
+from ..src.model.customer import CustomerModel
+from ..src.model.entities import Customer
+from ..src.model.session import DB_PATH
+
+# Οι μέρες μέσα στο αρχικό παράθυρο του cache είναι πάντα φορτωμένες, οι υπόλοιπες όχι
+_warm_days = count(2)
+_cold_days = count(PRELOAD_WINDOW.days + 30)
+# Το τηλέφωνο είναι μοναδικό, κάθε πελάτης των tests παίρνει το επόμενο
+_phones = count(1000000000)
+
+
+def sql_datetime(value: datetime | timedelta) -> str:
+    """
+    Η μορφή με την οποία το SQLAlchemy αποθηκεύει ημερομηνίες και διάρκειες στο SQLite
+    """
+    if isinstance(value, timedelta):
+        value = datetime(1970, 1, 1) + value
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def temporary_database() -> None:
+    """
+    Τα tests γράφουν στην βάση δεδομένων, οπότε τρέχουν μόνο στην προσωρινή βάση του conftest.py της ρίζας
+    """
+    if DB_PATH != Path(os.environ.get("RANTEVOU_DB", "")):
+        pytest.skip("Refusing to write to the application database")
+
+
+@pytest.fixture(scope="session")
+def model() -> AppointmentModel:
+    model = AppointmentModel()
+    model.wait_until_ready()
+    # Το snapshot της προσωρινής βάσης δεδομένων δεν χρειάζεται
+    atexit.unregister(model.shutdown)
+    model.stopped.set()
+    return model
+
+
+@pytest.fixture
+def cache(model: AppointmentModel) -> Iterator[AppointmentCache]:
+    """
+    Returns:
+        Iterator[AppointmentCache]: Ένα άδειο cache, χωριστό από αυτό του μοντέλου, με δικό του
+        ChangeWatcher. Οι περίοδοι του φορτώνονται από την ίδια βάση δεδομένων
+    """
+    cache = AppointmentCache(model)
+    yield cache
+    cache.prefetcher.executor.shutdown()
+    cache.watcher.connection.close()
+
+
+@pytest.fixture
+def day(model: AppointmentModel) -> Callable[..., datetime]:
+    """
+    Returns:
+        Callable[..., datetime]: Επιστρέφει την αρχή της εργάσιμης μιας μέρας που δεν έχει
+        χρησιμοποιήσει άλλο test. Με cold=True η μέρα είναι εκτός του αρχικού παραθύρου
+    """
+
+    def next_day(cold: bool = False) -> datetime:
+        return model.now + timedelta(days=next(_cold_days if cold else _warm_days))
+
+    return next_day
+
+
+@pytest.fixture(scope="session")
+def customer_model() -> CustomerModel:
+    return CustomerModel()
+
+
+@pytest.fixture
+def new_customer(customer_model: CustomerModel) -> Callable[..., Customer]:
+    """
+    Returns:
+        Callable[..., Customer]: Προσθέτει έναν πελάτη μέσω του CustomerModel. Οι πελάτες
+        μένουν στην βάση δεδομένων, οπότε κάθε test ψάχνει με δικά του ονόματα
+    """
+
+    def add(name: str, surname: str | None = None, email: str | None = None) -> Customer:
+        customer = Customer(name=name, surname=surname, email=email, phone=str(next(_phones)))
+        return customer_model.add_customer(customer)
+
+    return add
+
+
+class ExternalWriter:
+    """
+    Γράφει στην βάση δεδομένων από δεύτερη σύνδεση, όπως μια άλλη διεργασία
+    """
+
+    def __init__(self):
+        self.connection = sqlite3.connect(DB_PATH)
+
+    def insert(self, date: datetime, duration: timedelta, employee_id: int = 0) -> int:
+        cursor = self.connection.execute(
+            "INSERT INTO appointment (date, duration, employee_id, is_alerted, version) VALUES (?, ?, ?, 0, 1)",
+            (sql_datetime(date), sql_datetime(duration), employee_id),
+        )
+        self.connection.commit()
+        return cursor.lastrowid  # type: ignore
+
+    def move(self, id_: int, date: datetime, duration: timedelta) -> None:
+        self.connection.execute(
+            "UPDATE appointment SET date = ?, duration = ?, version = version + 1 WHERE id = ?",
+            (sql_datetime(date), sql_datetime(duration), id_),
+        )
+        self.connection.commit()
+
+    def delete(self, id_: int) -> None:
+        self.connection.execute("DELETE FROM appointment WHERE id = ?", (id_,))
+        self.connection.commit()
+
+
+@pytest.fixture
+def external() -> Iterator[ExternalWriter]:
+    writer = ExternalWriter()
+    yield writer
+    writer.connection.close()
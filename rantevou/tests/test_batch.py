@@ -0,0 +1,85 @@
+"""
+Μαζική προσθήκη ραντεβού μέσω του AppointmentModel και του /appointments/batch
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from ..server import app
+from ..src.controller.appointments_controller import AppointmentControl
+from ..src.model.entities import Appointment
+from ..src.model.exceptions import AppointmentDBError, AppointmentIdAlreadyExists, DateOverlap
+
+HOUR = timedelta(hours=1)
+
+
+def new(start, hours, duration=HOUR, employee_id=0):
+    return Appointment(date=start + hours * HOUR, duration=duration, employee_id=employee_id)
+
+
+def test_ids_follow_the_given_order(model, day):
+    start = day()
+    batch = [new(start, 3), new(start, 0), new(start, 0, employee_id=1), new(start, 1)]
+    ids = model.add_appointments(batch)
+
+    assert ids == [appointment.id for appointment in batch]
+    for appointment in batch:
+        assert model.cache.lookup_id(appointment.id).date == appointment.date
+
+
+def test_overlap_inside_the_batch_adds_nothing(model, day):
+    start = day()
+    batch = [new(start, 0, 2 * HOUR), new(start, 1)]
+    with pytest.raises(DateOverlap):
+        model.add_appointments(batch)
+    assert model.get_appointments_from_to_date(start, start + 4 * HOUR) == []
+
+
+def test_overlap_with_a_long_appointment_before_the_batch(model, day, external):
+    start = day(cold=True)
+    # Ξεκινάει αρκετές περιόδους του cache πριν το batch και η διεργασία δεν το έχει δει ακόμα
+    external.insert(start, 6 * HOUR)
+
+    with pytest.raises(DateOverlap):
+        model.add_appointments([new(start, 5), new(start, 7)])
+    assert model.add_appointments([new(start, 5, employee_id=1), new(start, 6)])
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+def batch_json(start, *hours):
+    return [
+        {"year": start.year, "month": start.month, "day": start.day, "hour": 9 + hour, "minute": 0, "duration": 60}
+        for hour in hours
+    ]
+
+
+def test_batch_route(client, day):
+    start = day()
+    response = client.post("/appointments/batch", json=batch_json(start, 0, 1))
+    assert response.status_code == 200
+    assert len(response.get_json()["new_ids"]) == 2
+
+    response = client.post("/appointments/batch", json=batch_json(start, 1))
+    assert response.status_code == 409
+
+
+def test_batch_route_errors(client, day, monkeypatch):
+    start = day()
+    data = batch_json(start, 0)
+    data[0]["id"] = 1
+    response = client.post("/appointments/batch", json=data)
+    assert response.status_code == 409
+    assert response.get_json()["reason"] == "Appointment id already exists"
+
+    def fail(self, appointments):
+        raise AppointmentDBError(appointments[0], "disk I/O error")
+
+    monkeypatch.setattr(AppointmentControl, "create_appointments", fail)
+    response = client.post("/appointments/batch", json=batch_json(start, 2))
+    assert response.status_code == 422
+    assert response.get_json()["reason"] == "Database error"
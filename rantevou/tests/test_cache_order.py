@@ -0,0 +1,60 @@
+"""
+Οι περίοδοι του cache μένουν ταξινομημένες κατα την εισαγωγή και τα ραντεβού βρίσκονται
+με το id τους χωρίς αναζήτηση στις περιόδους
+"""
+
+from datetime import timedelta
+
+from ..src.model.caching import PERIOD
+from ..src.model.entities import Appointment, AppointmentRecord
+
+MINUTE = timedelta(minutes=1)
+
+# Ids που δεν υπάρχουν στην βάση δεδομένων, το cache των tests δεν γράφει σε αυτή
+FIRST_ID = 10**9
+
+
+def test_period_stays_sorted(cache, day):
+    start = day(cold=True)
+    cache.lookup_date(start)
+    for i, minutes in enumerate([90, 10, 50, 10, 110, 0]):
+        assert cache.add(AppointmentRecord(FIRST_ID + i, start + minutes * MINUTE, 5 * MINUTE))
+
+    dates = [r.date for r in cache.lookup_date(start)]
+    assert dates == sorted(dates)
+    assert cache.lookup_id(FIRST_ID + 4).date == start + 110 * MINUTE
+
+
+def test_not_loaded_period_is_not_created(cache, day):
+    start = day(cold=True)
+    assert not cache.add(AppointmentRecord(FIRST_ID, start, 5 * MINUTE))
+    assert cache.hash(start) not in cache.data
+    assert cache.lookup_id(FIRST_ID) is None
+
+
+def test_update_moves_between_periods(cache, day):
+    start = day(cold=True)
+    cache.fill(cache.hash(start), cache.hash(start + PERIOD))
+    cache.add(AppointmentRecord(FIRST_ID, start, 5 * MINUTE))
+
+    assert cache.update(AppointmentRecord(FIRST_ID, start + PERIOD, 5 * MINUTE))
+    assert cache.lookup_date(start) == []
+    assert [r.id for r in cache.lookup_date(start + PERIOD)] == [FIRST_ID]
+    assert cache.id_index[FIRST_ID] == cache.hash(start + PERIOD)
+
+
+def test_delete_changed_appointment(cache, day):
+    # Το Appointment του session μπορεί να έχει ήδη την νέα ημερομηνία όταν διαγράφεται
+    start = day(cold=True)
+    cache.fill(cache.hash(start), cache.hash(start + PERIOD))
+    others = [AppointmentRecord(FIRST_ID + i, start + 30 * MINUTE, 5 * MINUTE) for i in range(1, 3)]
+    cache.add_many(others)
+    appointment = Appointment(id=FIRST_ID, date=start + 30 * MINUTE, duration=5 * MINUTE)
+    cache.add(appointment)
+
+    appointment.date = start + PERIOD
+    assert cache.delete(appointment)
+    assert [r.id for r in cache.lookup_date(start)] == [FIRST_ID + 1, FIRST_ID + 2]
+    assert cache.lookup_id(FIRST_ID) is None
+    assert FIRST_ID not in cache.id_index
+    assert not cache.delete(appointment)
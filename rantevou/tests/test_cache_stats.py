@@ -0,0 +1,56 @@
+"""
+Οι μετρητές λειτουργίας του AppointmentCache και το /metrics/cache
+"""
+
+import json
+
+from ..server import app
+from ..src.model.caching import PERIOD
+from ..src.model.metrics import LATENCY_BOUNDS_MS, LatencyHistogram
+
+
+def test_hits_misses_and_fills(cache, day):
+    start = day(cold=True)
+    cache.lookup_date(start)
+    cache.lookup_date(start)
+    list(cache.iter_date_range(start, start + 2 * PERIOD))
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["fills"]) == (2, 3, 2)
+    assert stats["hit_ratio"] == 0.4
+    assert stats["buckets"] == 3
+    assert stats["latency"]["lookup"]["count"] == 2
+    assert stats["latency"]["iter_date_range"]["count"] == 1
+    assert stats["latency"]["fill"]["count"] == 3
+    json.dumps(stats)
+
+    cache.stats.reset()
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["fills"], stats["hit_ratio"]) == (0, 0, 0, 0)
+    assert stats["latency"]["lookup"]["count"] == 0
+    assert stats["buckets"] == 3
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    for ms in [0.01, 0.05, 3, 2000]:
+        histogram.record(ms)
+
+    result = histogram.to_dict()
+    assert result["count"] == 4
+    assert result["max_ms"] == 2000
+    counts = {bucket["le_ms"]: bucket["count"] for bucket in result["buckets"]}
+    assert counts[LATENCY_BOUNDS_MS[0]] == 2
+    assert counts[5] == 1
+    assert counts[None] == 1
+    assert sum(counts.values()) == 4
+
+
+def test_metrics_route(model):
+    with app.test_client() as client:
+        response = client.get("/metrics/cache")
+    assert response.status_code == 200
+    stats = response.get_json()
+    assert stats["ready"] is True
+    assert stats["warmup_ms"] is not None
+    assert {"hits", "misses", "fills", "evictions", "latency"} <= set(stats)
@@ -0,0 +1,149 @@
+"""
+Το cache των ραντεβού και το ReadWriteLock όταν το χρησιμοποιούν πολλά threads,
+όπως ο threaded Flask server.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Event, Thread
+
+import pytest
+
+from ..src.model import caching
+from ..src.model.entities import Appointment, AppointmentRecord
+from ..src.model.locking import ReadWriteLock
+from ..src.model.snapshot import save_snapshot
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    inside = Event()
+    release = Event()
+
+    def reader():
+        with lock.read():
+            inside.set()
+            release.wait(5)
+
+    thread = Thread(target=reader)
+    thread.start()
+    assert inside.wait(5)
+    with lock.read():
+        pass
+    release.set()
+    thread.join()
+
+
+def test_writer_waits_for_readers():
+    lock = ReadWriteLock()
+    order = []
+
+    def writer():
+        with lock.write():
+            order.append("write")
+
+    with lock.read():
+        thread = Thread(target=writer)
+        thread.start()
+        thread.join(0.1)
+        order.append("read")
+    thread.join()
+    assert order == ["read", "write"]
+
+
+def test_read_lock_cannot_be_upgraded():
+    lock = ReadWriteLock()
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.write():
+        with lock.read():
+            pass
+
+
+def test_get_appointments_returns_a_copy(model, day):
+    start = day()
+    model.add_appointment(Appointment(date=start, duration=timedelta(minutes=20)))
+    index = model.cache.hash(start)
+
+    appointments = model.get_appointments()
+    appointments[index].clear()
+    appointments.pop(index)
+    assert [appointment.date for appointment in model.cache.lookup(index)] == [start]
+
+
+def test_iteration_while_readers_reorder_the_cache(model, day, tmp_path):
+    start = day()
+    first = model.cache.hash(start)
+    periods = range(first, first + 40)
+    model.cache.query_by_date(start, model.cache.unhash(periods[-1]))
+    stop = Event()
+
+    def touch():
+        while not stop.is_set():
+            for i in periods:
+                model.cache.lookup(i)
+
+    def iterate():
+        for _ in range(50):
+            for values in model.get_appointments().values():
+                list(values)
+        save_snapshot(model.cache, tmp_path / "cache.snapshot")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        readers = [executor.submit(touch) for _ in range(3)]
+        try:
+            iterate()
+        finally:
+            stop.set()
+        for reader in readers:
+            reader.result()
+
+
+def test_fill_does_not_block_readers(cache, day, monkeypatch):
+    start = day(cold=True)
+    query_records = caching.query_records
+    querying, release, read = Event(), Event(), Event()
+
+    def slow_query(*args, **kwargs):
+        querying.set()
+        release.wait(5)
+        return query_records(*args, **kwargs)
+
+    def reader():
+        with cache.lock.read():
+            read.set()
+
+    monkeypatch.setattr(caching, "query_records", slow_query)
+    fill = Thread(target=cache.query_by_date, args=(start, start + timedelta(hours=1)))
+    fill.start()
+    try:
+        assert querying.wait(5)
+        Thread(target=reader).start()
+        assert read.wait(1)
+    finally:
+        release.set()
+        fill.join()
+    assert cache.missing(cache.hash(start), cache.hash(start)) == []
+
+
+def test_fill_repeats_a_query_older_than_a_change(cache, day, monkeypatch):
+    start = day(cold=True)
+    record = AppointmentRecord(10**9 + 1, start, timedelta(hours=1))
+    calls = []
+
+    def write_while_querying(*args, **kwargs):
+        calls.append(args)
+        if len(calls) > 1:
+            return [record]
+        # Το αποτέλεσμα του πρώτου query δεν περιέχει την αλλαγή του άλλου thread
+        writer = Thread(target=cache.add, args=(record,))
+        writer.start()
+        writer.join(5)
+        assert not writer.is_alive()
+        return []
+
+    monkeypatch.setattr(caching, "query_records", write_while_querying)
+    assert cache.fill(cache.hash(start), cache.hash(start)) == 1
+    assert len(calls) == 2
+    assert record.id in cache.id_index
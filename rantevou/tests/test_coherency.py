@@ -0,0 +1,99 @@
+"""
+Ο πίνακας appointment_change και ο συγχρονισμός του cache μεταξύ διεργασιών
+"""
+
+import sqlite3
+from datetime import timedelta
+
+from sqlalchemy import create_engine
+
+from ..src.model.coherency import install_change_log
+from ..src.model.entities import Base
+from .conftest import sql_datetime
+
+# Ο πίνακας και ένα trigger όπως τα δημιουργούσαν οι εκδόσεις πριν από τις διάρκειες
+OLD_CHANGE_LOG = """
+    CREATE TABLE appointment_change (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        appointment_id INTEGER NOT NULL,
+        old_date DATETIME,
+        new_date DATETIME,
+        created DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TRIGGER appointment_change_insert AFTER INSERT ON appointment
+    BEGIN
+        INSERT INTO appointment_change (appointment_id, old_date, new_date) VALUES (NEW.id, NULL, NEW.date);
+    END;
+"""
+
+
+def test_change_log_gains_durations(model, tmp_path):
+    path = tmp_path / "old.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with sqlite3.connect(path) as connection:
+        connection.executescript(OLD_CHANGE_LOG)
+
+    install_change_log(engine)
+    install_change_log(engine)
+    engine.dispose()
+
+    date, duration = model.now, timedelta(hours=3)
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "INSERT INTO appointment (date, duration, employee_id, is_alerted, version) VALUES (?, ?, 0, 0, 1)",
+            (sql_datetime(date), sql_datetime(duration)),
+        )
+        row = connection.execute("SELECT new_date, new_duration FROM appointment_change").fetchone()
+    assert row == (sql_datetime(date), sql_datetime(duration))
+
+
+def test_external_changes_reach_the_cache(cache, day, external):
+    start = day(cold=True)
+    assert cache.lookup_date(start) == []
+
+    id_ = external.insert(start, timedelta(hours=1))
+    assert cache.sync(force=True) == 1
+    assert [r.id for r in cache.lookup_date(start)] == [id_]
+
+    external.move(id_, start + timedelta(minutes=30), timedelta(hours=1))
+    assert cache.sync(force=True) == 1
+    assert [r.date for r in cache.lookup_date(start)] == [start + timedelta(minutes=30)]
+
+    external.delete(id_)
+    assert cache.sync(force=True) == 1
+    assert cache.lookup_date(start) == []
+    assert cache.watcher.invalidations == 3
+
+
+def test_changes_are_checked_once_per_interval(cache, day, external):
+    start = day(cold=True)
+    cache.lookup_date(start)
+    cache.watcher.interval = float("inf")
+
+    external.insert(start, timedelta(hours=1))
+    assert cache.lookup_date(start) == []
+    assert cache.sync() == 0
+    assert cache.sync(force=True) == 1
+    # Χωρίς commit άλλης σύνδεσης το data_version δεν αλλάζει
+    assert cache.sync(force=True) == 0
+
+
+def test_pruned_change_log_clears_the_cache(model, cache, day, external):
+    start = day(cold=True)
+    cache.lookup_date(start)
+    cache.lookup_date(start + timedelta(days=1))
+    first = external.insert(start, timedelta(hours=1))
+    external.insert(start, timedelta(hours=1), employee_id=1)
+    # Το cache του μοντέλου διαβάζει τις αλλαγές πριν σβηστούν
+    model.sync_external_changes()
+    external.connection.execute(
+        "DELETE FROM appointment_change WHERE seq <= (SELECT seq FROM appointment_change WHERE appointment_id = ?)",
+        (first,),
+    )
+    external.connection.commit()
+
+    assert cache.sync(force=True) == 1
+    assert cache.data == {}
+    assert cache.drain_changes().ranges is None
+    assert len(cache.lookup_date(start)) == 2
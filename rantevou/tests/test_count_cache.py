@@ -0,0 +1,102 @@
+"""
+Το cache του πλήθους αποτελεσμάτων των αναζητήσεων πελατών και η εκτίμηση του πλήθους
+από δείγμα, δες rantevou.src.model.pagination.CountCache
+"""
+
+import sqlite3
+
+import pytest
+
+from ..src.model import customer as customer_module
+from ..src.model.customer import CustomerModel
+from ..src.model.entities import Customer
+from ..src.model.session import DB_PATH
+
+
+class Counter:
+    def __init__(self, value: int):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.value
+
+
+@pytest.fixture
+def counts(customer_model, monkeypatch):
+    # Κάθε get ελέγχει τον πίνακα customer_change
+    monkeypatch.setattr(customer_model.counts, "interval", 0)
+    # Οι αλλαγές των προηγούμενων tests
+    customer_model.counts.get(None)
+    return customer_model.counts
+
+
+def test_count_is_cached(customer_model, counts):
+    counter = Counter(3)
+    assert customer_model.count_customers("cached", None, counter) == 3
+    assert customer_model.count_customers("cached", None, counter) == 3
+    assert counter.calls == 1
+    # Το FTS5 μετράει άλλα αποτελέσματα από το LIKE
+    assert customer_model.count_customers("cached", "cached*", counter) == 3
+    assert counter.calls == 2
+
+
+def test_local_write_clears_the_counts(customer_model, counts, new_customer):
+    counter = Counter(3)
+    customer_model.count_customers("local", None, counter)
+    new_customer("Local")
+    customer_model.count_customers("local", None, counter)
+    assert counter.calls == 2
+
+
+def test_external_write_clears_the_counts(customer_model, counts):
+    counter = Counter(3)
+    customer_model.count_customers("external", None, counter)
+    with sqlite3.connect(DB_PATH) as connection:
+        connection.execute("INSERT INTO customer (name, normalized_name) VALUES ('External', 'external')")
+    customer_model.count_customers("external", None, counter)
+    assert counter.calls == 2
+    customer_model.count_customers("external", None, counter)
+    assert counter.calls == 2
+
+
+def test_eviction(customer_model, counts, monkeypatch):
+    monkeypatch.setattr(counts, "max_size", 2)
+    counts.clear()
+    for key in ["a", "b", "a", "c"]:
+        counts.put(key, len(key))
+    assert counts.get("b") is None
+    assert counts.get("a") == counts.get("c") == 1
+
+
+def test_estimated_count(customer_model, new_customer, monkeypatch):
+    for _ in range(4):
+        new_customer("Estimatematch")
+    # Οι μισοί πελάτες είναι στο δείγμα και περιέχουν και τα 4 αποτελέσματα
+    sample = customer_model.session.query(Customer).count()
+    for _ in range(sample):
+        new_customer("Other")
+    monkeypatch.setattr(customer_module, "ESTIMATE_COUNTS", True)
+    monkeypatch.setattr(customer_module, "COUNT_SAMPLE", sample)
+    monkeypatch.setattr(customer_module, "MIN_SAMPLE_MATCHES", 4)
+    monkeypatch.setattr(CustomerModel, "fts", False)
+
+    # Το "_" είναι wildcard, οπότε η αναζήτηση γίνεται με το LIKE
+    customers, pages = customer_model.get_customers(1, 1, "estimatematc_")
+    assert len(customers) == 1
+    assert pages == 8
+
+    query = customer_model.session.query(Customer).filter(Customer.name.like("Estimatematch%"))
+    count = customer_model._CustomerModel__count  # pylint: disable=protected-access
+    assert count("estimatematch", query) == 8
+    # Χωρίς αναζήτηση το πλήθος μετριέται ακριβώς
+    assert count("", query) == 4
+    # Λίγα αποτελέσματα στο δείγμα
+    monkeypatch.setattr(customer_module, "MIN_SAMPLE_MATCHES", 5)
+    assert count("estimatematch", query) == 4
+    # Όλοι οι πελάτες χωράνε στο δείγμα
+    monkeypatch.setattr(customer_module, "COUNT_SAMPLE", 2 * sample)
+    monkeypatch.setattr(customer_module, "MIN_SAMPLE_MATCHES", 4)
+    customer_model.counts.clear()
+    assert count("estimatematch", query) == 4
@@ -0,0 +1,134 @@
+"""
+Η αναζήτηση πελατών με τον πίνακα FTS5 customer_fts και η εναλλακτική όταν δεν υπάρχει FTS5
+"""
+
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, create_engine, select, text
+from sqlalchemy.orm import Session
+
+from ..src.model import customer_index
+from ..src.model.customer import CustomerModel
+from ..src.model.customer_index import drop_customer_fts, fts_join, fts_matches, fts_query, install_customer_fts
+from ..src.model.entities import Base, Customer
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Engine:
+    engine = create_engine(f"sqlite:///{tmp_path / 'customers.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def add(engine: Engine, *customers: Customer) -> list[int]:
+    with Session(engine) as session:
+        session.add_all(customers)
+        session.commit()
+        return [customer.id for customer in customers]
+
+
+def search(engine: Engine, query: str) -> list[int]:
+    matches = fts_matches(fts_query(query))
+    statement = select(Customer.id).select_from(fts_join(matches)).order_by(matches.c.rank)
+    with engine.connect() as connection:
+        return list(connection.execute(statement).scalars())
+
+
+def test_fts_query():
+    assert fts_query("Νίκος Παπ") == '"νικος"* "παπ"*'
+    assert fts_query("ANNA, o'brien") == '"anna"* "o"* "brien"*'
+    assert fts_query(" -.% ") is None
+
+
+def test_install_indexes_existing_customers(db):
+    (id_,) = add(db, Customer(name="Νίκος", surname="Παπαδόπουλος"))
+    assert install_customer_fts(db)
+    assert install_customer_fts(db)
+
+    assert search(db, "νικ") == [id_]
+    assert search(db, "Νίκος παπα") == [id_]
+    assert search(db, "παπα νικ") == [id_]
+    assert search(db, "γιώργος") == []
+
+
+def test_triggers_follow_the_customer_table(db):
+    assert install_customer_fts(db)
+    first, second = add(db, Customer(name="Anna", email="anna@example.com"), Customer(name="Annette"))
+    assert sorted(search(db, "ann")) == [first, second]
+
+    with Session(db) as session:
+        session.get(Customer, first).name = "Zoe"
+        session.commit()
+    # Το email ταιριάζει ακόμα
+    assert sorted(search(db, "ann")) == [first, second]
+    assert search(db, "zo") == [first]
+
+    with Session(db) as session:
+        session.delete(session.get(Customer, second))
+        session.commit()
+    assert search(db, "ann") == [first]
+    # Σφάλμα αν το ευρετήριο διαφέρει από τον πίνακα customer
+    with db.connect() as connection:
+        connection.execute(text("INSERT INTO customer_fts (customer_fts) VALUES ('integrity-check')"))
+
+
+def test_rank_orders_better_matches_first(db):
+    assert install_customer_fts(db)
+    weak, strong = add(
+        db,
+        Customer(name="Μαρία", surname="Νικολάου", email="maria.long.address@example.com"),
+        Customer(name="Νίκη", surname="Νικολάου", email="niki@example.com"),
+    )
+    assert search(db, "νικ") == [strong, weak]
+
+
+def fts_schema(engine: Engine) -> list[str]:
+    statement = text("SELECT name FROM sqlite_master WHERE name LIKE 'customer_fts%'")
+    with engine.connect() as connection:
+        return list(connection.execute(statement).scalars())
+
+
+def test_missing_fts5_falls_back(db, monkeypatch):
+    # Η βάση δεδομένων δημιουργήθηκε με FTS5 και ανοίγει από ένα SQLite χωρίς FTS5
+    assert install_customer_fts(db)
+    monkeypatch.setattr(customer_index, "FTS5_PROBE", "CREATE VIRTUAL TABLE temp.fts5_probe USING no_fts5(value)")
+    assert not install_customer_fts(db)
+    assert fts_schema(db) == []
+    # Χωρίς triggers οι εγγραφές στον customer συνεχίζουν
+    assert add(db, Customer(name="Anna"))
+
+
+def test_missing_triggers_rebuild_the_table(db):
+    assert install_customer_fts(db)
+    (first,) = add(db, Customer(name="Anna"))
+    # Όπως μετά από ένα SQLite χωρίς FTS5 που διέγραψε μόνο τα triggers
+    with db.begin() as connection:
+        for name in customer_index.CUSTOMER_FTS_TRIGGER_NAMES:
+            connection.execute(text(f"DROP TRIGGER {name}"))
+    (second,) = add(db, Customer(name="Annette"))
+    assert search(db, "ann") == [first]
+
+    assert install_customer_fts(db)
+    assert sorted(search(db, "ann")) == [first, second]
+    with db.connect() as connection:
+        connection.execute(text("INSERT INTO customer_fts (customer_fts) VALUES ('integrity-check')"))
+
+
+def test_other_backends_drop_the_table(db):
+    assert install_customer_fts(db)
+    drop_customer_fts(db)
+    assert fts_schema(db) == []
+    drop_customer_fts(db)
+    assert add(db, Customer(name="Anna"))
+
+
+def test_model_without_fts_searches_like_with_fts(customer_model, new_customer, monkeypatch):
+    ids = [new_customer("Ftsfallback", "Alpha").id, new_customer("Beta", "Ftsfallback").id]
+
+    assert customer_model.fts
+    with_fts = sorted(customer.id for customer in customer_model.customer_search("ftsfall"))
+    monkeypatch.setattr(CustomerModel, "fts", False)
+    without_fts = sorted(customer.id for customer in customer_model.customer_search("ftsfall"))
+    assert with_fts == without_fts == ids
@@ -0,0 +1,120 @@
+"""
+Το ευρετήριο προθεμάτων των πελατών πρέπει να επιστρέφει ό,τι και το LIKE 'query%',
+μετά από κάθε αλλαγή της ίδιας ή άλλης διεργασίας.
+
+Κάθε test έχει δική του βάση δεδομένων, ώστε το ευρετήριο να περιέχει μόνο τους δικούς του πελάτες.
+"""
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, create_engine, or_, select
+from sqlalchemy.orm import Session
+
+from ..src.model.customer_index import SEARCH_COLUMNS, CustomerIndex, install_customer_change_log
+from ..src.model.entities import Base, Customer
+
+CUSTOMERS = [
+    ("Anna", "Papadopoulou", "anna@example.com", "6900000001"),
+    ("ANNETTE", "Smith", "annette@example.com", "6900000002"),
+    ("Νίκος", "Παπαδόπουλος", "nikos@example.gr", "6900000003"),
+    ("νικόλαος", "Ανδρέου", None, "2100000004"),
+    ("Andreas", None, "a.andreas@example.com", None),
+    ("Μαρία", "Annou", "maria@example.gr", "6900000006"),
+]
+QUERIES = ["a", "A", "an", "ANN", "anna@", "Νικ", "νικ", "παπ", "Παπ", "6900", "21", "ex", "zz", "Annou"]
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Engine:
+    engine = create_engine(f"sqlite:///{tmp_path / 'customers.db'}")
+    Base.metadata.create_all(bind=engine)
+    install_customer_change_log(engine)
+    with Session(engine) as session:
+        for name, surname, email, phone in CUSTOMERS:
+            session.add(Customer(name=name, surname=surname, email=email, phone=phone))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def like(engine: Engine, query: str) -> list[int]:
+    condition = or_(*(column.like(f"{query}%") for column in SEARCH_COLUMNS))
+    with engine.connect() as connection:
+        return list(connection.execute(select(Customer.id).where(condition).order_by(Customer.id)).scalars())
+
+
+def assert_matches_like(index: CustomerIndex, engine: Engine) -> None:
+    for query in QUERIES:
+        assert index.search(query) == like(engine, query), query
+
+
+def load(engine: Engine, interval: float) -> CustomerIndex:
+    index = CustomerIndex(engine)
+    index.interval = interval
+    index.load()
+    return index
+
+
+def test_search_matches_like(db):
+    assert_matches_like(load(db, float("inf")), db)
+
+
+def test_not_loaded_index_has_no_answer(db):
+    assert CustomerIndex(db).search("a") is None
+
+
+def test_local_changes(db):
+    # Χωρίς έλεγχο του customer_change, μόνο οι put και remove ενημερώνουν το ευρετήριο
+    index = load(db, float("inf"))
+    with Session(db) as session:
+        customer = Customer(name="Annabel", surname="Νικολάου", email="bel@example.com")
+        session.add(customer)
+        session.commit()
+        index.put(customer)
+        assert_matches_like(index, db)
+
+        customer = session.get(Customer, 1)
+        customer.name = "Zoe"
+        customer.email = None
+        session.commit()
+        index.put(customer)
+        assert_matches_like(index, db)
+
+        session.delete(session.get(Customer, 3))
+        session.commit()
+        index.remove(3)
+        assert_matches_like(index, db)
+    assert len(index) == len(CUSTOMERS)
+
+
+def test_external_changes(db):
+    index = load(db, 0)
+    with sqlite3.connect(db.url.database) as connection:
+        connection.execute(
+            "INSERT INTO customer (name, normalized_name, surname, normalized_surname, email) "
+            "VALUES ('Anastasia', 'anastasia', 'Νικολαΐδη', 'νικολαιδη', 'ana@example.com')"
+        )
+        connection.execute("UPDATE customer SET name = 'Zeta', normalized_name = 'zeta' WHERE id = 2")
+        connection.execute("DELETE FROM customer WHERE id = 4")
+    assert_matches_like(index, db)
+
+
+def test_pruned_change_log_reloads_the_index(db):
+    index = load(db, 0)
+    with sqlite3.connect(db.url.database) as connection:
+        connection.execute("UPDATE customer SET surname = 'Zorba' WHERE id = 1")
+        connection.execute("DELETE FROM customer_change")
+        connection.execute("UPDATE customer SET email = 'zz@example.com' WHERE id = 5")
+    assert_matches_like(index, db)
+
+
+def test_remove_a_missing_entry(db):
+    index = load(db, float("inf"))
+    # Η τελευταία τιμή του πίνακα λείπει, όπως εάν είχε ήδη αφαιρεθεί
+    id_ = index.ids.pop()
+    index.keys.pop()
+    index.remove(id_)
+    assert id_ not in index.ids
+    assert len(index) == len(CUSTOMERS) - 1
@@ -0,0 +1,76 @@
+"""
+Η get_appointments_from_to_date μέσω του cache, δες AppointmentModel.get_appointments_from_to_date
+"""
+
+from concurrent.futures import Future
+from datetime import timedelta
+
+import pytest
+
+from ..src.model import appointment as appointment_module
+from ..src.model.caching import PERIOD, query_records
+
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture
+def appointments(model, day, external):
+    """
+    Ραντεβού δύο εργαζομένων στην αρχή, στην μέση και στο τέλος μιας μέρας εκτός του αρχικού παραθύρου
+    """
+    start = day(cold=True)
+    for minutes, employee_id in ((0, 0), (0, 1), (100, 0), (PERIOD // MINUTE, 1), (479, 0)):
+        external.insert(start + minutes * MINUTE, MINUTE, employee_id)
+    model.sync_external_changes()
+    return start
+
+
+def from_db(start, end, employee_id=None):
+    return sorted(query_records([(start, end)], employee_id), key=lambda r: (r.date, r.id))
+
+
+def ids(records):
+    return [(r.date, r.id) for r in records]
+
+
+@pytest.mark.parametrize("employee_id", [None, 0, 1])
+def test_same_as_the_database(model, appointments, employee_id):
+    start = appointments
+    for first, last in ((0, 480), (0, 100), (1, 479), (100, 480), (PERIOD // MINUTE, 2 * PERIOD // MINUTE)):
+        from_date, to_date = start + first * MINUTE, start + last * MINUTE
+        result = model.get_appointments_from_to_date(from_date, to_date, employee_id)
+        assert ids(result) == ids(from_db(from_date, to_date, employee_id)), (first, last)
+
+
+def test_second_call_is_served_from_the_cache(model, appointments):
+    start = appointments
+    model.get_appointments_from_to_date(start, start + 8 * HOUR)
+    fills = model.cache.stats.fills
+    assert len(model.get_appointments_from_to_date(start, start + 8 * HOUR)) == 5
+    assert len(model.get_appointments_from_to_date(start + HOUR, start + 2 * HOUR, 0)) == 1
+    assert model.cache.stats.fills == fills
+
+
+def test_empty_range(model, appointments):
+    assert model.get_appointments_from_to_date(appointments, appointments) == []
+
+
+def test_long_range_is_read_from_the_database(model, appointments, monkeypatch):
+    start = appointments
+    monkeypatch.setattr(appointment_module, "MAX_BUCKETS", 2)
+    # Μετά τα ραντεβού της προηγούμενης μέρας, που ανήκει σε άλλο test
+    first, last = model.cache.hash(start - 8 * HOUR), model.cache.hash(start) - 1
+    missing = model.cache.missing(first, last)
+    assert missing
+    assert len(model.get_appointments_from_to_date(start - 8 * HOUR, start + 8 * HOUR)) == 5
+    assert model.cache.missing(first, last) == missing
+
+
+def test_before_warm_up_reads_the_database(model, day, external, monkeypatch):
+    start = day(cold=True)
+    id_ = external.insert(start, HOUR)
+    monkeypatch.setattr(model, "ready", Future())
+
+    assert [r.id for r in model.get_appointments_from_to_date(start, start + HOUR)] == [id_]
+    assert model.cache.hash(start) not in model.cache.data
@@ -0,0 +1,92 @@
+"""
+Τα ραντεβού ανα εργαζόμενο. Ο έλεγχος overlap αφορά μόνο τα ραντεβού του ίδιου εργαζόμενου
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..server import app
+from ..src.model.caching import EmployeeIntervals
+from ..src.model.entities import Appointment, AppointmentRecord
+from ..src.model.exceptions import DateOverlap
+
+HOUR = timedelta(hours=1)
+WORKING_DAY = 8 * HOUR
+START = datetime(2025, 6, 9, 9)
+
+
+def test_overlap_is_per_employee(model, day):
+    start = day()
+    model.add_appointment(Appointment(date=start, duration=HOUR, employee_id=1))
+    assert model.add_appointment(Appointment(date=start, duration=HOUR, employee_id=2))
+    with pytest.raises(DateOverlap):
+        model.add_appointment(Appointment(date=start + HOUR / 2, duration=HOUR, employee_id=1))
+
+    ids = model.add_appointments(Appointment(date=start + 2 * HOUR, duration=HOUR, employee_id=i) for i in (1, 2, 3))
+    assert len(ids) == 3
+    assert [r.employee_id for r in model.get_appointments_from_to_date(start, start + 3 * HOUR, 3)] == [3]
+
+
+def test_update_moves_to_another_employee(model, day):
+    start = day()
+    busy = model.add_appointment(Appointment(date=start, duration=HOUR, employee_id=2))
+    id_ = model.add_appointment(Appointment(date=start, duration=HOUR, employee_id=1))
+
+    appointment = model.cache.lookup_id(id_)
+    with pytest.raises(DateOverlap):
+        model.update_appointment(AppointmentRecord(id_, start, HOUR, employee_id=2, version=appointment.version))
+    assert model.update_appointment(AppointmentRecord(id_, start, HOUR, employee_id=3, version=appointment.version))
+
+    assert model.cache.intervals.employees[id_] == 3
+    assert [r.id for r in model.cache.intersecting(start, start + HOUR, 3)] == [id_]
+    assert [r.id for r in model.cache.intersecting(start, start + HOUR, 2)] == [busy]
+    assert [r.id for r in model.cache.intersecting(start, start + HOUR, 1)] == []
+
+
+def test_employee_intervals():
+    intervals = EmployeeIntervals()
+    records = [AppointmentRecord(i, START + (i % 3) * HOUR, HOUR, employee_id=i % 2) for i in range(6)]
+    for record in records:
+        intervals.add(record)
+
+    everyone = intervals.intersecting(START, START + 3 * HOUR)
+    assert sorted(r.id for r in everyone) == list(range(6))
+    assert all(a.date <= b.date for a, b in zip(everyone, everyone[1:]))
+    assert {r.id for r in intervals.intersecting(START, START + 3 * HOUR, 1)} == {1, 3, 5}
+    assert intervals.intersecting(START, START + 3 * HOUR, 7) == []
+
+    # Ο εργαζόμενος χωρίς ραντεβού δεν κρατάει άδειο ευρετήριο
+    for id_ in (1, 3, 5):
+        assert intervals.remove(id_)
+    assert set(intervals.partitions) == {0}
+    intervals.add(AppointmentRecord(0, START, HOUR, employee_id=4))
+    assert set(intervals.partitions) == {0, 4}
+    assert intervals.date_of(0) == START
+
+
+def test_free_slot_of_one_or_all_employees(model, day):
+    start = day(cold=True)
+    first = model.add_appointment(Appointment(date=start, duration=HOUR, employee_id=1))
+    model.add_appointment(Appointment(date=start + HOUR, duration=HOUR, employee_id=2))
+    assert model.find_free_slot(start, HOUR, 1) == (start + HOUR, WORKING_DAY - HOUR)
+    assert model.find_free_slot(start, HOUR, 2) == (start, HOUR)
+    assert model.find_free_slot(start, HOUR) == (start + 2 * HOUR, WORKING_DAY - 2 * HOUR)
+
+    # Οι εγγραφές κάθε εργαζόμενου ενημερώνουν και το ευρετήριο όλων
+    version = model.cache.lookup_id(first).version
+    model.update_appointment(AppointmentRecord(first, start + 2 * HOUR, HOUR, employee_id=3, version=version))
+    assert model.find_free_slot(start, HOUR, 1) == (start, WORKING_DAY)
+    assert model.find_free_slot(start, HOUR) == (start, HOUR)
+    model.add_appointments([Appointment(date=start, duration=HOUR, employee_id=4)])
+    assert model.find_free_slot(start, HOUR) == (start + 3 * HOUR, WORKING_DAY - 3 * HOUR)
+
+
+def test_invalid_employee_filter():
+    date = {"year": 2025, "month": 6, "day": 9}
+    period = {"from_year": 2025, "from_month": 6, "from_day": 9, "to_year": 2025, "to_month": 6, "to_day": 10}
+    with app.test_client() as client:
+        for url, query in (("/appointment/date", date), ("/appointments/period", period), ("/appointments/free", date)):
+            response = client.get(url, query_string={**query, "employee_id": "abc"})
+            assert response.status_code == 422, url
+            assert response.get_json()["reason"] == "Parameters are wrong"
@@ -0,0 +1,90 @@
+"""
+Οι αλλαγές που δημοσιεύει το AppointmentModel στους subscribers, δες rantevou.src.model.events
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..src.model.entities import Appointment
+from ..src.model.events import MAX_RANGES, Change
+
+HOUR = timedelta(hours=1)
+CELL = timedelta(minutes=30)
+START = datetime(2025, 6, 9, 9)
+
+
+class Recorder:
+    def __init__(self):
+        self.changes: list[Change | None] = []
+
+    def subscriber_update(self, change: Change | None = None):
+        self.changes.append(change)
+
+
+@pytest.fixture
+def recorder(model):
+    recorder = Recorder()
+    # Οι αλλαγές άλλων tests μέσω δεύτερης σύνδεσης
+    model.sync_external_changes()
+    model.add_subscriber(recorder)
+    yield recorder
+    model.remove_subscriber(recorder)
+
+
+def test_external_change_covers_the_whole_appointment(model, day, external, recorder):
+    start = day()
+    external.insert(start, 3 * HOUR)
+    assert model.sync_external_changes()
+
+    (change,) = recorder.changes
+    # Ένα κελί στην μέση του ραντεβού, σε άλλη περίοδο του cache από την αρχή του
+    assert change.intersects(start + 2 * HOUR, start + 2 * HOUR + CELL)
+    assert not change.intersects(start + 3 * HOUR, start + 3 * HOUR + CELL)
+
+
+def test_external_move_covers_old_and_new_position(model, day, external, recorder):
+    start = day()
+    id_ = external.insert(start, 2 * HOUR)
+    external.move(id_, start + 5 * HOUR, HOUR)
+    assert model.sync_external_changes()
+
+    (change,) = recorder.changes
+    assert id_ in change.ids
+    assert change.intersects(start + HOUR, start + HOUR + CELL)
+    assert change.intersects(start + 5 * HOUR, start + 5 * HOUR + CELL)
+    assert not change.intersects(start + 3 * HOUR, start + 3 * HOUR + CELL)
+
+
+def test_writes_before_the_scheduler_runs_are_one_notification(model, day, recorder):
+    scheduled = []
+    model.set_notification_scheduler(scheduled.append)
+    try:
+        start = day()
+        first = model.add_appointment(Appointment(date=start, duration=HOUR))
+        second = model.add_appointment(Appointment(date=start + 3 * HOUR, duration=HOUR))
+        assert recorder.changes == []
+        assert len(scheduled) == 1
+        scheduled.pop()()
+    finally:
+        model.set_notification_scheduler(None)
+
+    (change,) = recorder.changes
+    assert {first, second} <= change.ids
+    assert change.intersects(start, start + CELL)
+    assert change.intersects(start + 3 * HOUR, start + 3 * HOUR + CELL)
+    assert not change.intersects(start + HOUR, start + 3 * HOUR)
+
+
+def test_large_change_keeps_its_bounds():
+    change = Change.at((id_, [(START + id_ * HOUR, START + id_ * HOUR + CELL)]) for id_ in range(MAX_RANGES + 1))
+    assert change.ranges == ((START, START + MAX_RANGES * HOUR + CELL),)
+    # Το ένα διάστημα καλύπτει και τα κενά ανάμεσα στα ραντεβού
+    assert change.intersects(START + HOUR + CELL, START + 2 * HOUR)
+
+
+def test_zero_length_range_intersects_where_it_starts():
+    change = Change(ranges=((START, START),))
+    assert change.intersects(START, START + CELL)
+    assert not change.intersects(START - CELL, START)
+    assert Change.everything().intersects(START, START)
@@ -0,0 +1,69 @@
+"""
+Η αποβολή περιόδων από το AppointmentCache με σειρά LRU, δες AppointmentCache.evict
+"""
+
+from datetime import timedelta
+
+from ..src.model.caching import BUCKET_SIZE, PERIOD
+
+HOUR = timedelta(hours=1)
+
+
+def test_least_recently_used_is_evicted(cache, day):
+    cache.max_buckets = 4
+    first = cache.hash(day(cold=True))
+    periods = range(first, first + 4)
+    for i in periods:
+        cache.lookup(i)
+    # Η πρώτη περίοδος γίνεται η πιο πρόσφατη
+    cache.lookup(first)
+
+    cache.lookup(first + 4)
+    assert list(cache.data) == [first + 2, first + 3, first, first + 4]
+    assert cache.evictions == 1
+
+
+def test_evicted_period_reloads_its_appointments(cache, day, external):
+    cache.max_buckets = 1
+    start = day(cold=True)
+    id_ = external.insert(start, HOUR)
+    assert [r.id for r in cache.lookup_date(start)] == [id_]
+    assert cache.lookup_id(id_) is not None
+
+    cache.lookup_date(start + 2 * PERIOD)
+    assert cache.hash(start) not in cache.data
+    assert cache.lookup_id(id_) is None
+    assert cache.intervals.date_of(id_) is None
+    assert cache.evicted_appointments == 1
+
+    assert [r.id for r in cache.lookup_date(start)] == [id_]
+
+
+def test_pinned_periods_are_kept(cache, day):
+    cache.max_buckets = 2
+    start = day(cold=True)
+    cache.pin(start, start + PERIOD)
+    for i in range(5):
+        cache.lookup_date(start + i * PERIOD)
+    assert {cache.hash(start), cache.hash(start + PERIOD)} <= set(cache.data)
+    assert len(cache.data) == 3
+
+
+def test_max_bytes(cache, day):
+    cache.max_buckets = 0
+    cache.max_bytes = 3 * BUCKET_SIZE
+    start = day(cold=True)
+    for i in range(6):
+        cache.lookup_date(start + i * PERIOD)
+    assert len(cache.data) == 3
+    assert cache.size <= cache.max_bytes
+
+
+def test_range_larger_than_the_limit_is_kept(cache, day):
+    # Όσες περίοδοι μόλις φορτώθηκαν δεν αποβάλλονται, ώστε ο καλών να τις βρει
+    cache.max_buckets = 2
+    start = day(cold=True)
+    cache.lookup_date(start)
+    assert list(cache.iter_date_range(start + PERIOD, start + 4 * PERIOD)) == []
+    assert len(cache.data) == 4
+    assert cache.hash(start) not in cache.data
@@ -0,0 +1,67 @@
+"""
+Η φόρτωση των περιόδων που λείπουν από το cache με ένα query, δες AppointmentCache.fill
+"""
+
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from ..src.model.caching import MAX_RANGES, PERIOD
+from ..src.model.session import engine
+
+MINUTE = timedelta(minutes=1)
+
+
+@pytest.fixture
+def selects():
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_ranges_join_consecutive_periods(cache):
+    assert cache.ranges([1, 2, 3, 7, 8, 10]) == [
+        (cache.unhash(1), cache.unhash(4)),
+        (cache.unhash(7), cache.unhash(9)),
+        (cache.unhash(10), cache.unhash(11)),
+    ]
+
+
+def test_too_many_ranges_become_one(cache):
+    periods = list(range(0, 2 * MAX_RANGES + 2, 2))
+    assert cache.ranges(periods) == [(cache.unhash(0), cache.unhash(periods[-1] + 1))]
+
+
+def test_gaps_are_filled_with_one_query(cache, day, external, selects):
+    start = day(cold=True)
+    # Ένα ραντεβού σε κάθε περίοδο, και στις φορτωμένες
+    ids = [external.insert(start + i * PERIOD + 10 * MINUTE, 20 * MINUTE) for i in range(6)]
+    first = cache.hash(start)
+    cache.lookup(first + 1)
+    cache.lookup(first + 4)
+    cache.stats.reset()
+    selects.clear()
+
+    assert cache.fill(first, first + 5) == 4
+    assert len(selects) == 1
+    assert (cache.stats.fills, cache.stats.misses, cache.stats.hits) == (1, 4, 2)
+    assert [r.id for r in cache.iter_date_range(start, start + 5 * PERIOD)] == ids
+
+    # Όλες οι περίοδοι υπάρχουν πλέον
+    selects.clear()
+    assert cache.fill(first, first + 5) == 0
+    assert selects == []
+
+
+def test_empty_periods_are_loaded(cache, day):
+    start = day(cold=True)
+    first = cache.hash(start)
+    assert cache.fill(first, first + 2) == 3
+    assert [cache.data[i] for i in range(first, first + 3)] == [[], [], []]
@@ -0,0 +1,110 @@
+"""
+Υπολογισμός του ελεύθερου χρόνου μεταξύ των ραντεβού, δες rantevou.src.model.gaps
+"""
+
+from datetime import timedelta
+
+import pytest
+
+from ..src.model import gaps
+from ..src.model.caching import query_max_duration
+from ..src.model.entities import Appointment, AppointmentRecord
+
+HOUR = timedelta(hours=1)
+MINUTE = timedelta(minutes=1)
+WORKING_DAY = 8 * HOUR
+
+
+@pytest.fixture
+def restart(model):
+    """
+    Αδειάζει το cache όπως μετά από επανεκκίνηση και στο τέλος ξαναφορτώνει το αρχικό παράθυρο
+    """
+    yield model.cache.clear
+    model.cache.query_by_date(model.min_date, model.max_date)
+    model.cache.max_duration = query_max_duration()
+
+
+def record(date, duration):
+    return AppointmentRecord(id=0, date=date, duration=duration)
+
+
+def test_overlapping_appointments_merge(model):
+    start = model.now
+    appointments = [record(start + HOUR, HOUR), record(start, 2 * HOUR), record(start + 4 * HOUR, HOUR)]
+    starts, ends = gaps.to_arrays(appointments)
+    gap_starts, gap_ends = gaps.find_gaps(starts, ends, start, start + 6 * HOUR, MINUTE)
+    assert gaps.to_list(gap_starts, gap_ends) == [(start + 2 * HOUR, 2 * HOUR), (start + 5 * HOUR, HOUR)]
+
+
+def test_minimum_drops_short_gaps(model):
+    start = model.now
+    appointments = [record(start, HOUR), record(start + HOUR + 10 * MINUTE, HOUR)]
+    starts, ends = gaps.to_arrays(appointments)
+    gap_starts, gap_ends = gaps.find_gaps(starts, ends, start, start + 3 * HOUR, 30 * MINUTE)
+    assert gaps.to_list(gap_starts, gap_ends) == [(start + 2 * HOUR + 10 * MINUTE, 50 * MINUTE)]
+
+
+@pytest.mark.parametrize("strategy", ["cache", "sql"])
+def test_appointment_before_the_window(model, day, restart, strategy):
+    start = day(cold=True)
+    # Αρκετά μεγάλο ώστε να ξεκινάει σε άλλη περίοδο του cache από το διάστημα
+    model.add_appointment(Appointment(date=start, duration=6 * HOUR))
+    # Το cache δεν ξέρει πλέον την διάρκεια του ραντεβού
+    restart()
+
+    result = model.get_time_between_appointments(
+        start + 5 * HOUR, start + 8 * HOUR, MINUTE, working_hours_only=False, strategy=strategy
+    )
+    assert result == [(start + 6 * HOUR, 2 * HOUR)]
+
+
+@pytest.mark.parametrize("strategy", ["cache", "sql"])
+def test_external_appointment_before_the_window(model, day, external, strategy):
+    start = day(cold=True)
+    # Μεγαλύτερο από όλα τα ραντεβού που ξέρει το cache
+    external.insert(start, 7 * HOUR)
+
+    result = model.get_time_between_appointments(
+        start + 5 * HOUR, start + 8 * HOUR, MINUTE, working_hours_only=False, strategy=strategy
+    )
+    assert result == [(start + 7 * HOUR, HOUR)]
+
+
+def test_query_gaps_reads_its_own_lookbehind(model, day, external):
+    start = day(cold=True)
+    external.insert(start, 7 * HOUR)
+
+    gap_starts, gap_ends = gaps.query_gaps(start + 5 * HOUR, start + 8 * HOUR, MINUTE)
+    assert gaps.to_list(gap_starts, gap_ends) == [(start + 7 * HOUR, HOUR)]
+
+
+def test_query_gaps_of_one_employee(model, day, external):
+    start = day(cold=True)
+    external.insert(start, HOUR, employee_id=1)
+    external.insert(start + 2 * HOUR, HOUR, employee_id=2)
+
+    gap_starts, gap_ends = gaps.query_gaps(start, start + 4 * HOUR, MINUTE, employee_id=1)
+    assert gaps.to_list(gap_starts, gap_ends) == [(start + HOUR, 3 * HOUR)]
+    gap_starts, gap_ends = gaps.query_gaps(start, start + 4 * HOUR, MINUTE)
+    assert gaps.to_list(gap_starts, gap_ends) == [(start + HOUR, HOUR), (start + 3 * HOUR, HOUR)]
+
+
+def test_strategies_agree(model, day, external):
+    start = day(cold=True)
+    # Με επικαλύψεις, που το μοντέλο δεν επιτρέπει στον ίδιο εργαζόμενο, και ένα μετά το ωράριο.
+    # Όλα στην ίδια μέρα, οι επόμενες ανήκουν σε άλλα tests
+    for minutes, duration in ((0, 30), (20, 40), (90, 15), (200, 60), (250, 20), (400, 45), (840, 30)):
+        external.insert(start + timedelta(minutes=minutes), timedelta(minutes=duration), employee_id=3)
+    model.sync_external_changes()
+
+    for minimum in (MINUTE, 10 * MINUTE, HOUR):
+        results = [
+            model.get_time_between_appointments(
+                start - HOUR, start + 2 * WORKING_DAY, minimum, working_hours_only, strategy, employee_id=3
+            )
+            for working_hours_only in (False, True)
+            for strategy in ("cache", "sql")
+        ]
+        assert results[0] == results[1]
+        assert results[2] == results[3]
@@ -0,0 +1,78 @@
+"""
+Το ευρετήριο διαστημάτων του cache και ο έλεγχος overlap, δες rantevou.src.model.caching.IntervalIndex
+"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from ..src.model.caching import IntervalIndex
+from ..src.model.entities import Appointment, AppointmentRecord
+from ..src.model.exceptions import DateOverlap
+
+START = datetime(2025, 6, 9, 9)
+MINUTE = timedelta(minutes=1)
+HOUR = timedelta(hours=1)
+
+
+def brute_force(records: list[AppointmentRecord], start: datetime, end: datetime) -> set[int]:
+    # Τα ραντεβού μηδενικής διάρκειας τέμνουν το διάστημα εάν ξεκινούν μέσα του
+    return {r.id for r in records if r.date < end and (r.end_date > start or r.date >= start)}
+
+
+def assert_sorted(records: list[AppointmentRecord]) -> None:
+    assert all(a.date <= b.date for a, b in zip(records, records[1:]))
+
+
+def test_intersecting_matches_brute_force():
+    rng = random.Random(1)
+    index = IntervalIndex()
+    records = []
+    for id_ in range(300):
+        record = AppointmentRecord(id_, START + rng.randrange(0, 3000) * MINUTE, rng.choice([0, 20, 45, 300]) * MINUTE)
+        records.append(record)
+        index.add(record)
+
+    for _ in range(200):
+        start = START + rng.randrange(-400, 3200) * MINUTE
+        end = start + rng.randrange(0, 240) * MINUTE
+        found = index.intersecting(start, end)
+        assert {r.id for r in found} == brute_force(records, start, end)
+        assert_sorted(found)
+
+
+def test_remove_and_move():
+    index = IntervalIndex()
+    long = AppointmentRecord(1, START, 5 * HOUR)
+    short = AppointmentRecord(2, START + HOUR, 20 * MINUTE)
+    index.add(long)
+    index.add(short)
+    assert [r.id for r in index.intersecting(START + 4 * HOUR, START + 5 * HOUR)] == [1]
+
+    # Το ίδιο id αντικαθιστά την προηγούμενη θέση
+    index.add(AppointmentRecord(2, START + 6 * HOUR, 20 * MINUTE))
+    assert [r.id for r in index.intersecting(START + HOUR, START + 2 * HOUR)] == [1]
+    assert [r.id for r in index.starting(START + 6 * HOUR, START + 7 * HOUR)] == [2]
+
+    assert index.remove(1)
+    assert not index.remove(1)
+    assert index.intersecting(START, START + 5 * HOUR) == []
+    assert len(index) == 1
+
+
+def test_same_start_different_ids():
+    index = IntervalIndex()
+    for id_ in range(5):
+        index.add(AppointmentRecord(id_, START, HOUR))
+    assert index.remove(3)
+    assert sorted(r.id for r in index.intersecting(START, START + MINUTE)) == [0, 1, 2, 4]
+
+
+def test_overlap_with_cached_appointment(model, day):
+    start = day()
+    model.add_appointment(Appointment(date=start, duration=3 * HOUR))
+    with pytest.raises(DateOverlap):
+        model.add_appointment(Appointment(date=start + 2 * HOUR, duration=HOUR))
+    # Ένα ραντεβού που ξεκινάει όταν τελειώνει το προηγούμενο δεν συμπίπτει
+    assert model.add_appointment(Appointment(date=start + 3 * HOUR, duration=HOUR))
@@ -0,0 +1,173 @@
+"""
+Η σελιδοποίηση με κλειδί των πελατών, δες rantevou.src.model.pagination
+"""
+
+import base64
+import json
+from itertools import count
+
+import pytest
+
+from .. import server
+from ..server import app
+from ..src.model.customer import CustomerModel
+from ..src.model.customer_index import fts_join, fts_matches
+from ..src.model.entities import Customer
+from ..src.model.exceptions import InvalidCursor
+from ..src.model.pagination import Cursor
+
+PAGE = 2
+# Επίθετα με NULL και επαναλήψεις, ώστε να φαίνεται η σειρά των τμημάτων και των ids
+SURNAMES = ["Beta", None, "Alpha", "Beta", None, "Gamma", "Alpha"]
+_prefixes = count()
+
+
+@pytest.fixture
+def customers(new_customer) -> tuple[str, list[Customer]]:
+    """
+    Returns:
+        tuple[str, list[Customer]]: Ένα όνομα που έχουν μόνο οι πελάτες αυτού του test και οι πελάτες
+    """
+    name = "Page" + "abcdefghijklmnopqrstuvwxyz"[next(_prefixes)]
+    return name, [
+        new_customer(name, surname, f"{i}.{name.lower()}@example.com" if i % 3 else None)
+        for i, surname in enumerate(SURNAMES)
+    ]
+
+
+def walk(model: CustomerModel, query: str, **kwargs) -> tuple[list[list[int]], list[list[int]]]:
+    """
+    Returns:
+        tuple[list[list[int]], list[list[int]]]: Τα ids των σελίδων από την αρχή μέχρι το
+        τέλος με τα next_cursor και από το τέλος μέχρι την αρχή με τα prev_cursor, στην ίδια σειρά
+    """
+    page = model.get_customer_page(PAGE, query, **kwargs)
+    assert page.prev_cursor is None
+    forward = [page]
+    while forward[-1].next_cursor:
+        forward.append(model.get_customer_page(PAGE, query, cursor=forward[-1].next_cursor, **kwargs))
+    backward = [forward[-1]]
+    while backward[-1].prev_cursor:
+        backward.append(model.get_customer_page(PAGE, query, cursor=backward[-1].prev_cursor, **kwargs))
+    assert all(page.count is None for page in forward[1:] + backward)
+
+    def ids(pages):
+        return [[customer.id for customer in page.customers] for page in pages]
+
+    return ids(forward), ids(backward[::-1])
+
+
+def flatten(pages: list[list[int]]) -> list[int]:
+    assert all(len(page) == PAGE for page in pages[:-1])
+    return [id_ for page in pages for id_ in page]
+
+
+@pytest.mark.parametrize("fts", [True, False])
+@pytest.mark.parametrize("descending", [False, True])
+def test_surname_with_null_segment(customer_model, customers, monkeypatch, fts, descending):
+    monkeypatch.setattr(CustomerModel, "fts", fts)
+    name, added = customers
+    # Όπως το SQLite, τα NULL πρώτα στην αύξουσα σειρά
+    expected = [c.id for c in sorted(added, key=lambda c: (c.surname is not None, c.surname or "", c.id))]
+    if descending:
+        expected.reverse()
+
+    forward, backward = walk(customer_model, name, sorted_by="surname", descending=descending)
+    assert flatten(forward) == expected
+    assert backward == forward
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_id_order_without_fts(customer_model, customers, monkeypatch, descending):
+    monkeypatch.setattr(CustomerModel, "fts", False)
+    name, added = customers
+    expected = sorted((c.id for c in added), reverse=descending)
+
+    assert customer_model.get_customer_page(PAGE, name, descending=descending).count == len(added)
+    forward, backward = walk(customer_model, name, descending=descending)
+    assert flatten(forward) == expected
+    assert backward == forward
+
+
+def test_rank_cursor(customer_model, customers):
+    name, added = customers
+    assert customer_model.fts
+    first = customer_model.get_customer_page(PAGE, name)
+    assert first.count == len(added)
+    assert Cursor.decode(first.next_cursor).key == "rank"
+
+    matches = fts_matches(customer_model.fts_query(name))
+    ranked = customer_model.session.query(Customer.id).select_from(fts_join(matches))
+    expected = [id_ for (id_,) in ranked.order_by(matches.c.rank, Customer.id)]
+
+    forward, backward = walk(customer_model, name)
+    assert flatten(forward) == expected
+    assert backward == forward
+
+
+def test_cursor_round_trip():
+    cursors = [Cursor("id", False, None, 7), Cursor("surname", True, "Νίκος", 3, True), Cursor("rank", False, -1.5, 1)]
+    for cursor in cursors:
+        assert Cursor.decode(cursor.encode()) == cursor
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        '{"key": "id"}',
+        '["id", false, null, 1]',
+        '["id", false, null, "1", false]',
+        '[1, false, null, 1, false]',
+        '["surname", false, ["Alpha"], 1, false]',
+    ],
+)
+def test_invalid_cursor(payload):
+    token = base64.urlsafe_b64encode(payload.encode()).decode()
+    with pytest.raises(InvalidCursor):
+        Cursor.decode(token)
+
+
+def test_invalid_cursor_token():
+    for token in ["not a cursor!", "////", base64.urlsafe_b64encode(b"\xff\xfe").decode()]:
+        with pytest.raises(InvalidCursor):
+            Cursor.decode(token)
+
+
+def test_cursor_of_another_order(customer_model, customers):
+    name, _ = customers
+    page = customer_model.get_customer_page(PAGE, name, sorted_by="surname")
+    with pytest.raises(InvalidCursor):
+        customer_model.get_customer_page(PAGE, name, cursor=page.next_cursor)
+    with pytest.raises(InvalidCursor):
+        customer_model.get_customer_page(PAGE, name, sorted_by="surname", descending=True, cursor=page.next_cursor)
+
+
+def test_invalid_cursor_response(customers):
+    name, _ = customers
+    cursor = base64.urlsafe_b64encode(json.dumps(["surname", False, None, 1, False]).encode()).decode()
+    with app.test_client() as client:
+        for token in ["not a cursor!", cursor]:
+            response = client.get(f"/customers/search/{name}", query_string={"cursor": token})
+            assert response.status_code == 422
+            assert response.get_json()["reason"] == "Invalid cursor"
+
+        response = client.get(f"/customers/search/{name}")
+        assert response.status_code == 200
+        assert response.get_json()["next"] is None
+
+
+def test_cursor_in_the_path(customer_model, customers, monkeypatch):
+    name, created = customers
+    ids = {customer.phone: customer.id for customer in created}
+    monkeypatch.setattr(server, "CUSTOMER_PAGE", PAGE)
+    forward, _ = walk(customer_model, name)
+    with app.test_client() as client:
+        response = client.get(f"/customers/search/{name}").get_json()
+        assert response["pages"] == f"1/{len(forward)}"
+        pages = [response]
+        while pages[-1]["next"]:
+            pages.append(client.get(f"/customers/search/{name}/{pages[-1]['next']}").get_json())
+        assert [[ids[customer["phone"]] for customer in page["data"]] for page in pages] == forward
+        assert all("pages" not in page for page in pages[1:])
+
+        assert client.get("/customers/2").status_code == 422
@@ -0,0 +1,56 @@
+"""
+Η φόρτωση περιόδων σε δεύτερο thread, δες rantevou.src.model.caching.Prefetcher
+"""
+
+from datetime import timedelta
+
+from ..src.model import caching
+from ..src.model.caching import PERIOD
+from ..src.model.entities import AppointmentRecord
+
+HOUR = timedelta(hours=1)
+
+
+def test_prefetched_periods_are_served_from_the_cache(cache, day, external):
+    start = day(cold=True)
+    id_ = external.insert(start + PERIOD, HOUR)
+
+    assert cache.prefetch(start, start + 3 * PERIOD).result() == 4
+    assert cache.missing(cache.hash(start), cache.hash(start + 3 * PERIOD)) == []
+    assert cache.lookup_id(id_) is not None
+    assert (cache.prefetcher.prefetches, cache.prefetcher.prefetched_periods) == (1, 4)
+
+    cache.stats.reset()
+    assert [r.id for r in cache.iter_date_range(start, start + 3 * PERIOD)] == [id_]
+    assert (cache.stats.hits, cache.stats.misses) == (4, 0)
+
+
+def test_loaded_periods_are_not_prefetched(cache, day):
+    start = day(cold=True)
+    cache.lookup_date(start)
+    assert cache.prefetch(start, start) is None
+
+
+def test_only_missing_periods_are_stored(cache, day, external):
+    start = day(cold=True)
+    cache.lookup_date(start + PERIOD)
+    # Η περίοδος που υπάρχει ήδη δεν ξαναγεμίζει, ακόμα κι αν η βάση δεδομένων έχει πλέον ένα ραντεβού της
+    external.insert(start + PERIOD, HOUR)
+
+    assert cache.prefetch(start, start + 2 * PERIOD).result() == 2
+    assert cache.data[cache.hash(start + PERIOD)] == []
+
+
+def test_change_during_the_query_discards_the_result(cache, day, monkeypatch):
+    start = day(cold=True)
+    query_records = caching.query_records
+
+    def write_while_querying(*args, **kwargs):
+        result = query_records(*args, **kwargs)
+        cache.add(AppointmentRecord(10**9, start, HOUR))
+        return result
+
+    monkeypatch.setattr(caching, "query_records", write_while_querying)
+    assert cache.prefetch(start, start + PERIOD).result() == 0
+    first = cache.hash(start)
+    assert cache.missing(first, first + 1) == [first, first + 1]
@@ -0,0 +1,50 @@
+"""
+Τα AppointmentRecord που κρατάει το cache αντί για αντικείμενα ORM
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect
+
+from ..src.model.entities import Appointment, AppointmentRecord
+
+HOUR = timedelta(hours=1)
+
+
+def test_cache_holds_records(model, day, new_customer):
+    start = day()
+    customer = new_customer("Record")
+    id_ = model.add_appointment(Appointment(date=start, duration=HOUR, customer_id=customer.id))
+
+    (record,) = model.get_appointments_from_to_date(start, start + HOUR)
+    assert type(record) is AppointmentRecord
+    assert not hasattr(record, "__dict__")
+    assert (record.id, record.date, record.end_date) == (id_, start, start + HOUR)
+    # Ο πελάτης φορτώνεται μόνο όταν ζητηθεί
+    assert record.customer.id == customer.id
+
+
+def test_round_trip_through_appointment(model, day):
+    start = day()
+    id_ = model.add_appointment(Appointment(date=start, duration=HOUR, employee_id=2))
+    record = model.cache.lookup_id(id_)
+
+    appointment = record.to_appointment()
+    assert inspect(appointment).transient
+    assert AppointmentRecord.from_appointment(appointment).to_dict_api() == record.to_dict_api()
+    assert record.to_dict_api() == model.get_appointment_by_id(id_).to_dict_api()
+
+
+def test_durations_are_shared():
+    start = datetime(2025, 6, 9, 9)
+    first = AppointmentRecord(1, start, timedelta(minutes=20))
+    second = AppointmentRecord(2, start, timedelta(seconds=1200))
+    assert first.duration is second.duration
+
+
+def test_overlap_with_appointment():
+    start = datetime(2025, 6, 9, 9)
+    record = AppointmentRecord(1, start, HOUR)
+    assert record.overlap(Appointment(date=start + HOUR / 2, duration=HOUR))
+    assert not record.overlap(Appointment(date=start + HOUR, duration=HOUR))
+    assert record.time_between_appointments(AppointmentRecord(2, start + 3 * HOUR, HOUR)) == 2 * HOUR
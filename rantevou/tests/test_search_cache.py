@@ -0,0 +1,100 @@
+"""
+Το cache αποτελεσμάτων του LIKE 'query%' πρέπει να δίνει ό,τι και το LIKE, και όταν
+βρίσκει τα αποτελέσματα ενός query από τα αποτελέσματα ενός προθέματος του.
+"""
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+from sqlalchemy import Engine, create_engine, or_, select
+from sqlalchemy.orm import Session
+
+from ..src.model.customer_index import SEARCH_COLUMNS, SearchCache, install_customer_change_log
+from ..src.model.entities import Base, Customer
+
+CUSTOMERS = [
+    ("Anna", "Papadopoulou", "anna@example.com", "6900000001"),
+    ("ANNETTE", "Smith", "annette@example.com", "6900000002"),
+    ("Andreas", None, "a.andreas@example.com", None),
+    ("Μαρία", "Annou", "maria@example.gr", "6900000006"),
+    ("Νίκος", "Ανδρέου", None, "2100000004"),
+    ("νικόλαος", "Νικολάου", "nik@example.gr", None),
+]
+
+
+@pytest.fixture
+def db(tmp_path: Path) -> Engine:
+    engine = create_engine(f"sqlite:///{tmp_path / 'customers.db'}")
+    Base.metadata.create_all(bind=engine)
+    install_customer_change_log(engine)
+    with Session(engine) as session:
+        for name, surname, email, phone in CUSTOMERS:
+            session.add(Customer(name=name, surname=surname, email=email, phone=phone))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def like(engine: Engine, query: str, ids: bool = True) -> list:
+    condition = or_(*(column.like(f"{query}%") for column in SEARCH_COLUMNS))
+    with engine.connect() as connection:
+        rows = connection.execute(select(Customer.id, *SEARCH_COLUMNS).where(condition).order_by(Customer.id)).all()
+    return [row[0] for row in rows] if ids else rows
+
+
+def cache(engine: Engine, size: int = 32, *queries: str) -> SearchCache:
+    results = SearchCache(engine, size)
+    results.interval = float("inf")
+    for query in queries:
+        results.put_rows(query, like(engine, query, ids=False))
+    return results
+
+
+def test_narrowing_matches_like(db):
+    results = cache(db, 32, "a")
+    for query in ["an", "ann", "anna@", "annou", "ab"]:
+        assert results.search(query) == like(db, query), query
+    assert "ann" in results.values
+
+
+def test_ascii_case_folding_matches_like(db):
+    results = cache(db, 32, "A")
+    for query in ["AN", "aNN", "Annet", "ANDREAS"]:
+        assert results.search(query) == like(db, query), query
+
+
+def test_non_ascii_case_matches_like(db):
+    results = cache(db, 32, "Ν", "ν")
+    for query in ["Νι", "νι", "Νικολ", "νικολ"]:
+        assert results.search(query) == like(db, query), query
+    assert like(db, "Νι") != like(db, "νι")
+
+
+def test_no_prefix_in_cache(db):
+    results = cache(db, 32, "an")
+    assert results.search("a") is None
+    assert results.search("b") is None
+
+
+def test_eviction_respects_the_size(db):
+    results = cache(db, 2, "a", "m", "6")
+    assert list(results.values) == ["m", "6"]
+    assert results.search("an") is None
+
+    # Τα αποτελέσματα του στενότερου query μετράνε κι αυτά στο μέγεθος
+    assert results.search("ma") == like(db, "ma")
+    assert list(results.values) == ["m", "ma"]
+    assert results.search("69") is None
+
+
+def test_external_change_clears_the_cache(db):
+    results = SearchCache(db, 32)
+    results.interval = 0
+    # Ο πρώτος έλεγχος διαβάζει το seq του customer_change
+    results.poll()
+    results.put_rows("a", like(db, "a", ids=False))
+    assert results.search("an") == like(db, "an")
+    with sqlite3.connect(db.url.database) as connection:
+        connection.execute("INSERT INTO customer (name, normalized_name) VALUES ('Anastasia', 'anastasia')")
+    assert results.search("an") is None
@@ -0,0 +1,91 @@
+"""
+Εύρεση του πρώτου ελεύθερου κενού μέσω του FreeSlotIndex, δες rantevou.src.model.slots
+"""
+
+import random
+from datetime import datetime, timedelta
+
+from ..src.model.entities import Appointment, AppointmentRecord
+from ..src.model.slots import FreeSlotIndex
+
+HOUR = timedelta(hours=1)
+MINUTE = timedelta(minutes=1)
+WORKING_DAY = 8 * HOUR
+STEP = 5 * MINUTE
+
+
+def brute_force(start, size, appointments, after, duration):
+    """
+    Το πρώτο κενό με έλεγχο κάθε θέσης, για ωράριο 9:00-17:00
+    """
+
+    def free(i):
+        slot = start + i * STEP
+        if not 9 <= slot.hour < 17:
+            return False
+        return not any(a.date < slot + STEP and a.end_date > slot for a in appointments)
+
+    slots = max(1, -(-duration // STEP))
+    first = max(0, -((start - after) // STEP))
+    for i in range(first, size - slots + 1):
+        if all(free(j) for j in range(i, i + slots)):
+            end = next((j for j in range(i, size) if not free(j)), size)
+            return start + i * STEP, (end - i) * STEP
+    return None
+
+
+def test_segment_tree_matches_brute_force():
+    rng = random.Random(2)
+    start = datetime(2025, 6, 9)
+    index = FreeSlotIndex(start, timedelta(days=3), STEP, 9 * HOUR, WORKING_DAY)
+    appointments = {}
+    for id_ in range(60):
+        date = start + rng.randrange(0, 3 * 24 * 12) * STEP + rng.choice([0, 2]) * MINUTE
+        appointments[id_] = AppointmentRecord(id_, date, rng.choice([20, 45, 90, 200]) * MINUTE)
+        index.add(appointments[id_])
+        if rng.random() < 0.3:
+            removed = rng.choice(list(appointments))
+            index.remove(removed)
+            del appointments[removed]
+
+        after = start + rng.randrange(-10, 3 * 24 * 12) * STEP + rng.randrange(0, 5) * MINUTE
+        duration = rng.choice([5, 20, 60, 180, 480]) * MINUTE
+        expected = brute_force(start, index.size, list(appointments.values()), after, duration)
+        assert index.find(after, duration) == expected, (after, duration)
+
+
+def test_load_matches_add():
+    start = datetime(2025, 6, 9)
+    appointments = [AppointmentRecord(i, start + (9 + 2 * i) * HOUR, HOUR) for i in range(4)]
+    loaded = FreeSlotIndex(start, timedelta(days=2), STEP, 9 * HOUR, WORKING_DAY)
+    loaded.load(appointments)
+    added = FreeSlotIndex(start, timedelta(days=2), STEP, 9 * HOUR, WORKING_DAY)
+    for appointment in appointments:
+        added.add(appointment)
+    for hours in range(0, 48, 3):
+        assert loaded.find(start + hours * HOUR, HOUR) == added.find(start + hours * HOUR, HOUR)
+    assert loaded.find(start, HOUR) == (start + 10 * HOUR, HOUR)
+    assert loaded.find(start, 2 * HOUR) == (start + 33 * HOUR, WORKING_DAY)
+
+
+def test_local_writes_update_the_index(model, day):
+    start = day(cold=True)
+    assert model.find_free_slot(start, 2 * HOUR) == (start, WORKING_DAY)
+
+    id_ = model.add_appointment(Appointment(date=start, duration=HOUR))
+    assert model.find_free_slot(start, 2 * HOUR) == (start + HOUR, WORKING_DAY - HOUR)
+
+    assert model.delete_appointment(model.cache.lookup_id(id_))
+    assert model.find_free_slot(start, 2 * HOUR) == (start, WORKING_DAY)
+
+
+def test_external_insert_rebuilds_the_index(model, day, external):
+    # Σε μέρα που δεν έχει φορτωθεί, οπότε η αλλαγή δεν ακυρώνει καμία περίοδο του cache
+    start = day(cold=True)
+    assert model.find_free_slot(start, 2 * HOUR) == (start, WORKING_DAY)
+
+    external.insert(start, WORKING_DAY)
+    model.sync_external_changes()
+
+    free_start, _ = model.find_free_slot(start, 2 * HOUR)
+    assert free_start >= start + WORKING_DAY
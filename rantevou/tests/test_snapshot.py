@@ -0,0 +1,89 @@
+"""
+Αποθήκευση του cache των ραντεβού σε snapshot και φόρτωση του σε άδειο cache.
+"""
+
+from datetime import timedelta
+from threading import Event, Thread
+from time import monotonic
+
+from ..src.model import appointment as appointment_module
+from ..src.model.caching import AppointmentCache
+from ..src.model.entities import Appointment
+from ..src.model.session import DB_PATH
+from ..src.model.snapshot import SNAPSHOT_PATH, load_snapshot, save_snapshot
+
+
+def test_snapshot_belongs_to_the_database():
+    assert SNAPSHOT_PATH.parent == DB_PATH.parent
+    assert SNAPSHOT_PATH.name.startswith(DB_PATH.name)
+
+
+def test_round_trip(model, day, tmp_path):
+    start = day()
+    ids = [
+        model.add_appointment(Appointment(date=start + timedelta(hours=hours), duration=timedelta(minutes=30)))
+        for hours in (0, 2)
+    ]
+    path = tmp_path / "cache.snapshot"
+    assert save_snapshot(model.cache, path) >= len(ids)
+
+    cache = AppointmentCache(model)
+    assert load_snapshot(cache, path) >= len(ids)
+    for id_ in ids:
+        assert cache.lookup_id(id_).values == model.cache.lookup_id(id_).values
+    assert set(cache.data) == set(model.cache.data)
+
+
+def test_changes_after_snapshot_invalidate_their_periods(model, day, external, tmp_path):
+    start = day()
+    path = tmp_path / "cache.snapshot"
+    save_snapshot(model.cache, path)
+
+    id_ = external.insert(start, timedelta(minutes=30))
+    cache = AppointmentCache(model)
+    load_snapshot(cache, path)
+
+    # Η περίοδος του νέου ραντεβού ξαναφορτώνεται από την βάση δεδομένων
+    assert cache.hash(start) not in cache.data
+    assert [appointment.id for appointment in cache.lookup_date(start)] == [id_]
+
+
+def test_snapshot_older_than_the_change_log_is_ignored(model, day, external, tmp_path):
+    start = day()
+    path = tmp_path / "cache.snapshot"
+    save_snapshot(model.cache, path)
+    seq = model.cache.watcher.last_seq
+
+    external.insert(start, timedelta(minutes=30))
+    model.sync_external_changes()
+    assert model.cache.watcher.has_changes_after(seq)
+    # Όπως ο καθαρισμός των παλιών εγγραφών από μια άλλη διεργασία
+    external.connection.execute("DELETE FROM appointment_change WHERE seq <= ?", (seq + 1,))
+    external.connection.commit()
+    assert not model.cache.watcher.has_changes_after(seq)
+
+    cache = AppointmentCache(model)
+    assert load_snapshot(cache, path) == 0
+    assert not cache.data
+
+
+def test_snapshot_is_saved_periodically_and_on_shutdown(model, monkeypatch):
+    saves = []
+    monkeypatch.setattr(appointment_module, "SNAPSHOT", True)
+    monkeypatch.setattr(appointment_module, "SNAPSHOT_INTERVAL", 0.01)
+    monkeypatch.setattr(model, "stopped", Event())
+    monkeypatch.setattr(model, "save_snapshot", lambda: saves.append(monotonic()) or 0)
+
+    saver = Thread(target=model._save_periodically)  # pylint: disable=protected-access
+    saver.start()
+    deadline = monotonic() + 5
+    while len(saves) < 2 and monotonic() < deadline:
+        saver.join(0.01)
+    assert len(saves) >= 2
+
+    model.shutdown()
+    saver.join(5)
+    assert not saver.is_alive()
+    count = len(saves)
+    model.shutdown()
+    assert len(saves) == count
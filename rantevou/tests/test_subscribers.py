@@ -0,0 +1,63 @@
+"""
+Οι subscribers των μοντέλων με weak references, δες rantevou.src.model.events.SubscriberRegistry
+"""
+
+import gc
+
+import pytest
+
+from ..src.model.events import SubscriberRegistry
+from ..src.model.exceptions import NoSubscriberInterface
+
+
+class Subscriber:
+    def __init__(self):
+        self.updates = 0
+
+    def subscriber_update(self, *args):
+        self.updates += 1
+
+
+def test_registry_does_not_keep_subscribers_alive():
+    registry = SubscriberRegistry()
+    kept, dropped = Subscriber(), Subscriber()
+    registry.add(kept)
+    registry.add(dropped)
+    del dropped
+    gc.collect()
+
+    assert registry.notify() == 1
+    assert kept.updates == 1
+    stats = registry.get_stats()
+    assert (stats["subscribers"], stats["pruned"]) == (1, 1)
+    assert stats["latency"]["count"] == 1
+
+
+def test_add_and_remove():
+    registry = SubscriberRegistry()
+    subscriber = Subscriber()
+    registry.add(subscriber)
+    registry.add(subscriber)
+    assert len(registry) == 1
+    assert registry.remove(subscriber)
+    assert not registry.remove(subscriber)
+    assert registry.notify() == 0
+
+
+def test_model_subscribers(model, customer_model):
+    subscriber = Subscriber()
+    with pytest.raises(NoSubscriberInterface):
+        model.add_subscriber(object())
+
+    before = model.get_subscriber_stats()["subscribers"]
+    model.add_subscriber(subscriber)
+    customer_model.add_subscriber(subscriber)
+    assert model.get_subscriber_stats()["subscribers"] == before + 1
+
+    model.update_subscribers()
+    customer_model.notify_subscribers()
+    assert subscriber.updates == 2
+
+    del subscriber
+    gc.collect()
+    assert model.get_subscriber_stats()["subscribers"] == before
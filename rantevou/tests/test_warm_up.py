@@ -0,0 +1,55 @@
+"""
+Η αρχική φόρτωση του cache σε δεύτερο thread, δες AppointmentModel._warm_up
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import timedelta
+
+import pytest
+
+from ..src.model import appointment as appointment_module
+from ..src.model.entities import Appointment
+
+HOUR = timedelta(hours=1)
+
+
+@pytest.fixture
+def not_ready(model, monkeypatch) -> Future:
+    """
+    Το μοντέλο όπως πριν ολοκληρωθεί η αρχική φόρτωση
+    """
+    ready = Future()
+    monkeypatch.setattr(model, "ready", ready)
+    yield ready
+    if not ready.done():
+        ready.set_result(None)
+
+
+def test_preload_window_is_pinned(model):
+    assert model.is_ready
+    assert model.warmup_ms is not None
+    assert model.cache.pinned == range(model.cache.hash(model.min_date), model.cache.hash(model.max_date) + 1)
+
+
+def test_writes_wait_for_the_warm_up(model, day, not_ready):
+    assert not model.wait_until_ready(timeout=0.01)
+    assert not model.sync_external_changes()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(model.add_appointment, Appointment(date=day(), duration=HOUR))
+        assert not model.wait_until_ready(timeout=0.1)
+        assert not future.done()
+        not_ready.set_result(None)
+        id_ = future.result(timeout=5)
+    assert model.cache.lookup_id(id_) is not None
+
+
+def test_failed_warm_up_still_completes(model, not_ready, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(appointment_module, "SNAPSHOT", False)
+    monkeypatch.setattr(model.cache, "query_by_date", fail)
+    model._warm_up()  # pylint: disable=protected-access
+    assert model.is_ready
+    assert not_ready.result() is None
@@ -0,0 +1,137 @@
+"""
+Μετράει τα statements που στέλνει στην βάση δεδομένων κάθε εγγραφή του AppointmentModel.
+Κάθε εγγραφή πρέπει να είναι ένα statement και ένα commit, όταν οι περίοδοι είναι στο cache,
+μαζί με την αναγνώριση των δικών της αλλαγών από τον ChangeWatcher.
+"""
+
+import sqlite3
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+
+from ..src.model.appointment import AppointmentModel
+from ..src.model.entities import Appointment
+from ..src.model.exceptions import IdNotFoundInDB, WrongAppointment
+from ..src.model.session import engine
+
+
+class StatementCounter:
+    """
+    Καταγράφει ό,τι εκτελεί το SQLite με το set_trace_callback, ώστε να μετράνε και τα
+    statements που δεν περνάνε από το SQLAlchemy, σε όλες τις συνδέσεις του pool που
+    δίνονται όσο είναι ενεργός και στην σύνδεση του ChangeWatcher.
+    """
+
+    def __init__(self, model: AppointmentModel):
+        self.model = model
+        self.statements: list[str] = []
+        self.commits = 0
+        self.connections: list[sqlite3.Connection] = []
+
+    def __call__(self, statement: str) -> None:
+        if statement.startswith("COMMIT"):
+            self.commits += 1
+        elif statement.startswith(("BEGIN", "ROLLBACK")):
+            pass
+        # Κάθε trigger αναφέρεται ξανά με το κείμενο του statement που το ενεργοποίησε
+        elif not self.statements or self.statements[-1] != statement:
+            self.statements.append(statement)
+
+    def trace(self, connection: sqlite3.Connection, *args) -> None:
+        connection.set_trace_callback(self)
+        self.connections.append(connection)
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(engine, "checkout", self.trace)
+        self.trace(self.model.cache.watcher.connection.dbapi_connection)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(engine, "checkout", self.trace)
+        for connection in self.connections:
+            connection.set_trace_callback(None)
+
+
+def new_appointment(model: AppointmentModel, hours: int) -> Appointment:
+    # Η πρώτη μέρα του αρχικού παραθύρου του cache, που δεν την δίνει το fixture day, ώστε ο
+    # έλεγχος overlap να μην κάνει query
+    return Appointment(date=model.now + timedelta(days=1, hours=hours), duration=timedelta(minutes=20))
+
+
+def test_add_is_one_statement(model):
+    with StatementCounter(model) as counter:
+        id_ = model.add_appointment(new_appointment(model, 0))
+
+    assert len(counter.statements) == 1 and counter.commits == 1
+    assert counter.statements[0].startswith("INSERT")
+    assert model.cache.lookup_id(id_).version == 1
+
+
+def test_update_is_one_statement(model):
+    id_ = model.add_appointment(new_appointment(model, 1))
+    appointment = model.cache.lookup_id(id_).to_appointment()
+    appointment.duration = timedelta(minutes=40)
+
+    with StatementCounter(model) as counter:
+        assert model.update_appointment(appointment)
+
+    assert len(counter.statements) == 1 and counter.commits == 1
+    assert counter.statements[0].startswith("UPDATE")
+    record = model.cache.lookup_id(id_)
+    assert record.duration == timedelta(minutes=40)
+    assert record.version == 2
+
+
+def test_delete_is_one_statement(model):
+    id_ = model.add_appointment(new_appointment(model, 2))
+    model.add_appointment(new_appointment(model, 3))
+    record = model.cache.lookup_id(id_)
+
+    with StatementCounter(model) as counter:
+        assert model.delete_appointment(record)
+
+    assert len(counter.statements) == 1 and counter.commits == 1
+    assert counter.statements[0].startswith("DELETE")
+    assert model.cache.lookup_id(id_) is None
+
+
+def test_stale_version_is_rejected(model):
+    id_ = model.add_appointment(new_appointment(model, 4))
+    stale = model.cache.lookup_id(id_)
+    assert model.update_appointment(stale.to_appointment())
+
+    with pytest.raises(WrongAppointment):
+        model.update_appointment(stale)
+    with pytest.raises(WrongAppointment):
+        model.delete_appointment(stale)
+
+    current = model.cache.lookup_id(id_)
+    assert model.delete_appointment(current)
+    with pytest.raises(IdNotFoundInDB):
+        model.delete_appointment(current)
+
+
+def test_own_writes_are_not_external_changes(model):
+    # Οι αλλαγές άλλων tests μέσω δεύτερης σύνδεσης
+    model.sync_external_changes()
+
+    id_ = model.add_appointment(new_appointment(model, 5))
+    record = model.cache.lookup_id(id_)
+    assert model.delete_appointment(record)
+    model.add_appointments([new_appointment(model, 5), new_appointment(model, 6)])
+
+    invalidations = model.cache.watcher.invalidations
+    assert not model.sync_external_changes()
+    assert model.cache.watcher.invalidations == invalidations
+    assert not model.cache.watcher.acknowledged
+
+
+def test_external_change_before_own_write(model, day, external):
+    start = day()
+    id_ = external.insert(start, timedelta(minutes=20))
+    own_id = model.add_appointment(Appointment(date=start + timedelta(hours=1), duration=timedelta(minutes=20)))
+
+    assert model.sync_external_changes()
+    assert [appointment.id for appointment in model.cache.lookup_date(start)] == [id_, own_id]
+    assert not model.cache.watcher.acknowledged